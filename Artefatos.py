@@ -0,0 +1,213 @@
+"""Camada de artefatos binários (.npy mapeado em memória, Parquet, Feather) com metadados em JSON."""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import argparse
+from time import time
+
+import numpy as np
+
+# Formato padrão dos artefatos intermediários. O .npy pode ser aberto com mmap, sem cópia.
+FORMATO_PADRAO = 'npy'
+
+EXTENSOES = {
+    'npy': '.npy',
+    'parquet': '.parquet',
+    'feather': '.feather',
+    'csv': '.csv',
+}
+
+
+def caminho_dados(base, formato=FORMATO_PADRAO):
+    """Caminho do arquivo de dados de um artefato."""
+    return base + EXTENSOES[formato]
+
+
+def caminho_metadados(base):
+    """Caminho do arquivo de metadados (sidecar) de um artefato."""
+    return base + '.json'
+
+
+def salvar_metadados(base, meta):
+    """Grava o sidecar JSON de forma atômica."""
+    temporario = caminho_metadados(base) + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2, default=_para_json)
+    os.replace(temporario, caminho_metadados(base))
+
+
+def carregar_metadados(base):
+    """Lê o sidecar JSON de um artefato."""
+    with open(caminho_metadados(base), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def atualizar_metadados(base, **campos):
+    """Acrescenta ou substitui campos no sidecar de um artefato já gravado."""
+    meta = carregar_metadados(base)
+    meta.update(campos)
+    salvar_metadados(base, meta)
+
+
+def existe(base):
+    """Indica se o artefato (dados + metadados) já foi gravado."""
+    if not os.path.exists(caminho_metadados(base)):
+        return False
+    formato = carregar_metadados(base).get('formato', FORMATO_PADRAO)
+    return os.path.exists(caminho_dados(base, formato))
+
+
+def _para_json(valor):
+    # Converte tipos do NumPy que o módulo json não conhece
+    if isinstance(valor, np.ndarray):
+        return valor.tolist()
+    if isinstance(valor, np.generic):
+        return valor.item()
+    raise TypeError(f"Tipo não serializável: {type(valor)}")
+
+
+def criar_matriz(base, linhas, colunas, dtype=np.float32, **meta):
+    """Cria um .npy vazio e devolve um memmap gravável para ser preenchido em blocos."""
+    if isinstance(colunas, int):
+        n_colunas, nomes = colunas, None
+    else:
+        n_colunas, nomes = len(colunas), list(colunas)
+    forma = (linhas, n_colunas) if n_colunas else (linhas,)
+
+    matriz = np.lib.format.open_memmap(caminho_dados(base, 'npy'), mode='w+', dtype=dtype, shape=forma)
+    salvar_metadados(base, {'formato': 'npy', 'dtype': np.dtype(dtype).name, 'forma': list(forma),
+                            'colunas': nomes, **meta})
+    return matriz
+
+
+def salvar_matriz(base, dados, colunas=None, formato=FORMATO_PADRAO, **meta):
+    """Grava uma matriz (ou vetor) no formato escolhido, junto com o sidecar de metadados."""
+    # O pandas só é importado quando necessário: se ainda não foi, 'dados' não pode ser um DataFrame
+    pd = sys.modules.get('pandas')
+    if pd is not None and isinstance(dados, pd.DataFrame):
+        colunas = list(dados.columns) if colunas is None else colunas
+        dados = dados.to_numpy()
+    elif pd is not None and isinstance(dados, pd.Series):
+        dados = dados.to_numpy()
+    dados = np.asarray(dados)
+    colunas = None if colunas is None else list(colunas)
+
+    if formato == 'npy':
+        np.save(caminho_dados(base, 'npy'), dados)
+    else:
+        import pandas as pd
+        quadro = pd.DataFrame(dados.reshape(len(dados), -1), columns=colunas)
+        quadro.columns = [str(c) for c in quadro.columns]
+        if formato == 'parquet':
+            quadro.to_parquet(caminho_dados(base, formato), index=False)
+        elif formato == 'feather':
+            quadro.to_feather(caminho_dados(base, formato))
+        elif formato == 'csv':
+            quadro.to_csv(caminho_dados(base, formato), index=False)
+        else:
+            raise ValueError(f"Formato de artefato desconhecido: {formato}")
+
+    salvar_metadados(base, {'formato': formato, 'dtype': dados.dtype.name, 'forma': list(dados.shape),
+                            'colunas': colunas, **meta})
+
+
+def carregar_matriz(base, mmap=True):
+    """Abre um artefato como array do NumPy. No formato .npy a abertura é mapeada em memória (sem cópia)."""
+    meta = carregar_metadados(base)
+    formato = meta.get('formato', FORMATO_PADRAO)
+    caminho = caminho_dados(base, formato)
+
+    if formato == 'npy':
+        return np.load(caminho, mmap_mode='r' if mmap else None)
+    import pandas as pd
+    if formato == 'parquet':
+        dados = pd.read_parquet(caminho).to_numpy()
+    elif formato == 'feather':
+        dados = pd.read_feather(caminho).to_numpy()
+    elif formato == 'csv':
+        dados = pd.read_csv(caminho).to_numpy()
+    else:
+        raise ValueError(f"Formato de artefato desconhecido: {formato}")
+
+    dados = dados.astype(meta['dtype'], copy=False)
+    return dados.reshape(meta['forma'])
+
+
+def exportar_csv(base, destino=None, rotulos=None, tamanho_bloco=200_000):
+    """Exporta um artefato para CSV em blocos. 'rotulos' é um artefato opcional anexado como coluna 'Label'."""
+    import pandas as pd
+
+    meta = carregar_metadados(base)
+    destino = destino or base + '.csv'
+    dados = carregar_matriz(base)
+    colunas = meta.get('colunas') or [str(i) for i in range(dados.shape[1] if dados.ndim > 1 else 1)]
+    inteiras = set(meta.get('inteiras', []))
+
+    if rotulos is not None:
+        y = carregar_matriz(rotulos)
+        classes = carregar_metadados(rotulos).get('classes')
+
+    with open(destino, 'w', newline='') as saida:
+        for inicio in range(0, len(dados), tamanho_bloco):
+            bloco = pd.DataFrame(np.asarray(dados[inicio:inicio + tamanho_bloco]).reshape(-1, len(colunas)), columns=colunas)
+            for col in inteiras.intersection(bloco.columns):
+                bloco[col] = bloco[col].astype(np.int64)
+            if rotulos is not None:
+                codigos = np.asarray(y[inicio:inicio + tamanho_bloco])
+                bloco['Label'] = np.asarray(classes, dtype=object)[codigos] if classes else codigos
+            bloco.to_csv(saida, header=(inicio == 0), index=False)
+    return destino
+
+
+def comparar_formatos(base, formatos=('npy', 'parquet', 'feather', 'csv')):
+    """Compara tempo de gravação, tempo de leitura e tamanho em disco de um artefato em cada formato."""
+    import pandas as pd
+
+    dados = np.asarray(carregar_matriz(base))
+    meta = carregar_metadados(base)
+    resultados = []
+
+    pasta = tempfile.mkdtemp(prefix='artefatos_')
+    try:
+        for formato in formatos:
+            destino = os.path.join(pasta, os.path.basename(base))
+            try:
+                inicio = time()
+                salvar_matriz(destino, dados, colunas=meta.get('colunas'), formato=formato)
+                t_gravacao = time() - inicio
+            except ImportError as e:
+                print(f"Formato '{formato}' indisponível ({e}). Pulando.")
+                continue
+
+            inicio = time()
+            aberto = carregar_matriz(destino)
+            t_abertura = time() - inicio
+            # Força a leitura de todos os valores, para que o mmap não fique com vantagem artificial
+            float(np.asarray(aberto, dtype=np.float64).sum())
+            t_leitura = time() - inicio
+
+            resultados.append({
+                'formato': formato,
+                'tamanho_mb': os.path.getsize(caminho_dados(destino, formato)) / (1024 ** 2),
+                'gravacao_s': t_gravacao,
+                'abertura_s': t_abertura,
+                'leitura_completa_s': t_leitura,
+            })
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    return pd.DataFrame(resultados)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dos formatos de artefato (tempo de carga e tamanho em disco).")
+    parser.add_argument('artefato', nargs='?', default='X_train_scaled', help="Nome base do artefato (sem extensão).")
+    parser.add_argument('--formatos', nargs='+', default=['npy', 'parquet', 'feather', 'csv'])
+    args = parser.parse_args()
+
+    print(f"Comparando formatos para o artefato '{args.artefato}'")
+    tabela = comparar_formatos(args.artefato, args.formatos)
+    print(tabela.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
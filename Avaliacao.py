@@ -0,0 +1,139 @@
+"""Avaliação em fluxo: uma única matriz de confusão atualizada lote a lote, de onde saem todas as métricas.
+
+O conjunto de teste é lido do artefato em blocos e nunca existe um vetor y_pred completo na memória.
+Cada thread avalia uma faixa de linhas com a sua própria matriz; no fim as matrizes são somadas.
+"""
+
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from Artefatos import carregar_matriz
+
+TAMANHO_BLOCO = 262_144
+
+
+class MatrizConfusao:
+    """Matriz de confusão n x n (linhas = classe verdadeira, colunas = classe predita) e métricas derivadas."""
+
+    def __init__(self, n_classes, matriz=None):
+        self.n_classes = n_classes
+        self.matriz = np.zeros((n_classes, n_classes), dtype=np.int64) if matriz is None else np.asarray(matriz, dtype=np.int64)
+
+    def atualizar(self, y_verdadeiro, y_predito):
+        """Soma um lote de pares (verdadeiro, predito): um único bincount sobre n * y + y_pred."""
+        pares = np.asarray(y_verdadeiro, dtype=np.int64) * self.n_classes
+        pares += np.asarray(y_predito, dtype=np.int64)
+        self.matriz += np.bincount(pares, minlength=self.n_classes ** 2).reshape(self.n_classes, self.n_classes)
+        return self
+
+    def combinar(self, outra):
+        """Soma à matriz atual a matriz parcial de outro bloco ou processo."""
+        self.matriz += outra.matriz
+        return self
+
+    @classmethod
+    def combinar_todas(cls, matrizes):
+        matrizes = list(matrizes)
+        total = cls(matrizes[0].n_classes)
+        for matriz in matrizes:
+            total.combinar(matriz)
+        return total
+
+    @property
+    def total(self):
+        return int(self.matriz.sum())
+
+    def acuracia(self):
+        return float(np.trace(self.matriz) / max(self.total, 1))
+
+    def suporte(self):
+        return self.matriz.sum(axis=1)
+
+    def _dividir(self, numerador, denominador):
+        # Divisão por zero vira 0, como o zero_division=0 do scikit-learn
+        return np.divide(numerador, denominador, out=np.zeros(len(numerador)), where=denominador > 0)
+
+    def precisao(self):
+        return self._dividir(np.diag(self.matriz).astype(np.float64), self.matriz.sum(axis=0))
+
+    def revocacao(self):
+        return self._dividir(np.diag(self.matriz).astype(np.float64), self.suporte())
+
+    def f1(self):
+        p, r = self.precisao(), self.revocacao()
+        return self._dividir(2 * p * r, p + r)
+
+    def medias(self):
+        """Médias 'macro' e 'weighted' de precisão, revocação e F1."""
+        metricas = np.vstack([self.precisao(), self.revocacao(), self.f1()])
+        suporte = self.suporte()
+        pesos = suporte / max(suporte.sum(), 1)
+        return {'macro': metricas.mean(axis=1), 'weighted': metricas @ pesos}
+
+    def relatorio(self, nomes=None, digitos=4):
+        """Texto no mesmo formato do classification_report do scikit-learn."""
+        nomes = [str(n) for n in (nomes if nomes is not None else range(self.n_classes))]
+        largura = max(max(len(n) for n in nomes), len('weighted avg'), digitos)
+        cabecalho = f"{'':>{largura}s} " + ''.join(f" {t:>9}" for t in ('precision', 'recall', 'f1-score', 'support'))
+        linhas = [cabecalho, '']
+        formato = f"{{:>{largura}s}} " + f" {{:>9.{digitos}f}}" * 3 + " {:>9}"
+        for nome, p, r, f, s in zip(nomes, self.precisao(), self.revocacao(), self.f1(), self.suporte()):
+            linhas.append(formato.format(nome, p, r, f, s))
+        linhas.append('')
+        linhas.append(f"{'accuracy':>{largura}s} " + f" {'':>9}" * 2 + f" {self.acuracia():>9.{digitos}f} {self.total:>9}")
+        for nome, valores in self.medias().items():
+            linhas.append(formato.format(f'{nome} avg', *valores, self.total))
+        return '\n'.join(linhas) + '\n'
+
+    def para_dict(self, nomes=None):
+        nomes = [str(n) for n in (nomes if nomes is not None else range(self.n_classes))]
+        medias = self.medias()
+        return {
+            'matriz': self.matriz.tolist(),
+            'acuracia': self.acuracia(),
+            'classes': {nome: {'precisao': float(p), 'revocacao': float(r), 'f1': float(f), 'suporte': int(s)}
+                        for nome, p, r, f, s in zip(nomes, self.precisao(), self.revocacao(), self.f1(), self.suporte())},
+            'macro': dict(zip(('precisao', 'revocacao', 'f1'), map(float, medias['macro']))),
+            'weighted': dict(zip(('precisao', 'revocacao', 'f1'), map(float, medias['weighted']))),
+        }
+
+    def salvar(self, caminho, nomes=None):
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(self.para_dict(nomes), f, ensure_ascii=False, indent=2)
+
+
+def avaliar_em_blocos(motor, X, y, n_classes, inicio=0, fim=None, tamanho_bloco=TAMANHO_BLOCO):
+    """Matriz de confusão das linhas [inicio, fim) de X/y, com um único buffer de predições reaproveitado."""
+    fim = len(y) if fim is None else fim
+    matriz = MatrizConfusao(n_classes)
+    predicoes = np.empty(min(tamanho_bloco, max(fim - inicio, 0)), dtype=np.int64)
+    for a in range(inicio, fim, tamanho_bloco):
+        b = min(a + tamanho_bloco, fim)
+        y_pred = motor.prever_indices(X[a:b], out=predicoes[:b - a])
+        matriz.atualizar(np.ravel(y[a:b]), y_pred)
+    return matriz
+
+
+def avaliar_em_paralelo(motor, X, y, n_classes, max_workers=None, tamanho_bloco=TAMANHO_BLOCO):
+    """Divide as linhas em faixas, avalia cada uma em uma thread e soma as matrizes parciais.
+
+    X e y podem ser memmaps ou nomes de artefatos (abertos com mmap). O produto de matrizes do NumPy
+    libera o GIL, então as threads avançam em paralelo sem copiar os dados nem o modelo entre processos.
+    """
+    X = carregar_matriz(X) if isinstance(X, str) else X
+    y = carregar_matriz(y) if isinstance(y, str) else y
+    n = len(y)
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers <= 1 or n <= tamanho_bloco:
+        return avaliar_em_blocos(motor, X, y, n_classes, tamanho_bloco=tamanho_bloco)
+
+    limites = np.linspace(0, n, max_workers + 1).astype(np.int64)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # Cada thread usa um clone do motor: os buffers de ativação não podem ser compartilhados
+        parciais = pool.map(lambda faixa: avaliar_em_blocos(motor.clonar(), X, y, n_classes, faixa[0], faixa[1],
+                                                            tamanho_bloco),
+                            zip(limites[:-1], limites[1:]))
+        return MatrizConfusao.combinar_todas(parciais)
@@ -0,0 +1,367 @@
+"""Benchmark do pipeline completo sobre dados sintéticos com o formato do CIC-IDS.
+
+O gerador escreve CSVs diários com o mesmo esquema de colunas do conjunto rotulado (identificadores,
+portas e protocolo, contagens inteiras, taxas em ponto flutuante, colunas constantes e o 'Label'),
+a mesma proporção de valores infinitos/nulos e a distribuição desbalanceada das 15 classes
+de 'sampling_strategy'. Cada etapa roda em um processo Python novo, para que o pico de memória
+de uma não contamine a seguinte. O resultado vai para um JSON que pode servir de referência
+para as próximas execuções: etapas mais lentas ou mais pesadas que a referência são sinalizadas.
+"""
+
+import os
+import sys
+import json
+import pickle
+import shutil
+import argparse
+import platform
+import subprocess
+from time import time
+
+import numpy as np
+
+from Configuracao import sampling_strategy, cols_to_remove_manually, MLP_CONFIG, TEST_SIZE, RANDOM_STATE, K_NEIGHBORS
+from Instrumentacao import pico_memoria_mb, pico_memoria_filhos_mb
+
+ARQUIVO_REFERENCIA = 'benchmark_referencia.json'
+PASTA_BENCHMARK = 'benchmark_dados'
+
+CLASSES = ['BENIGN', 'Bot', 'DDoS', 'DoS GoldenEye', 'DoS Hulk', 'DoS Slowhttptest', 'DoS slowloris', 'FTP-Patator',
+           'Heartbleed', 'Infiltration', 'PortScan', 'SSH-Patator', 'Web Attack - Brute Force',
+           'Web Attack - Sql Injection', 'Web Attack - XSS']
+
+# Mesmos dias do conjunto original: as classes aparecem misturadas em todos os arquivos sintéticos
+ARQUIVOS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+
+COLUNAS_IDENTIFICACAO = ['flow_id', 'src_ip', 'dst_ip', 'timestamp']
+COLUNAS_PORTAS = ['src_port', 'dst_port', 'protocol']
+COLUNAS_INTEIRAS = [
+    'flow_duration', 'total_fwd_packets', 'total_bwd_packets', 'total_length_fwd_packets',
+    'total_length_bwd_packets', 'fwd_packet_length_max', 'fwd_packet_length_min', 'bwd_packet_length_max',
+    'bwd_packet_length_min', 'flow_iat_max', 'flow_iat_min', 'fwd_iat_total', 'fwd_iat_max', 'fwd_iat_min',
+    'bwd_iat_total', 'bwd_iat_max', 'bwd_iat_min', 'fwd_psh_flags', 'fwd_header_length', 'bwd_header_length',
+    'min_packet_length', 'max_packet_length', 'fin_flag_count', 'syn_flag_count', 'rst_flag_count',
+    'psh_flag_count', 'ack_flag_count', 'urg_flag_count', 'ece_flag_count', 'subflow_fwd_packets',
+    'subflow_fwd_bytes', 'subflow_bwd_packets', 'subflow_bwd_bytes', 'init_win_bytes_forward',
+    'init_win_bytes_backward', 'act_data_pkt_fwd', 'min_seg_size_forward', 'active_max', 'active_min',
+    'idle_max', 'idle_min',
+]
+COLUNAS_REAIS = [
+    'flow_bytes_s', 'flow_packets_s', 'fwd_packet_length_mean', 'fwd_packet_length_std',
+    'bwd_packet_length_mean', 'bwd_packet_length_std', 'flow_iat_mean', 'flow_iat_std', 'fwd_iat_mean',
+    'fwd_iat_std', 'bwd_iat_mean', 'bwd_iat_std', 'fwd_packets_s', 'bwd_packets_s', 'packet_length_mean',
+    'packet_length_std', 'packet_length_variance', 'down_up_ratio', 'average_packet_size',
+    'avg_fwd_segment_size', 'avg_bwd_segment_size', 'active_mean', 'active_std', 'idle_mean', 'idle_std',
+]
+# Sempre zero no conjunto original e removidas pelo filtro de variância
+COLUNAS_CONSTANTES = ['bwd_psh_flags', 'fwd_urg_flags', 'bwd_urg_flags', 'cwe_flag_count',
+                      'fwd_avg_bytes_bulk', 'fwd_avg_packets_bulk', 'fwd_avg_bulk_rate',
+                      'bwd_avg_bytes_bulk', 'bwd_avg_packets_bulk', 'bwd_avg_bulk_rate']
+# Colunas de taxa onde aparecem os 'Infinity' e vazios (divisão por uma duração zero)
+COLUNAS_INVALIDAS = ['flow_bytes_s', 'flow_packets_s']
+
+TAXA_INVALIDOS = 0.0012
+MINIMO_POR_CLASSE = 20
+TAMANHO_BLOCO_GERACAO = 200_000
+
+ETAPAS = ['carregamento', 'variancia', 'limpeza', 'divisao', 'smote', 'escalonamento', 'treino', 'predicao',
+          'avaliacao']
+
+
+def proporcoes_das_classes():
+    """Proporção de cada classe, na ordem de CLASSES, a partir das contagens de 'sampling_strategy'."""
+    contagens = np.array([sampling_strategy[i] for i in range(len(CLASSES))], dtype=np.float64)
+    return contagens / contagens.sum()
+
+
+def gerar_csvs(pasta, linhas, taxa_invalidos=TAXA_INVALIDOS, semente=42):
+    """Escreve len(ARQUIVOS) CSVs sintéticos somando 'linhas' linhas e devolve os caminhos."""
+    import pandas as pd
+
+    os.makedirs(pasta, exist_ok=True)
+    rng = np.random.default_rng(semente)
+    proporcoes = proporcoes_das_classes()
+    n_classes = len(CLASSES)
+    colunas_numericas = COLUNAS_INTEIRAS + COLUNAS_REAIS
+    # Cada classe tem o seu "perfil de tráfego": uma escala típica por característica
+    centros = rng.lognormal(mean=3.0, sigma=2.0, size=(n_classes, len(colunas_numericas)))
+    portas_destino = rng.integers(1, 1024, size=n_classes)
+
+    caminhos = []
+    por_arquivo = np.diff(np.linspace(0, linhas, len(ARQUIVOS) + 1).astype(np.int64))
+    for dia, total in zip(ARQUIVOS, por_arquivo):
+        caminho = os.path.join(pasta, f'{dia}-WorkingHours.pcap_REVI.csv')
+        gerados = 0
+        while gerados < total:
+            n = int(min(TAMANHO_BLOCO_GERACAO, total - gerados))
+            y = rng.choice(n_classes, size=n, p=proporcoes)
+            if gerados == 0:
+                # Garante algumas amostras de cada classe rara em todos os arquivos (estratificação e SMOTE)
+                minimo = min(MINIMO_POR_CLASSE // len(ARQUIVOS) + 1, n // n_classes)
+                y[:minimo * n_classes] = np.tile(np.arange(n_classes), minimo)
+
+            valores = centros[y] * rng.lognormal(0.0, 0.5, size=(n, len(colunas_numericas)))
+            bloco = pd.DataFrame(valores, columns=colunas_numericas)
+            bloco[COLUNAS_INTEIRAS] = np.rint(bloco[COLUNAS_INTEIRAS]).astype(np.int64)
+            for coluna in COLUNAS_INVALIDAS:
+                sorteio = rng.random(n)
+                bloco.loc[sorteio < taxa_invalidos / 2, coluna] = np.inf
+                bloco.loc[(sorteio >= taxa_invalidos / 2) & (sorteio < taxa_invalidos), coluna] = np.nan
+            for coluna in COLUNAS_CONSTANTES:
+                bloco[coluna] = 0
+
+            indice = np.arange(gerados, gerados + n)
+            identificacao = pd.DataFrame({
+                'flow_id': [f'{dia}-{i}' for i in indice],
+                'src_ip': [f'192.168.{(i >> 8) & 255}.{i & 255}' for i in indice],
+                'dst_ip': [f'10.0.{c}.{i & 255}' for c, i in zip(y, indice)],
+                'timestamp': pd.Timestamp('2017-07-03') + pd.to_timedelta(indice, unit='ms'),
+                'src_port': rng.integers(1024, 65536, size=n),
+                'dst_port': portas_destino[y],
+                'protocol': np.where(rng.random(n) < 0.8, 6, 17),
+            })
+            bloco = pd.concat([identificacao, bloco], axis=1)
+            bloco['Label'] = np.array(CLASSES, dtype=object)[y]
+
+            bloco.to_csv(caminho, mode='w' if gerados == 0 else 'a', header=gerados == 0, index=False)
+            gerados += n
+        caminhos.append(caminho)
+    return caminhos
+
+
+# Cada etapa lê e grava os seus artefatos em 'pasta' e devolve o número de linhas processadas.
+# O que uma etapa precisa passar para a próxima (além dos artefatos) fica em 'estado.pkl'.
+
+def _ler_estado(pasta):
+    with open(os.path.join(pasta, 'estado.pkl'), 'rb') as f:
+        return pickle.load(f)
+
+
+def _gravar_estado(pasta, estado):
+    with open(os.path.join(pasta, 'estado.pkl'), 'wb') as f:
+        pickle.dump(estado, f)
+
+
+def _etapa_carregamento(pasta, opcoes):
+    from Leitura_Paralela import inferir_esquema, carregar_em_paralelo
+
+    caminhos = [os.path.join(pasta, 'csv', f) for f in sorted(os.listdir(os.path.join(pasta, 'csv')))]
+    esquema = inferir_esquema(caminhos[0])
+    resumos = carregar_em_paralelo(caminhos, os.path.join(pasta, 'partes'), esquema)
+    _gravar_estado(pasta, {'esquema': esquema, 'resumos': resumos})
+    return sum(r['linhas_lidas'] for r in resumos)
+
+
+def _etapa_variancia(pasta, opcoes):
+    from Estatisticas import PerfilColunas
+
+    estado = _ler_estado(pasta)
+    colunas_numericas = estado['resumos'][0]['colunas_numericas']
+    perfil = PerfilColunas.combinar_todos(r['perfil'] for r in estado['resumos'])
+    estado['colunas_x'] = [col for col, cte in zip(colunas_numericas, perfil.constantes)
+                           if not cte and col not in cols_to_remove_manually]
+    _gravar_estado(pasta, estado)
+    return sum(r['linhas_mantidas'] for r in estado['resumos'])
+
+
+def _etapa_limpeza(pasta, opcoes):
+    from Leitura_Paralela import unificar_partes
+
+    estado = _ler_estado(pasta)
+    classes = sorted({nome for r in estado['resumos'] for nome in r['classes']})
+    linhas = unificar_partes(estado['resumos'], estado['colunas_x'], classes,
+                             os.path.join(pasta, 'CICIDS_X'), os.path.join(pasta, 'CICIDS_y'))
+    shutil.rmtree(os.path.join(pasta, 'partes'), ignore_errors=True)
+    return linhas
+
+
+def _etapa_divisao(pasta, opcoes):
+    from Artefatos import carregar_matriz, carregar_metadados, salvar_matriz
+    from Divisao import dividir_estratificado, reunir
+
+    X = carregar_matriz(os.path.join(pasta, 'CICIDS_X'))
+    y = carregar_matriz(os.path.join(pasta, 'CICIDS_y'))
+    meta = carregar_metadados(os.path.join(pasta, 'CICIDS_y'))
+    # Mesma divisão do Script 2 (só índices); aqui as linhas são copiadas porque cada etapa roda em outro processo
+    treino, teste, _ = dividir_estratificado(y, TEST_SIZE, RANDOM_STATE)
+    reunir(X, treino, os.path.join(pasta, 'X_train'))
+    reunir(X, teste, os.path.join(pasta, 'X_test'))
+    salvar_matriz(os.path.join(pasta, 'y_train'), np.asarray(y[treino]), classes=meta['classes'])
+    salvar_matriz(os.path.join(pasta, 'y_test'), np.asarray(y[teste]), classes=meta['classes'])
+    return len(y)
+
+
+def _etapa_smote(pasta, opcoes):
+    from Artefatos import carregar_matriz
+    from Sobreamostragem import smote_em_disco
+
+    X_train = carregar_matriz(os.path.join(pasta, 'X_train'))
+    y_train = carregar_matriz(os.path.join(pasta, 'y_train'))
+    # Mesma regra da estratégia do Script 2 para as classes ultra-raras: no mínimo 300 amostras
+    contagens = np.bincount(y_train, minlength=len(CLASSES))
+    estrategia = {c: max(int(n), 300) for c, n in enumerate(contagens) if n > K_NEIGHBORS}
+    X_res, _ = smote_em_disco(X_train, y_train, estrategia, os.path.join(pasta, 'X_train_scaled'),
+                              os.path.join(pasta, 'y_train_res'), k_neighbors=K_NEIGHBORS, random_state=RANDOM_STATE)
+    return len(X_res)
+
+
+def _etapa_escalonamento(pasta, opcoes):
+    from Artefatos import carregar_matriz, criar_matriz
+    from Escalonamento import EscalonadorStreaming
+
+    X_train = np.load(os.path.join(pasta, 'X_train_scaled.npy'), mmap_mode='r+')
+    X_test = carregar_matriz(os.path.join(pasta, 'X_test'))
+    escalonador = EscalonadorStreaming([str(i) for i in range(X_train.shape[1])])
+    escalonador.ajustar_em_blocos(X_train)
+    escalonador.transformar_em_blocos(X_train, X_train)
+    X_test_scaled = criar_matriz(os.path.join(pasta, 'X_test_scaled'), len(X_test), X_train.shape[1])
+    escalonador.transformar_em_blocos(X_test, X_test_scaled)
+    X_test_scaled.flush()
+    return len(X_train) + len(X_test)
+
+
+def _etapa_treino(pasta, opcoes):
+    from sklearn.neural_network import MLPClassifier
+    from Treino_Streaming import treinar_em_minilotes
+
+    X = np.load(os.path.join(pasta, 'X_train_scaled.npy'), mmap_mode='r')
+    y = np.load(os.path.join(pasta, 'y_train_res.npy'), mmap_mode='r')
+    config = dict(MLP_CONFIG, verbose=False, max_iter=opcoes['epocas'])
+    mlp = treinar_em_minilotes(MLPClassifier(**config), X, y, classes=np.arange(len(CLASSES)),
+                               epocas=opcoes['epocas'], checkpoint=None, verbose=False)
+    with open(os.path.join(pasta, 'mlp.pkl'), 'wb') as f:
+        pickle.dump(mlp, f)
+    return len(y) * len(mlp.loss_curve_)
+
+
+def _motor(pasta):
+    from Inferencia import MotorInferencia
+
+    with open(os.path.join(pasta, 'mlp.pkl'), 'rb') as f:
+        return MotorInferencia.de_mlp(pickle.load(f), CLASSES)
+
+
+def _etapa_predicao(pasta, opcoes):
+    from Artefatos import criar_matriz
+
+    X_test = np.load(os.path.join(pasta, 'X_test_scaled.npy'), mmap_mode='r')
+    y_pred = criar_matriz(os.path.join(pasta, 'y_pred'), len(X_test), 0, dtype=np.int64)
+    _motor(pasta).prever_indices(X_test, out=y_pred)
+    y_pred.flush()
+    return len(X_test)
+
+
+def _etapa_avaliacao(pasta, opcoes):
+    from Avaliacao import MatrizConfusao, TAMANHO_BLOCO
+
+    y_test = np.load(os.path.join(pasta, 'y_test.npy'), mmap_mode='r')
+    y_pred = np.load(os.path.join(pasta, 'y_pred.npy'), mmap_mode='r')
+    matriz = MatrizConfusao(len(CLASSES))
+    for inicio in range(0, len(y_test), TAMANHO_BLOCO):
+        matriz.atualizar(y_test[inicio:inicio + TAMANHO_BLOCO], y_pred[inicio:inicio + TAMANHO_BLOCO])
+    matriz.salvar(os.path.join(pasta, 'metricas.json'), CLASSES)
+    return matriz.total
+
+
+def _medir_etapa(etapa, pasta, opcoes):
+    # Executado em um processo Python novo (ver executar_benchmark)
+    funcao = globals()[f'_etapa_{etapa}']
+    inicio = time()
+    linhas = funcao(pasta, opcoes)
+    segundos = time() - inicio
+    return {'segundos': segundos, 'linhas': int(linhas),
+            'linhas_por_segundo': linhas / segundos if segundos > 0 else float('nan'),
+            'pico_rss_mb': pico_memoria_mb(), 'pico_rss_processos_filhos_mb': pico_memoria_filhos_mb()}
+
+
+def executar_benchmark(linhas, pasta=PASTA_BENCHMARK, epocas=3, semente=42, etapas=ETAPAS, manter=False):
+    """Gera os dados sintéticos, mede cada etapa e devolve o resultado no formato do JSON de referência."""
+    shutil.rmtree(pasta, ignore_errors=True)
+    inicio = time()
+    gerar_csvs(os.path.join(pasta, 'csv'), linhas, semente=semente)
+    print(f"{linhas} linhas sintéticas geradas em {time() - inicio:.1f} s.")
+
+    opcoes = json.dumps({'epocas': epocas})
+    resultado = {
+        'linhas': linhas,
+        'epocas': epocas,
+        'ambiente': {'python': platform.python_version(), 'numpy': np.__version__, 'cpus': os.cpu_count(),
+                     'sistema': platform.platform()},
+        'etapas': {},
+    }
+    try:
+        for etapa in etapas:
+            saida = subprocess.run([sys.executable, os.path.abspath(__file__), '--medir', etapa, pasta, opcoes],
+                                   capture_output=True, text=True)
+            if saida.returncode != 0:
+                raise RuntimeError(f"A etapa '{etapa}' falhou:\n{saida.stderr}")
+            medida = json.loads(saida.stdout.strip().splitlines()[-1])
+            resultado['etapas'][etapa] = medida
+            print(f"{etapa:>14}: {medida['segundos']:8.2f} s | {medida['linhas_por_segundo']:>14,.0f} linhas/s | "
+                  f"pico RSS {medida['pico_rss_mb']:.0f} MB (filhos: {medida['pico_rss_processos_filhos_mb']:.0f} MB)")
+    finally:
+        if not manter:
+            shutil.rmtree(pasta, ignore_errors=True)
+    return resultado
+
+
+def comparar_com_referencia(resultado, referencia, tolerancia=0.2):
+    """Lista as etapas que ficaram mais de 'tolerancia' mais lentas ou mais pesadas que a referência."""
+    if referencia['linhas'] != resultado['linhas'] or referencia.get('epocas') != resultado.get('epocas'):
+        raise ValueError(f"A referência foi medida com {referencia['linhas']} linhas e {referencia.get('epocas')} "
+                         f"épocas; esta execução usou {resultado['linhas']} e {resultado.get('epocas')}.")
+    regressoes = []
+    for etapa, medida in resultado['etapas'].items():
+        base = referencia['etapas'].get(etapa)
+        if base is None:
+            continue
+        for metrica in ('segundos', 'pico_rss_mb', 'pico_rss_processos_filhos_mb'):
+            atual, anterior = medida[metrica], base[metrica]
+            if anterior > 0 and atual > anterior * (1 + tolerancia):
+                regressoes.append({'etapa': etapa, 'metrica': metrica, 'referencia': anterior, 'atual': atual,
+                                   'variacao': atual / anterior - 1})
+    return regressoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline sobre dados sintéticos no formato do CIC-IDS.")
+    parser.add_argument('--linhas', type=int, default=100_000, help="Total de linhas sintéticas (de 10 mil a 10 milhões).")
+    parser.add_argument('--epocas', type=int, default=3, help="Épocas de treino do MLP.")
+    parser.add_argument('--etapas', nargs='+', choices=ETAPAS, default=ETAPAS)
+    parser.add_argument('--pasta', default=PASTA_BENCHMARK)
+    parser.add_argument('--manter', action='store_true', help="Não apaga os dados e artefatos gerados.")
+    parser.add_argument('--saida', default='benchmark_resultado.json')
+    parser.add_argument('--referencia', default=ARQUIVO_REFERENCIA)
+    parser.add_argument('--salvar-referencia', action='store_true', help="Grava este resultado como a nova referência.")
+    parser.add_argument('--tolerancia', type=float, default=0.2, help="Piora relativa aceita antes de sinalizar regressão.")
+    parser.add_argument('--medir', nargs=3, metavar=('ETAPA', 'PASTA', 'OPCOES'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir:
+        etapa, pasta, opcoes = args.medir
+        print(json.dumps(_medir_etapa(etapa, pasta, json.loads(opcoes))))
+        sys.exit()
+
+    resultado = executar_benchmark(args.linhas, args.pasta, args.epocas, etapas=args.etapas, manter=args.manter)
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    print(f"\nResultado salvo em '{args.saida}'.")
+
+    if args.salvar_referencia:
+        shutil.copyfile(args.saida, args.referencia)
+        print(f"Referência atualizada em '{args.referencia}'.")
+    elif os.path.exists(args.referencia):
+        with open(args.referencia, encoding='utf-8') as f:
+            referencia = json.load(f)
+        try:
+            regressoes = comparar_com_referencia(resultado, referencia, args.tolerancia)
+        except ValueError as e:
+            print(f"Comparação com a referência ignorada: {e}")
+            sys.exit()
+        if regressoes:
+            print(f"\n{len(regressoes)} regressões em relação a '{args.referencia}':")
+            for r in regressoes:
+                print(f"  {r['etapa']:>14} {r['metrica']:<30} {r['referencia']:10.2f} -> {r['atual']:10.2f} "
+                      f"(+{r['variacao']:.0%})")
+            sys.exit(1)
+        print(f"Nenhuma regressão acima de {args.tolerancia:.0%} em relação a '{args.referencia}'.")
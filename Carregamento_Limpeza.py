@@ -1,126 +1,148 @@
-print("Iniciando o Script 1: Carregamento e Limpeza")
-
 import pandas as pd
-import numpy as np
 import os
+import shutil
 from time import time
-from sklearn.feature_selection import VarianceThreshold
 import warnings
 
+from Leitura_Paralela import inferir_esquema, carregar_em_paralelo, unificar_partes, pico_memoria_mb, TAMANHO_BLOCO
+from Artefatos import exportar_csv
+from Estatisticas import PerfilColunas
+from Configuracao import DATA_PATH, filenames, cols_to_remove_manually
+from Instrumentacao import etapa
+from Monitor_Deriva import criar_referencia, ARQUIVO_REFERENCIA
+
 warnings.filterwarnings('ignore', category=pd.errors.DtypeWarning)
 warnings.filterwarnings('ignore', category=FutureWarning)
 
-DATA_PATH = "/home/deborahmirella/Área de trabalho/IC2025/WTMC2021-Code/LabelledDataset/"
-filenames = [
-   "Friday-WorkingHours.pcap_REVI.csv", 
-   "Monday-WorkingHours.pcap_REVI.csv",
-   "Thursday-WorkingHours.pcap_REVI.csv", 
-   "Tuesday-WorkingHours.pcap_REVI.csv",
-   "Wednesday-WorkingHours.pcap_REVI.csv"
-]
-
-print("Iniciando Etapa 1: Carregamento e Unificação")
-start_time = time()
-
-list_of_dfs = []
-for file in filenames:
-    file_path = os.path.join(DATA_PATH, file)
-    try:
-        print(f"Carregando: {file}")
-        df_temp = pd.read_csv(file_path, low_memory=False)
-        df_temp.columns = df_temp.columns.str.strip()
-        list_of_dfs.append(df_temp)
-    except FileNotFoundError:
-        print(f"O arquivo '{file}' não foi encontrado. Pulando.")
-    except Exception as e:
-        print(f"Erro ao carregar '{file}': {e}. Pulando.")
-
-if not list_of_dfs:
-    print("\nNenhum dado foi carregado.")
-    exit()
-
-print("\nConcatenando os DataFrames")
-df = pd.concat(list_of_dfs, ignore_index=True)
-print(f"Unificação concluída. Dimensão atual: {df.shape}")
-
-print("\nIniciando Etapa 2: Limpeza e Tratamento")
-
-# 1. Tratamento da Integridade das Amostras (Linhas)
-
-# Trata valores nulos e infinitos
-print("Tratando valores nulos e infinitos")
-
-# Esta linha executa uma padronização de valores inválidos. Durante a extração de características de rede, operações como divisão por zero podem gerar valores de infinito (np.inf) e infinito negativo (-np.inf). 
-# Este comando substitui todas as ocorrências desses valores pelo marcador padrão de dados ausentes do Pandas, np.nan (Not a Number), unificando todos os dados problemáticos sob uma única representação
-df.replace([np.inf, -np.inf], np.nan, inplace=True)
-
-# Guarda o número de linhas ANTES da remoção
-# Para fins de documentação e transparência, esta linha registra o número total de amostras (linhas) presentes no DataFrame antes da etapa de remoção. 
-# O atributo .shape retorna as dimensões (linhas, colunas), e o índice [0] seleciona especificamente a contagem de linhas.
-linhas_antes = df.shape[0]
-
-# Remove as linhas com dados nulos
-# Este comando itera sobre cada linha do DataFrame e remove, de forma definitiva (inplace=True), qualquer linha que contenha ao menos um valor np.nan. 
-# Esta operação é crucial, pois os algoritmos de redes neurais não podem processar dados ausentes, e garante que apenas amostras completas e íntegras prossigam para o treinamento.
-df.dropna(inplace=True)
-
-# Calcula e informa quantas linhas foram removidas
-linhas_removidas = linhas_antes - df.shape[0]
-print(f"Verificação de integridade concluída. Removidas {linhas_removidas} linhas com dados nulos/infinitos.")
-
-# 2. Tratamento da Relevância das Características (Colunas)
-
-# Remoção de Colunas de Baixa Variância
-print("Procurando por colunas com variância zero (constantes)")
-
-# Essa parte eu não entendi muito bem 
-
-if 'Label' in df.columns: # Inicia-se uma verificação de segurança para garantir a presença da variável alvo
-    X_numeric = df.drop(columns=['Label']).select_dtypes(include=np.number) # Esta linha isola as características preditoras que serão analisadas. Primeiramente, a coluna alvo (Label) é temporariamente removida (.drop()). Em seguida, o método .select_dtypes(include=np.number) filtra o resultado, criando um novo DataFrame X_numeric que contém exclusivamente as colunas de tipo numérico.
-    y_labels = df['Label'] #  A variável alvo é armazenada de forma segura para ser reincorporada ao DataFrame após a limpeza das características
-else:
-    X_numeric = df.select_dtypes(include=np.number)
-    y_labels = None
-
-selector = VarianceThreshold() # Uma instância da classe VarianceThreshold do Scikit-learn é criada. Este algoritmo de seleção de características é projetado para remover todas as features cuja variância não atinge um certo limiar. Por padrão, o limiar é zero
-selector.fit(X_numeric) # Esta é a fase de análise. O objeto selector calcula a variância para cada uma das colunas no DataFrame X_numeric e internamente identifica quais delas possuem variância zero.
-cols_to_keep_auto = X_numeric.columns[selector.get_support()] # O método .get_support() retorna uma máscara booleana (um vetor de True/False), onde True corresponde às colunas com variância superior ao limiar. Ao aplicar esta máscara aos nomes das colunas de X_numeric, geramos uma lista final (cols_to_keep_auto) contendo apenas os nomes das características informativas que devem ser mantidas
-colunas_removidas_auto = sorted(list(set(X_numeric.columns) - set(cols_to_keep_auto)))
-
-if colunas_removidas_auto:
-    print(f"\nRemoção automática ({len(colunas_removidas_auto)} colunas):")
-    print(f"Motivo: Variância zero (colunas constantes, sem informação).")
-    print(f"Colunas Removidas: {colunas_removidas_auto}")
-else:
-    print("\nRemoção automática: Nenhuma coluna com variância zero foi encontrada.")
-
-# Reconstrói o DataFrame com as colunas relevantes
-df = df[list(cols_to_keep_auto)]
-if y_labels is not None:
-    df['Label'] = y_labels
-
-# Remoção manual das colunas solicitadas
-cols_to_remove_manually = ['src_port', 'dst_port', 'protocol']
-# Verifica quais dessas colunas realmente existem no DataFrame para evitar erros
-existing_cols_to_remove = [col for col in cols_to_remove_manually if col in df.columns]
-
-if existing_cols_to_remove:
-    print(f"\nRemoção Manual ({len(existing_cols_to_remove)} colunas):")
-    print(f"Motivo: Solicitado por mim.")
-    print(f"Colunas Removidas: {existing_cols_to_remove}")
-    df.drop(columns=existing_cols_to_remove, inplace=True)
-else:
-    print("\nRemoção ManualL: Nenhuma das colunas solicitadas foi encontrada para remoção.")
-
-    
-print(f"\nLimpeza concluída. Dimensão final: {df.shape}")
+# Pasta temporária onde cada processo grava o seu arquivo já limpo, bloco a bloco
+PASTA_PARTES = 'partes_limpeza'
 
-output_filename = 'CICIDS.csv'
-print(f"\nIniciando Etapa 3: Salvamento")
-print(f"Salvando o DataFrame limpo e unificado em '{output_filename}'.")
-df.to_csv(output_filename, index=False)
-end_time = time()
-print(f"Arquivo salvo com sucesso! Processo total levou {end_time - start_time:.2f} segundos.")
-print("\nScript Concluído")
+# Artefatos de saída: as características em float32 (CICIDS_X.npy) e os rótulos codificados (CICIDS_y.npy),
+# cada um com um arquivo .json de metadados (nomes das colunas, classes).
+ARTEFATO_X = 'CICIDS_X'
+ARTEFATO_Y = 'CICIDS_y'
 
+# O CSV deixou de ser o formato intermediário. Ative apenas se precisar abrir os dados em outra ferramenta.
+EXPORTAR_CSV = False
+output_filename = 'CICIDS.csv'
 
+# Perfil das características (média, variância, mínimo, máximo, nulos e infinitos), reaproveitado pelas próximas etapas
+ARQUIVO_PERFIL = 'perfil_CICIDS.json'
+
+# O bloco principal fica protegido pelo "if __name__" porque o pool de processos
+# pode importar este arquivo de novo dentro de cada processo filho.
+if __name__ == "__main__":
+    print("Iniciando o Script 1: Carregamento e Limpeza")
+
+    print("Iniciando Etapa 1: Carregamento, Limpeza por blocos e Unificação")
+    start_time = time()
+
+    caminhos = []
+    for file in filenames:
+        file_path = os.path.join(DATA_PATH, file)
+        if os.path.exists(file_path):
+            caminhos.append(file_path)
+        else:
+            print(f"O arquivo '{file}' não foi encontrado. Pulando.")
+
+    if not caminhos:
+        print("\nNenhum dado foi carregado.")
+        exit()
+
+    # O esquema (tipo de cada coluna) é descoberto uma única vez e compartilhado por todos os processos.
+    # Colunas numéricas são lidas como float32 e o 'Label' vira categoria, o que reduz bastante a memória de cada bloco.
+    esquema = inferir_esquema(caminhos[0])
+
+    # 1. Tratamento da Integridade das Amostras (Linhas)
+
+    # Cada arquivo é lido em um processo separado, em blocos de TAMANHO_BLOCO linhas.
+    # Em cada bloco os valores infinitos (gerados, por exemplo, por divisões por zero na extração das características)
+    # são tratados como nulos e qualquer linha com dado nulo/infinito é removida, pois a rede neural não processa dados ausentes.
+    # O bloco limpo é gravado imediatamente em disco, então nenhum processo guarda o arquivo inteiro na memória.
+    print(f"Lendo {len(caminhos)} arquivos em paralelo (blocos de {TAMANHO_BLOCO} linhas)")
+    with etapa('carregamento') as medida:
+        resumos = carregar_em_paralelo(caminhos, PASTA_PARTES, esquema)
+        medida.linhas_saida = sum(r['linhas_mantidas'] for r in resumos)
+
+    if not resumos:
+        print("\nNenhum dado foi carregado.")
+        exit()
+
+    linhas_antes = sum(r['linhas_lidas'] for r in resumos)
+    linhas_depois = sum(r['linhas_mantidas'] for r in resumos)
+    linhas_removidas = linhas_antes - linhas_depois
+    print(f"\nUnificação concluída. {linhas_depois} linhas válidas de {len(resumos)} arquivos.")
+    print(f"Verificação de integridade concluída. Removidas {linhas_removidas} linhas com dados nulos/infinitos.")
+
+    print("\nIniciando Etapa 2: Limpeza e Tratamento")
+
+    # 2. Tratamento da Relevância das Características (Colunas)
+
+    # Remoção de Colunas de Baixa Variância
+    print("Procurando por colunas com variância zero (constantes)")
+
+    # Cada processo já calculou, na mesma passada da limpeza, a contagem, a média e o M2 (Welford) de cada coluna
+    # numérica do seu arquivo. Os perfis são combinados (fórmula de Chan) sem montar o DataFrame completo,
+    # e sem as cópias que o VarianceThreshold exigia. Variância zero equivale a mínimo igual ao máximo.
+    colunas_numericas = resumos[0]['colunas_numericas']
+    with etapa('variancia', colunas=len(colunas_numericas)):
+        perfil = PerfilColunas.combinar_todos(r['perfil'] for r in resumos)
+        constantes = perfil.constantes
+        perfil.salvar(ARQUIVO_PERFIL)
+    print(f"Perfil das colunas salvo em '{ARQUIVO_PERFIL}'.")
+
+    cols_to_keep_auto = [col for col, cte in zip(colunas_numericas, constantes) if not cte]
+    colunas_removidas_auto = sorted(col for col, cte in zip(colunas_numericas, constantes) if cte)
+
+    if colunas_removidas_auto:
+        print(f"\nRemoção automática ({len(colunas_removidas_auto)} colunas):")
+        print(f"Motivo: Variância zero (colunas constantes, sem informação).")
+        print(f"Colunas Removidas: {colunas_removidas_auto}")
+    else:
+        print("\nRemoção automática: Nenhuma coluna com variância zero foi encontrada.")
+
+    # Verifica quais dessas colunas realmente existem para evitar erros
+    existing_cols_to_remove = [col for col in cols_to_remove_manually if col in cols_to_keep_auto]
+
+    if existing_cols_to_remove:
+        print(f"\nRemoção Manual ({len(existing_cols_to_remove)} colunas):")
+        print(f"Motivo: Solicitado por mim.")
+        print(f"Colunas Removidas: {existing_cols_to_remove}")
+    else:
+        print("\nRemoção ManualL: Nenhuma das colunas solicitadas foi encontrada para remoção.")
+
+    colunas_finais = [col for col in cols_to_keep_auto if col not in existing_cols_to_remove]
+    if 'Label' in esquema:
+        colunas_finais.append('Label')
+
+    print(f"\nLimpeza concluída. Dimensão final: {(linhas_depois, len(colunas_finais))}")
+
+    print(f"\nIniciando Etapa 3: Salvamento")
+    print(f"Salvando o conjunto limpo e unificado em '{ARTEFATO_X}.npy' e '{ARTEFATO_Y}.npy'.")
+
+    # Os rótulos são codificados em ordem alfabética, exatamente como o LabelEncoder faria (0 a 14).
+    classes = sorted({nome for r in resumos for nome in r['classes']})
+    colunas_x = [col for col in colunas_finais if col != 'Label']
+    inteiras = [col for col in colunas_x if esquema[col] == 'int32']
+
+    # As partes limpas são copiadas em blocos, já com as colunas finais, na mesma ordem da lista 'filenames'
+    with etapa('unificacao', linhas_entrada=linhas_depois, colunas=len(colunas_x)) as medida:
+        medida.linhas_saida = unificar_partes(resumos, colunas_x, classes, ARTEFATO_X, ARTEFATO_Y, inteiras=inteiras,
+                                              linhas_removidas=linhas_removidas, arquivos=[r['arquivo'] for r in resumos],
+                                              esquema=esquema)
+
+    # Distribuição de cada característica e das classes, comparada depois com o tráfego classificado (Monitor_Deriva)
+    with etapa('referencia_deriva', linhas_entrada=linhas_depois):
+        criar_referencia(ARTEFATO_X, ARTEFATO_Y, ARQUIVO_PERFIL, ARQUIVO_REFERENCIA)
+    print(f"Perfil de referência para o monitor de deriva salvo em '{ARQUIVO_REFERENCIA}'.")
+
+    if EXPORTAR_CSV:
+        print(f"Exportando também para '{output_filename}'.")
+        exportar_csv(ARTEFATO_X, output_filename, rotulos=ARTEFATO_Y if classes else None)
+
+    shutil.rmtree(PASTA_PARTES, ignore_errors=True)
+
+    end_time = time()
+    print(f"Arquivo salvo com sucesso! Processo total levou {end_time - start_time:.2f} segundos.")
+    print(f"Taxa média: {linhas_antes / (end_time - start_time):,.0f} linhas/s | pico RSS do processo principal: {pico_memoria_mb():.0f} MB")
+    print("\nScript Concluído")
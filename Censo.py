@@ -0,0 +1,160 @@
+"""Censo de classes: contagem exata de cada rótulo lendo apenas a coluna 'Label'.
+
+Para um CSV, o arquivo é dividido em faixas de bytes contadas em paralelo, linha a linha, sem converter
+nenhuma característica. Para o artefato de rótulos (CICIDS_y.npy), basta um bincount sobre o memmap.
+O resultado fica em um índice pequeno ('<dados>.censo.json') ao lado dos dados e é reaproveitado
+enquanto o tamanho e a data de modificação do arquivo não mudarem.
+"""
+
+import os
+import csv
+import json
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from Configuracao import MINIMO_SMOTE
+
+SUFIXO_INDICE = '.censo.json'
+
+# Tamanho mínimo de cada faixa de bytes: arquivos pequenos não compensam o pool
+TAMANHO_MINIMO_FAIXA = 64 * 1024 ** 2
+
+
+def _campos(linha):
+    # Separação pelo módulo csv: um campo entre aspas pode conter vírgulas, como o pandas aceita
+    return next(csv.reader([linha.decode('utf-8', errors='replace').rstrip('\r\n')]), [])
+
+
+def _posicao_do_rotulo(caminho, coluna='Label'):
+    with open(caminho, 'rb') as f:
+        cabecalho = _campos(f.readline())
+    # Os nomes das colunas têm os espaços removidos, como no Leitura_Paralela
+    nomes = [nome.strip() for nome in cabecalho]
+    if coluna not in nomes:
+        raise ValueError(f"A coluna '{coluna}' não existe em '{caminho}'.")
+    return nomes.index(coluna), len(nomes)
+
+
+def _contar_faixa(caminho, inicio, fim, posicao, n_colunas):
+    # Uma linha pertence à faixa em que está o seu primeiro byte
+    contagem = Counter()
+    ultima = posicao == n_colunas - 1
+    with open(caminho, 'rb') as f:
+        if inicio == 0:
+            f.readline()  # cabeçalho
+        else:
+            f.seek(inicio - 1)
+            f.readline()  # resto da linha que começou na faixa anterior
+        while f.tell() < fim:
+            linha = f.readline()
+            if not linha:
+                break
+            if b'"' in linha:
+                campos = _campos(linha)
+                rotulo = campos[posicao].encode('utf-8') if posicao < len(campos) else b''
+            elif ultima:
+                # Sem aspas, basta separar pelas vírgulas (o caminho comum, bem mais rápido que o csv)
+                rotulo = linha.rstrip(b'\r\n').rpartition(b',')[2]
+            else:
+                rotulo = linha.split(b',', posicao + 1)[posicao]
+            contagem[rotulo] += 1
+    return contagem
+
+
+def contar_csv(caminho, coluna='Label', max_workers=None):
+    """Contagem de cada rótulo de um CSV, em faixas de bytes processadas em paralelo."""
+    posicao, n_colunas = _posicao_do_rotulo(caminho, coluna)
+    tamanho = os.path.getsize(caminho)
+    max_workers = max_workers or os.cpu_count() or 1
+    n_faixas = max(1, min(max_workers, tamanho // TAMANHO_MINIMO_FAIXA))
+    limites = [tamanho * i // n_faixas for i in range(n_faixas + 1)]
+
+    total = Counter()
+    if n_faixas == 1:
+        total.update(_contar_faixa(caminho, 0, tamanho, posicao, n_colunas))
+    else:
+        with ProcessPoolExecutor(max_workers=n_faixas) as pool:
+            for parcial in pool.map(_contar_faixa, [caminho] * n_faixas, limites[:-1], limites[1:],
+                                    [posicao] * n_faixas, [n_colunas] * n_faixas):
+                total.update(parcial)
+
+    contagens = Counter()
+    for rotulo, n in total.items():
+        # O rótulo fica como o pandas o lê no Leitura_Paralela (sem remover espaços); vazio vira nulo
+        # no pandas e a linha é descartada na limpeza, então também não é contado aqui
+        nome = rotulo.decode('utf-8', errors='replace')
+        if nome:
+            contagens[nome] += n
+    return dict(contagens)
+
+
+def contar_artefato(base, tamanho_bloco=10_000_000):
+    """Contagem de cada classe de um artefato de rótulos codificados (com as classes nos metadados)."""
+    import numpy as np
+    from Artefatos import carregar_matriz, carregar_metadados
+
+    y = carregar_matriz(base)
+    # Um artefato vazio não tem máximo: sem classes nos metadados, a contagem fica vazia
+    classes = carregar_metadados(base).get('classes') or [str(i) for i in range(int(y.max()) + 1 if len(y) else 0)]
+    contagens = np.zeros(len(classes), dtype=np.int64)
+    for inicio in range(0, len(y), tamanho_bloco):
+        contagens += np.bincount(y[inicio:inicio + tamanho_bloco], minlength=len(classes))
+    return {nome: int(n) for nome, n in zip(classes, contagens)}
+
+
+def _arquivo_de_dados(fonte):
+    if fonte.endswith('.csv'):
+        return fonte
+    from Artefatos import caminho_dados, carregar_metadados
+    return caminho_dados(fonte, carregar_metadados(fonte).get('formato', 'npy'))
+
+
+def censo(fonte, max_workers=None, refazer=False):
+    """Classes, códigos e contagens de 'fonte' (um CSV ou o nome base de um artefato de rótulos).
+
+    Os códigos seguem a ordem alfabética, a mesma do LabelEncoder e do Script 1.
+    """
+    dados = _arquivo_de_dados(fonte)
+    indice = fonte + SUFIXO_INDICE
+    info = os.stat(dados)
+    assinatura = {'tamanho': info.st_size, 'mtime_ns': info.st_mtime_ns}
+
+    if not refazer and os.path.exists(indice):
+        with open(indice, encoding='utf-8') as f:
+            salvo = json.load(f)
+        if salvo.get('assinatura') == assinatura:
+            return salvo
+
+    contagens = contar_csv(dados, max_workers=max_workers) if dados.endswith('.csv') else contar_artefato(fonte)
+    classes = sorted(contagens)
+    resultado = {
+        'fonte': os.path.basename(dados),
+        'assinatura': assinatura,
+        'total': sum(contagens.values()),
+        'classes': classes,
+        'codigos': {nome: i for i, nome in enumerate(classes)},
+        'contagens': {nome: contagens[nome] for nome in classes},
+    }
+    with open(indice + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    os.replace(indice + '.tmp', indice)
+    return resultado
+
+
+def estrategia_smote(contagens_treino, minimo=MINIMO_SMOTE):
+    """sampling_strategy a partir das contagens do treino: cada classe fica com max(contagem, minimo)."""
+    return {classe: max(int(n), minimo) for classe, n in enumerate(contagens_treino) if n > 0}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Censo de classes lendo apenas a coluna 'Label'.")
+    parser.add_argument('fonte', nargs='?', default='CICIDS_y', help="CSV ou nome base do artefato de rótulos.")
+    parser.add_argument('--processos', type=int, default=None)
+    parser.add_argument('--refazer', action='store_true', help="Ignora o índice salvo e conta de novo.")
+    args = parser.parse_args()
+
+    resultado = censo(args.fonte, args.processos, args.refazer)
+    for nome in resultado['classes']:
+        print(f"Classe {resultado['codigos'][nome]:>2} -> {nome:<28} {resultado['contagens'][nome]:>10}")
+    print(f"Total: {resultado['total']} linhas. Índice em '{args.fonte + SUFIXO_INDICE}'.")
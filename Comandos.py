@@ -0,0 +1,274 @@
+"""Ponto de entrada único do pipeline.
+
+    python Comandos.py load        # Script 1: carregamento e limpeza
+    python Comandos.py prepare     # Script 2: divisão, SMOTE e normalização
+    python Comandos.py train       # Script 3: treino e avaliação
+    python Comandos.py evaluate    # avalia o modelo salvo no conjunto de teste, sem treinar de novo
+    python Comandos.py classes     # dicionário de classes, lido dos metadados (sem abrir os dados)
+    python Comandos.py score fluxos.csv --saida previsoes.csv
+    python Comandos.py score fluxos.csv --deriva   # também mede a deriva em relação ao treino (Monitor_Deriva)
+    python Comandos.py retrain novo_dia.csv        # incorpora um dia novo sem reprocessar o histórico
+
+Cada subcomando importa apenas o que usa: 'classes' não carrega pandas nem scikit-learn,
+e 'score' roda só com NumPy e pandas. 'benchmark-inicio' mede o tempo de partida a frio de cada um.
+"""
+
+import os
+import sys
+import ast
+import json
+import argparse
+import subprocess
+from time import perf_counter
+
+SCRIPTS = {
+    'load': 'Carregamento_Limpeza.py',
+    'prepare': 'Preparação_Normalização.py',
+    'train': 'Treinamento_Avaliação.py',
+}
+ETAPAS_PIPELINE = {'load': 'limpeza', 'prepare': 'preparacao', 'train': 'treinamento'}
+
+ARTEFATO_ROTULOS = 'CICIDS_y'
+ARQUIVO_CLASSES = 'classes.npy'
+
+
+def _executar_script(args):
+    if args.com_cache:
+        from Pipeline import executar
+        return 0 if executar(ate=ETAPAS_PIPELINE[args.comando]) else 1
+    import runpy
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), SCRIPTS[args.comando])
+    runpy.run_path(script, run_name='__main__')
+    return 0
+
+
+def ler_classes():
+    """Nomes das classes na ordem dos códigos: dos metadados dos rótulos ou, na falta deles, de classes.npy."""
+    metadados = ARTEFATO_ROTULOS + '.json'
+    if os.path.exists(metadados):
+        with open(metadados, encoding='utf-8') as f:
+            classes = json.load(f).get('classes')
+        if classes:
+            return classes
+    if os.path.exists(ARQUIVO_CLASSES):
+        import numpy as np
+        return [str(c) for c in np.load(ARQUIVO_CLASSES, allow_pickle=True)]
+    return None
+
+
+def _classes(args):
+    if args.contagens:
+        # Contagens exatas pelo censo (só os rótulos, com índice reaproveitado nas próximas chamadas)
+        from Censo import censo
+        resultado = censo(ARTEFATO_ROTULOS if os.path.exists(ARTEFATO_ROTULOS + '.json') else 'CICIDS.csv')
+        for nome in resultado['classes']:
+            print(f"Classe {resultado['codigos'][nome]} -> {nome} ({resultado['contagens'][nome]} amostras)")
+        return 0
+    classes = ler_classes()
+    if classes is None:
+        print(f"Nenhum dicionário de classes encontrado ('{ARTEFATO_ROTULOS}.json' ou '{ARQUIVO_CLASSES}'). "
+              "Execute 'load' primeiro.")
+        return 1
+    print("Dicionário Oficial de Classes")
+    for indice, nome in enumerate(classes):
+        print(f"Classe {indice} -> {nome}")
+    return 0
+
+
+def _avaliar(args):
+    import pickle
+    import numpy as np
+    from Inferencia import MotorInferencia, ARQUIVO_MLP
+    from Avaliacao import avaliar_em_paralelo
+
+    classes = np.array(ler_classes(), dtype=object)
+    with open(ARQUIVO_MLP, 'rb') as f:
+        mlp = pickle.load(f)
+    # O conjunto de teste já está normalizado: o motor é montado sem o scaler embutido
+    motor = MotorInferencia.de_mlp(mlp, classes)
+    matriz = avaliar_em_paralelo(motor, 'X_test_scaled', 'y_test', n_classes=len(classes), max_workers=args.threads)
+
+    print(f"Acurácia geral: {matriz.acuracia():.4f}\n")
+    print(matriz.relatorio(classes, digitos=4))
+    matriz.salvar(args.saida, classes)
+    print(f"Métricas salvas em '{args.saida}'.")
+    return 0
+
+
+def _pontuar(args):
+    import numpy as np
+    import pandas as pd
+    from Inferencia import MotorInferencia
+
+    motor = MotorInferencia.carregar(args.modelo)
+    if motor.colunas is None:
+        print(f"O modelo '{args.modelo}' não tem o scaler embutido e não pode receber fluxos na escala original.")
+        return 1
+
+    monitor = None
+    if args.deriva:
+        from Monitor_Deriva import PerfilReferencia, MonitorDeriva, ARQUIVO_REFERENCIA
+        monitor = MonitorDeriva(PerfilReferencia.carregar(ARQUIVO_REFERENCIA))
+        if monitor.referencia.colunas != motor.colunas:
+            print(f"As colunas de '{ARQUIVO_REFERENCIA}' não batem com as do modelo '{args.modelo}'.")
+            return 1
+
+    contagens = np.zeros(len(motor.classes), dtype=np.int64)
+    invalidas = 0
+    leitor = pd.read_csv(args.entrada, chunksize=args.tamanho_bloco,
+                         usecols=lambda nome: nome.strip() in set(motor.colunas))
+    with open(args.saida, 'w', newline='') as saida:
+        for numero, bloco in enumerate(leitor):
+            bloco.columns = bloco.columns.str.strip()
+            X = bloco[motor.colunas].to_numpy(dtype=np.float32)
+            validas = np.isfinite(X).all(axis=1)
+            indices = np.full(len(X), -1, dtype=np.int64)
+            indices[validas] = motor.prever_indices(X[validas])
+            contagens += np.bincount(indices[validas], minlength=len(motor.classes))
+            invalidas += int((~validas).sum())
+            if monitor is not None:
+                monitor.atualizar(X, indices[validas])
+            # Linhas com valores nulos/infinitos não são classificadas, como na limpeza do Script 1
+            nomes = np.where(validas, motor.classes[np.maximum(indices, 0)], '')
+            pd.DataFrame({'classe': nomes}).to_csv(saida, header=(numero == 0), index=False)
+
+    print(f"Previsões salvas em '{args.saida}' ({int(contagens.sum())} fluxos, {invalidas} com valores inválidos).")
+    for nome, n in zip(motor.classes, contagens):
+        if n:
+            print(f"  {nome}: {n}")
+    if monitor is not None:
+        resumo = monitor.exportar(args.deriva, entrada=args.entrada)
+        print(f"Deriva em relação ao treino: {resumo['deriva']} (PSI máximo {resumo['psi_maximo']:.4f}); "
+              f"métricas acrescentadas a '{args.deriva}'.")
+    return 0
+
+
+def _retreinar(args):
+    from Retreino_Incremental import retreinar, EPOCAS_INCREMENTAIS, FRACAO_REPLAY
+
+    epocas = EPOCAS_INCREMENTAIS if args.epocas is None else args.epocas
+    replay = FRACAO_REPLAY if args.replay is None else args.replay
+    try:
+        relatorio = retreinar(args.arquivo, epocas, replay, args.forcar, args.checkpoint)
+    except (FileNotFoundError, ValueError) as erro:
+        print(f"ERRO: {erro}")
+        return 1
+    if relatorio is None:
+        return 0
+    print(f"Acurácia no teste: {relatorio['acuracia_teste']:.4f} | só o dia novo: {relatorio['acuracia_dia']:.4f}")
+    reconstrucao = relatorio['reconstrucao_estimada_segundos']
+    economia = '' if reconstrucao is None else f" (reconstrução completa estimada: {reconstrucao:.1f} s)"
+    print(f"Retreino incremental concluído em {relatorio['segundos']:.1f} s{economia}.")
+    return 0
+
+
+def _importacoes(funcao, comando):
+    """Instruções de import que o handler executa antes de começar o trabalho, lidas do próprio código.
+
+    São os imports do corpo da função (os que estão dentro de um 'if' dependem das opções e ficam de fora);
+    para os Scripts 1-3, também os imports do topo do script que o handler executa.
+    """
+    import inspect
+    linhas, primeira = inspect.getsourcelines(funcao)
+    arvore = ast.increment_lineno(ast.parse(''.join(linhas)), primeira - 1)
+    corpo = arvore.body[0].body
+    instrucoes = [no for no in corpo if isinstance(no, (ast.Import, ast.ImportFrom))]
+    if funcao is _executar_script:
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), SCRIPTS[comando])
+        with open(script, encoding='utf-8') as f:
+            instrucoes += [no for no in ast.parse(f.read()).body if isinstance(no, (ast.Import, ast.ImportFrom))]
+    return instrucoes
+
+
+def _so_importar(parser, comando):
+    # Partida a frio do subcomando sem o trabalho: o mesmo ponto de entrada e os mesmos imports do handler
+    subcomandos = next(a for a in parser._actions if isinstance(a, argparse._SubParsersAction))
+    funcao = subcomandos.choices[comando].get_default('funcao')
+    exec(compile(ast.Module(_importacoes(funcao, comando), type_ignores=[]), SCRIPTS.get(comando, __file__), 'exec'),
+         {'__name__': '__partida__'})
+
+
+def medir_partida(comandos, repeticoes=5):
+    """Tempo (mediana, em s) para um processo novo abrir o Comandos.py e executar os imports de cada subcomando."""
+    vazio = [sys.executable, '-c', 'pass']
+    resultados = {}
+    for nome in ['python'] + list(comandos):
+        chamada = vazio if nome == 'python' else [sys.executable, os.path.abspath(__file__), '--somente-importar', nome]
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = perf_counter()
+            subprocess.run(chamada, check=True, capture_output=True)
+            tempos.append(perf_counter() - inicio)
+        resultados[nome] = sorted(tempos)[len(tempos) // 2]
+    return resultados
+
+
+def _benchmark_inicio(args):
+    print(f"Partida a frio ({args.repeticoes} repetições, mediana):")
+    comandos = [nome for nome in args.subcomandos if nome != 'benchmark-inicio']
+    resultados = medir_partida(comandos, args.repeticoes)
+    base = resultados['python']
+    for nome, segundos in resultados.items():
+        extra = '' if nome == 'python' else f" (+{(segundos - base) * 1000:.0f} ms sobre o interpretador)"
+        print(f"  {nome:>9}: {segundos * 1000:7.0f} ms{extra}")
+    return 0
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="Pipeline de detecção de intrusões com MLP sobre o CIC-IDS.")
+    parser.add_argument('--somente-importar', metavar='COMANDO', help=argparse.SUPPRESS)
+    sub = parser.add_subparsers(dest='comando')
+
+    for nome, ajuda in (('load', "Carrega e limpa os CSVs originais (Script 1)."),
+                        ('prepare', "Divide, rebalanceia com SMOTE e normaliza (Script 2)."),
+                        ('train', "Treina o MLP e avalia no conjunto de teste (Script 3).")):
+        p = sub.add_parser(nome, help=ajuda)
+        p.add_argument('--com-cache', action='store_true',
+                       help="Executa pelo Pipeline.py, pulando as etapas que não mudaram.")
+        p.set_defaults(funcao=_executar_script)
+
+    p = sub.add_parser('evaluate', help="Avalia o modelo salvo no conjunto de teste.")
+    p.add_argument('--threads', type=int, default=None)
+    p.add_argument('--saida', default='metricas_teste.json')
+    p.set_defaults(funcao=_avaliar)
+
+    p = sub.add_parser('classes', help="Lista o dicionário de classes.")
+    p.add_argument('--contagens', action='store_true', help="Inclui a contagem de cada classe (censo dos rótulos).")
+    p.set_defaults(funcao=_classes)
+
+    p = sub.add_parser('score', help="Classifica os fluxos de um CSV com o motor de inferência exportado.")
+    p.add_argument('entrada')
+    p.add_argument('--saida', default='previsoes.csv')
+    p.add_argument('--modelo', default='modelo_mlp.npz')
+    p.add_argument('--tamanho-bloco', type=int, default=100_000)
+    p.add_argument('--deriva', nargs='?', const='metricas_deriva.jsonl', default=None, metavar='ARQUIVO',
+                   help="Compara os fluxos com o perfil de treino e acrescenta as métricas de deriva ao ARQUIVO.")
+    p.set_defaults(funcao=_pontuar)
+
+    p = sub.add_parser('retrain', help="Incorpora um novo dia de captura sem reprocessar o histórico.")
+    p.add_argument('arquivo')
+    p.add_argument('--epocas', type=int, help="Padrão: EPOCAS_INCREMENTAIS do Retreino_Incremental.py.")
+    p.add_argument('--replay', type=float, help="Linhas antigas sorteadas para cada linha nova "
+                                                "(padrão: FRACAO_REPLAY do Retreino_Incremental.py).")
+    p.add_argument('--forcar', action='store_true')
+    p.add_argument('--checkpoint', action='store_true',
+                   help="Parte do checkpoint do treino (só se for dos artefatos atuais) em vez do modelo salvo.")
+    p.set_defaults(funcao=_retreinar)
+
+    p = sub.add_parser('benchmark-inicio', help="Mede o tempo de partida a frio de cada subcomando.")
+    p.add_argument('--repeticoes', type=int, default=5)
+    p.set_defaults(funcao=_benchmark_inicio, subcomandos=list(sub.choices))
+    return parser
+
+
+if __name__ == "__main__":
+    parser = criar_parser()
+    args = parser.parse_args()
+
+    if args.somente_importar:
+        _so_importar(parser, args.somente_importar)
+        sys.exit()
+    if args.comando is None:
+        parser.print_help()
+        sys.exit(1)
+    sys.exit(args.funcao(args))
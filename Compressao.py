@@ -0,0 +1,325 @@
+"""Compressão do MLP treinado para sensores de borda: float16, int8 e poda por magnitude.
+
+Cada variante é montada a partir de coefs_/intercepts_ do modelo salvo pelo Script 3, avaliada no
+conjunto de teste (F1 por classe, como no classification_report), medida em tamanho de arquivo e em
+latência por lote, e exportada como um .npz que o MotorInferencia.carregar sabe abrir.
+
+    python Compressao.py                  # float32, float16 e int8, sem poda e com 50% e 80% de poda
+    python Compressao.py --poda 0.9
+    python Compressao.py --verificar      # int8 x float32 em um MLP aleatório, sem precisar dos artefatos
+"""
+
+import os
+import json
+import pickle
+import argparse
+from time import perf_counter
+from types import SimpleNamespace
+
+import numpy as np
+
+from Inferencia import MotorInferencia, _ATIVACOES, ARQUIVO_MLP, TAMANHO_LOTE_MAXIMO
+
+ARQUIVO_RELATORIO = 'relatorio_compressao.json'
+PREFIXO_VARIANTE = 'modelo_mlp_'
+
+LINHAS_CALIBRACAO = 10_000
+# Percentil de |ativação| usado como limite do int8: os poucos valores acima dele são saturados
+PERCENTIL_CALIBRACAO = 99.99
+FORMATOS = ('float32', 'float16', 'int8')
+# Fração mínima de previsões iguais entre int8 e float32 na verificação com um MLP aleatório
+CONCORDANCIA_MINIMA = 0.98
+
+
+class MotorQuantizado(MotorInferencia):
+    """MotorInferencia com pesos int8 (uma escala por neurônio de saída) e ativações int8 calibradas.
+
+    Antes de cada camada a entrada é dividida pela escala calibrada, arredondada e saturada em
+    [-127, 127]. Os pesos int8 ficam guardados como float32 de valores inteiros: o produto de matrizes
+    em float32 dá a mesma soma exata que um acumulador int32 daria (os produtos são inteiros e a soma
+    fica bem abaixo de 2**24), com a velocidade do BLAS. Depois o resultado volta para a escala real
+    multiplicado por escala_ativacao * escala_peso, de cada neurônio.
+
+    A padronização não é embutida na primeira camada, como no motor float32: dividir os pesos pela
+    escala de cada coluna estragaria a quantização. Ela é aplicada à entrada com 'media'/'escala'.
+    """
+
+    def __init__(self, pesos, escalas_pesos, vieses, escalas_ativacoes, classes, ativacao='relu', saida='softmax',
+                 colunas=None, media=None, escala=None, tamanho_lote_maximo=TAMANHO_LOTE_MAXIMO):
+        super().__init__(pesos, vieses, classes, ativacao, saida, colunas, tamanho_lote_maximo)
+        self.escalas_pesos = [np.asarray(s, dtype=np.float32) for s in escalas_pesos]
+        self.escalas_ativacoes = np.asarray(escalas_ativacoes, dtype=np.float32)
+        self.media = None if media is None else np.asarray(media, dtype=np.float32)
+        self.escala = None if escala is None else np.asarray(escala, dtype=np.float32)
+        self._fatores = [s_a * s_w for s_a, s_w in zip(self.escalas_ativacoes, self.escalas_pesos)]
+
+    @classmethod
+    def quantizar(cls, pesos, vieses, classes, X_calibracao, ativacao='relu', saida='softmax', escalonador=None,
+                  percentil=PERCENTIL_CALIBRACAO, **kwargs):
+        """Quantiza os pesos por neurônio e calibra a escala da entrada de cada camada em X_calibracao.
+
+        X_calibracao deve estar padronizado (uma amostra do X_train_scaled).
+        """
+        pesos = [np.asarray(w, dtype=np.float32) for w in pesos]
+        vieses = [np.asarray(b, dtype=np.float32) for b in vieses]
+        pesos_q, escalas_pesos = [], []
+        for w in pesos:
+            escala = np.abs(w).max(axis=0) / 127
+            escala[escala == 0] = 1.0
+            pesos_q.append(np.clip(np.rint(w / escala), -127, 127))
+            escalas_pesos.append(escala)
+
+        # As escalas das ativações vêm da propagação em float32 da amostra de calibração
+        escalas_ativacoes = []
+        entrada = np.asarray(X_calibracao, dtype=np.float32)
+        ativar = _ATIVACOES[ativacao]
+        for i, (w, b) in enumerate(zip(pesos, vieses)):
+            limite = float(np.percentile(np.abs(entrada), percentil))
+            escalas_ativacoes.append(limite / 127 if limite > 0 else 1.0)
+            entrada = entrada @ w + b
+            if i < len(pesos) - 1:
+                ativar(entrada)
+
+        media = escala = colunas = None
+        if escalonador is not None:
+            media, escala, colunas = escalonador.media, escalonador.escala, escalonador.colunas
+        return cls(pesos_q, escalas_pesos, vieses, escalas_ativacoes, classes, ativacao, saida, colunas, media, escala,
+                   **kwargs)
+
+    def clonar(self):
+        return MotorQuantizado(self.pesos, self.escalas_pesos, self.vieses, self.escalas_ativacoes, self.classes,
+                               self.ativacao, self.saida, self.colunas, self.media, self.escala,
+                               self.tamanho_lote_maximo)
+
+    def _propagar(self, lote):
+        n = len(lote)
+        entrada = self._entrada[:n]
+        np.copyto(entrada, lote, casting='unsafe')
+        if self.media is not None:
+            entrada -= self.media
+            entrada /= self.escala
+        ativar = _ATIVACOES[self.ativacao]
+        for i, (w, b) in enumerate(zip(self.pesos, self.vieses)):
+            entrada /= self.escalas_ativacoes[i]
+            np.rint(entrada, out=entrada)
+            np.clip(entrada, -127, 127, out=entrada)
+            camada = self._camadas[i][:n]
+            np.matmul(entrada, w, out=camada)
+            camada *= self._fatores[i]
+            camada += b
+            if i < len(self.pesos) - 1:
+                ativar(camada)
+            entrada = camada
+        return entrada
+
+    def salvar(self, caminho, comprimir=True):
+        """Grava os pesos em int8, com as escalas e a padronização ao lado."""
+        arrays = {f'pesos_{i}': w.astype(np.int8) for i, w in enumerate(self.pesos)}
+        arrays.update({f'escalas_pesos_{i}': s for i, s in enumerate(self.escalas_pesos)})
+        arrays.update({f'vieses_{i}': b for i, b in enumerate(self.vieses)})
+        if self.media is not None:
+            arrays.update(media=self.media, escala=self.escala)
+        gravar = np.savez_compressed if comprimir else np.savez
+        gravar(caminho, formato='int8', classes=np.asarray(self.classes, dtype=str), ativacao=self.ativacao,
+               saida=self.saida, colunas=np.asarray(self.colunas or [], dtype=str),
+               escalas_ativacoes=self.escalas_ativacoes, **arrays)
+
+    @classmethod
+    def carregar(cls, caminho, **kwargs):
+        with np.load(caminho) as dados:
+            n_camadas = sum(1 for chave in dados.files if chave.startswith('pesos_'))
+            return cls([dados[f'pesos_{i}'] for i in range(n_camadas)],
+                       [dados[f'escalas_pesos_{i}'] for i in range(n_camadas)],
+                       [dados[f'vieses_{i}'] for i in range(n_camadas)],
+                       dados['escalas_ativacoes'], dados['classes'], str(dados['ativacao']), str(dados['saida']),
+                       list(dados['colunas']) or None,
+                       dados['media'] if 'media' in dados.files else None,
+                       dados['escala'] if 'escala' in dados.files else None, **kwargs)
+
+
+def podar(pesos, fracao):
+    """Zera, em cada camada, a fração 'fracao' dos pesos de menor valor absoluto (os vieses ficam intactos)."""
+    podados = []
+    for w in pesos:
+        w = np.array(w, dtype=np.float32)
+        k = int(w.size * fracao)
+        if k > 0:
+            menores = np.argpartition(np.abs(w).ravel(), k - 1)[:k]
+            w.ravel()[menores] = 0
+        podados.append(w)
+    return podados
+
+
+def montar_variante(mlp, classes, formato, poda=0.0, X_calibracao=None, escalonador=None, **kwargs):
+    """Motor de uma variante. Sem escalonador, o motor recebe dados já padronizados (como o X_test_scaled)."""
+    pesos = podar(mlp.coefs_, poda) if poda else [np.asarray(w, dtype=np.float32) for w in mlp.coefs_]
+    vieses = [np.asarray(b, dtype=np.float32) for b in mlp.intercepts_]
+    if formato == 'int8':
+        return MotorQuantizado.quantizar(pesos, vieses, classes, X_calibracao, mlp.activation, mlp.out_activation_,
+                                         escalonador, **kwargs)
+    if formato == 'float16':
+        # Os valores passam pela precisão do float16; a conta continua em float32 (o NumPy não tem BLAS em float16)
+        pesos = [w.astype(np.float16) for w in pesos]
+        vieses = [b.astype(np.float16) for b in vieses]
+    elif formato != 'float32':
+        raise ValueError(f"Formato desconhecido: '{formato}'. Use um de {FORMATOS}.")
+    parametros = SimpleNamespace(coefs_=pesos, intercepts_=vieses, activation=mlp.activation,
+                                 out_activation_=mlp.out_activation_)
+    return MotorInferencia.de_mlp(parametros, classes, escalonador, **kwargs)
+
+
+def salvar_variante(motor, formato, caminho):
+    """Exporta a variante (comprimida: os pesos podados, zerados, quase não ocupam espaço) e devolve o tamanho em bytes."""
+    if formato == 'int8':
+        motor.salvar(caminho)
+    else:
+        motor.salvar(caminho, dtype=np.float16 if formato == 'float16' else np.float32, comprimir=True)
+    return os.path.getsize(caminho)
+
+
+def medir_latencia(motor, X, tamanhos=(1, 256, 4096), repeticoes=100, semente=42):
+    """Latência p50/p99 (ms) por tamanho de lote, com lotes sorteados de X."""
+    rng = np.random.default_rng(semente)
+    resultados = {}
+    for tamanho in tamanhos:
+        inicios = rng.integers(0, max(len(X) - tamanho, 1), size=repeticoes)
+        lotes = [np.asarray(X[i:i + tamanho], dtype=np.float32) for i in inicios]
+        saida = np.empty(tamanho, dtype=np.int64)
+        motor.prever_indices(lotes[0], out=saida[:len(lotes[0])])  # aquecimento
+        tempos = np.empty(repeticoes)
+        for i, lote in enumerate(lotes):
+            inicio = perf_counter()
+            motor.prever_indices(lote, out=saida[:len(lote)])
+            tempos[i] = perf_counter() - inicio
+        resultados[tamanho] = {'p50_ms': float(np.percentile(tempos, 50) * 1000),
+                               'p99_ms': float(np.percentile(tempos, 99) * 1000)}
+    return resultados
+
+
+def comparar_variantes(mlp, classes, escalonador, X_calibracao, X_teste, y_teste, formatos=FORMATOS,
+                       podas=(0.0, 0.5, 0.8), tamanhos=(1, 256, 4096), repeticoes=100, pasta='.'):
+    """Avalia, mede e exporta cada combinação de formato e poda. Devolve uma lista de dicionários."""
+    from Avaliacao import avaliar_em_paralelo
+
+    resultados = []
+    for poda in podas:
+        for formato in formatos:
+            nome = formato if not poda else f"{formato}_poda{int(round(poda * 100))}"
+            # A avaliação usa o X_test já padronizado; o arquivo exportado leva a padronização junto
+            motor = montar_variante(mlp, classes, formato, poda, X_calibracao, tamanho_lote_maximo=max(tamanhos))
+            matriz = avaliar_em_paralelo(motor, X_teste, y_teste, n_classes=len(classes))
+            exportado = montar_variante(mlp, classes, formato, poda, X_calibracao, escalonador)
+            caminho = os.path.join(pasta, f"{PREFIXO_VARIANTE}{nome}.npz")
+            medias = matriz.medias()
+            resultados.append({
+                'variante': nome,
+                'formato': formato,
+                'poda': poda,
+                'arquivo': caminho,
+                'tamanho_bytes': salvar_variante(exportado, formato, caminho),
+                'pesos_nao_nulos': int(sum(np.count_nonzero(w) for w in motor.pesos)),
+                'acuracia': float(matriz.acuracia()),
+                'f1_macro': float(medias['macro'][2]),
+                'f1_por_classe': {str(c): float(f) for c, f in zip(classes, matriz.f1())},
+                'latencia': medir_latencia(motor, X_teste, tamanhos, repeticoes),
+            })
+    return resultados
+
+
+def verificar_concordancia(tamanhos=(20, 64, 32, 8), linhas=20_000, ativacao='relu', random_state=0):
+    """Confere o MotorQuantizado contra o motor float32 do mesmo MLP aleatório, sobre dados aleatórios.
+
+    Os dados chegam na escala original (o escalonador também é aleatório), como no Comandos.py score.
+    Devolve a fração de previsões iguais entre int8 e float32, o maior erro de arredondamento dos pesos
+    (em passos da grade int8, no máximo 0.5) e se o .npz em int8 salvo e carregado prevê o mesmo.
+    """
+    import tempfile
+
+    rng = np.random.default_rng(random_state)
+    pesos, vieses = [], []
+    for entrada, saida in zip(tamanhos[:-1], tamanhos[1:]):
+        limite = np.sqrt(6.0 / (entrada + saida))
+        pesos.append(rng.uniform(-limite, limite, (entrada, saida)).astype(np.float32))
+        vieses.append(rng.uniform(-limite, limite, saida).astype(np.float32))
+    mlp = SimpleNamespace(coefs_=pesos, intercepts_=vieses, activation=ativacao, out_activation_='softmax')
+    escalonador = SimpleNamespace(media=rng.normal(0, 100, tamanhos[0]), escala=rng.uniform(0.1, 1000, tamanhos[0]),
+                                  colunas=[f'coluna_{i}' for i in range(tamanhos[0])])
+    classes = np.array([f'classe_{i}' for i in range(tamanhos[-1])])
+
+    X_padronizado = rng.normal(size=(linhas, tamanhos[0])).astype(np.float32)
+    X = (X_padronizado * escalonador.escala + escalonador.media).astype(np.float32)
+    X_calibracao = rng.normal(size=(LINHAS_CALIBRACAO, tamanhos[0])).astype(np.float32)
+
+    referencia = montar_variante(mlp, classes, 'float32', escalonador=escalonador).prever_indices(X)
+    motor = montar_variante(mlp, classes, 'int8', X_calibracao=X_calibracao, escalonador=escalonador)
+    previstos = motor.prever_indices(X)
+    erro_pesos = max(float(np.abs(q - w / s).max()) for q, w, s in zip(motor.pesos, pesos, motor.escalas_pesos))
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'verificacao_int8.npz')
+        motor.salvar(caminho)
+        recarregado = MotorInferencia.carregar(caminho).prever_indices(X)
+    return {'concordancia': float(np.mean(previstos == referencia)), 'erro_pesos': erro_pesos,
+            'recarregado_igual': bool(np.array_equal(previstos, recarregado))}
+
+
+def _imprimir(resultados, classes):
+    base = resultados[0]
+    print(f"\n{'variante':<18} {'tamanho':>10} {'acurácia':>9} {'F1 macro':>9}"
+          + ''.join(f" {'p50 lote ' + str(t):>15}" for t in base['latencia']))
+    for r in resultados:
+        print(f"{r['variante']:<18} {r['tamanho_bytes'] / 1024:>8.1f}KB {r['acuracia']:>9.4f} {r['f1_macro']:>9.4f}"
+              + ''.join(f" {m['p50_ms']:>13.3f}ms" for m in r['latencia'].values()))
+
+    # F1 por classe: uma coluna por variante, como a coluna f1-score do classification_report
+    print(f"\n{'F1 por classe':<28}" + ''.join(f" {r['variante'][:12]:>12}" for r in resultados))
+    for classe in classes:
+        print(f"{str(classe)[:28]:<28}" + ''.join(f" {r['f1_por_classe'][str(classe)]:>12.4f}" for r in resultados))
+
+
+if __name__ == "__main__":
+    from Artefatos import carregar_matriz
+    from Escalonamento import EscalonadorStreaming, ARQUIVO_SCALER
+
+    parser = argparse.ArgumentParser(description="Exporta variantes comprimidas do MLP e compara F1, tamanho e latência.")
+    parser.add_argument('--formatos', nargs='+', choices=FORMATOS, default=list(FORMATOS))
+    parser.add_argument('--poda', type=float, nargs='+', default=[0.5, 0.8],
+                        help="Frações de poda por magnitude (a variante sem poda é sempre incluída).")
+    parser.add_argument('--calibracao', type=int, default=LINHAS_CALIBRACAO, help="Linhas do X_train_scaled usadas na calibração.")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[1, 256, 4096])
+    parser.add_argument('--repeticoes', type=int, default=100)
+    parser.add_argument('--saida', default=ARQUIVO_RELATORIO)
+    parser.add_argument('--verificar', action='store_true',
+                        help="Só confere o int8 contra o float32 em um MLP e dados aleatórios e sai.")
+    args = parser.parse_args()
+
+    if args.verificar:
+        falhas = 0
+        for ativacao in ('relu', 'tanh', 'logistic'):
+            r = verificar_concordancia(ativacao=ativacao)
+            falhas += r['concordancia'] < CONCORDANCIA_MINIMA or r['erro_pesos'] > 0.5 + 1e-3 or not r['recarregado_igual']
+            print(f"int8 x float32 ({ativacao}): {r['concordancia']:.2%} das previsões iguais | "
+                  f"arredondamento dos pesos ≤ {r['erro_pesos']:.3f} passo | "
+                  f"recarregado do .npz: {'igual' if r['recarregado_igual'] else 'DIFERENTE'}")
+        print("Verificação concluída." if not falhas else f"Verificação FALHOU em {falhas} caso(s).")
+        exit(1 if falhas else 0)
+
+    with open(ARQUIVO_MLP, 'rb') as f:
+        mlp = pickle.load(f)
+    classes = np.load('classes.npy', allow_pickle=True)
+    escalonador = EscalonadorStreaming.carregar(ARQUIVO_SCALER)
+
+    X_treino = carregar_matriz('X_train_scaled')
+    linhas = np.sort(np.random.default_rng(42).choice(len(X_treino), size=min(args.calibracao, len(X_treino)),
+                                                      replace=False))
+    X_calibracao = np.asarray(X_treino[linhas], dtype=np.float32)
+
+    print(f"Calibrando com {len(X_calibracao)} linhas do X_train_scaled e avaliando no conjunto de teste...")
+    resultados = comparar_variantes(mlp, classes, escalonador, X_calibracao, carregar_matriz('X_test_scaled'),
+                                    carregar_matriz('y_test'), args.formatos, [0.0] + args.poda, args.tamanhos,
+                                    args.repeticoes)
+    _imprimir(resultados, classes)
+
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(resultados, f, ensure_ascii=False, indent=2)
+    print(f"\nRelatório salvo em '{args.saida}'; variantes exportadas como '{PREFIXO_VARIANTE}<variante>.npz'.")
@@ -0,0 +1,71 @@
+"""Parâmetros do pipeline, compartilhados pelos três scripts e pelo executor com cache (Pipeline.py).
+
+O Pipeline.py usa estes valores na impressão digital de cada etapa: alterar um parâmetro
+só refaz a etapa que o utiliza e as que vêm depois dela.
+"""
+
+# Script 1: Carregamento e Limpeza
+DATA_PATH = "/home/deborahmirella/Área de trabalho/IC2025/WTMC2021-Code/LabelledDataset/"
+filenames = [
+   "Friday-WorkingHours.pcap_REVI.csv",
+   "Monday-WorkingHours.pcap_REVI.csv",
+   "Thursday-WorkingHours.pcap_REVI.csv",
+   "Tuesday-WorkingHours.pcap_REVI.csv",
+   "Wednesday-WorkingHours.pcap_REVI.csv"
+]
+
+# Remoção manual das colunas solicitadas
+cols_to_remove_manually = ['src_port', 'dst_port', 'protocol']
+
+# Script 2: Preparação e Normalização
+TEST_SIZE = 0.3
+RANDOM_STATE = 42
+
+# Dobras estratificadas do treino gravadas junto com a divisão, para validação cruzada (0 desativa)
+N_DOBRAS = 5
+
+# Mantemos k_neighbors=1 por segurança, para lidar com as classes ultra-raras
+K_NEIGHBORS = 1
+
+# Estratégia do SMOTE no Script 2:
+# 'manual':     usa o dicionário 'sampling_strategy' abaixo, como foi digitado (padrão)
+# 'automatica': calculada a partir das contagens do censo (Censo.py), max(contagem no treino, MINIMO_SMOTE)
+ESTRATEGIA_SMOTE = 'manual'
+MINIMO_SMOTE = 300
+
+# 2° Estratégia (SMOTE): contagem desejada de cada classe no treino (ver o Script 2).
+# Também serve de referência para a distribuição das classes no Benchmark.py.
+sampling_strategy = {
+
+    0: 1836922,  # BENIGN
+    1: 2201,     # Bot
+    2: 92282,    # DDoS
+    3: 9027,     # DoS GoldenEye
+    4: 156340,   # DoS Hulk
+    5: 6008,     # DoS Slowhttptest
+    6: 8793,     # DoS slowloris
+    7: 3973,     # FTP-Patator
+    8: 300,      # Heartbleed
+    9: 300,      # Infiltration
+    10: 159421,  # PortScan
+    11: 2980,    # SSH-Patator
+    12: 1365,    # Web Attack - Brute Force
+    13: 300,     # Web Attack - Sql Injection
+    14: 679,     # Web Attack - XSS
+
+}
+
+# Script 3: Treinamento e Avaliação
+MLP_CONFIG = dict(hidden_layer_sizes=(64, 32),
+                  activation='relu',
+                  solver='adam',
+                  max_iter=500,
+                  random_state=42,
+                  verbose=True)
+
+# 'completo':  mlp.fit sobre a matriz inteira, como antes (padrão).
+# 'streaming': minilotes embaralhados lidos do .npy em disco (partial_fit), com checkpoint a cada época
+#              e parada antecipada em uma fatia de validação. Um treino interrompido continua de onde parou.
+# 'paralelo':  MLP em NumPy (Treino_Paralelo.py), com cada minilote dividido entre N_THREADS_TREINO threads.
+MODO_TREINO = 'completo'
+N_THREADS_TREINO = None  # None: todos os núcleos
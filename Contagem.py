@@ -1,26 +1,28 @@
-import pandas as pd
-from sklearn.preprocessing import LabelEncoder
+from Artefatos import existe
+from Censo import censo, SUFIXO_INDICE
 
-NOME_ARQUIVO_LIMPO = 'CICIDS.csv' 
+NOME_ARQUIVO_LIMPO = 'CICIDS.csv'
+ARTEFATO_ROTULOS = 'CICIDS_y'
 
-print(f"Carregando o arquivo '{NOME_ARQUIVO_LIMPO}' para verificar as classes...")
+# O censo lê apenas os rótulos (o artefato CICIDS_y.npy ou, na falta dele, só a coluna 'Label' do CSV,
+# em paralelo) e guarda classes, códigos e contagens em um índice ao lado dos dados.
+# Da segunda vez em diante a resposta vem direto do índice.
+if __name__ == "__main__":
+    try:
+        fonte = ARTEFATO_ROTULOS if existe(ARTEFATO_ROTULOS) else NOME_ARQUIVO_LIMPO
+        print(f"Verificando as classes de '{fonte}' (índice em '{fonte + SUFIXO_INDICE}')...")
+        resultado = censo(fonte)
 
-try:
-    df = pd.read_csv(NOME_ARQUIVO_LIMPO)
-    
-  
-    le = LabelEncoder()
-    
-    le.fit(df['Label'])
-    
-    print("\nDicionário Oficial de Classes")
+        print("\nDicionário Oficial de Classes")
 
-    for indice, nome_da_classe in enumerate(le.classes_):
-        print(f"Classe {indice} -> {nome_da_classe}")
+        for nome_da_classe in resultado['classes']:
+            print(f"Classe {resultado['codigos'][nome_da_classe]} -> {nome_da_classe} "
+                  f"({resultado['contagens'][nome_da_classe]} amostras)")
 
-    print("\nVerificação concluída com sucesso.")
+        print(f"\nTotal: {resultado['total']} amostras.")
+        print("\nVerificação concluída com sucesso.")
 
-except FileNotFoundError:
-    print(f"\nERRO: O arquivo '{NOME_ARQUIVO_LIMPO}' não foi encontrado.")
-except Exception as e:
-    print(f"\nOcorreu um erro: {e}")
\ No newline at end of file
+    except FileNotFoundError:
+        print(f"\nERRO: O arquivo '{NOME_ARQUIVO_LIMPO}' não foi encontrado.")
+    except Exception as e:
+        print(f"\nOcorreu um erro: {e}")
@@ -0,0 +1,142 @@
+"""Divisão estratificada em treino/teste (e dobras de validação cruzada) calculada só a partir dos rótulos.
+
+Nenhuma linha de X é copiada aqui: o resultado são vetores int32 de índices, gravados como artefatos.
+As etapas seguintes leem as linhas sob demanda do CICIDS_X.npy mapeado em memória (LinhasSelecionadas)
+ou as copiam em blocos para um artefato novo (reunir).
+"""
+
+import os
+
+import numpy as np
+
+from Artefatos import salvar_matriz, criar_matriz, carregar_matriz, existe, caminho_dados, caminho_metadados
+
+ARTEFATO_TREINO = 'indices_treino'
+ARTEFATO_TESTE = 'indices_teste'
+ARTEFATO_DOBRAS = 'dobras_treino'
+
+TAMANHO_BLOCO = 200_000
+
+
+def tamanho_teste(n, test_size):
+    """Linhas de teste de uma classe com 'n' amostras: só depende de 'n', então a divisão é previsível pelo censo."""
+    n_teste = int(round(n * test_size))
+    if n >= 2:
+        # Como no stratify do scikit-learn, toda classe com 2 ou mais amostras aparece nos dois conjuntos
+        n_teste = min(max(n_teste, 1), n - 1)
+    return n_teste
+
+
+def dividir_estratificado(y, test_size=0.3, random_state=42, n_dobras=0):
+    """Índices de treino e de teste (ordenados, int32) com a proporção de cada classe preservada.
+
+    As linhas de cada classe são embaralhadas com um gerador próprio, semeado com (random_state, classe),
+    então a divisão de uma classe não depende das demais. Com n_dobras > 1 devolve também, para cada
+    posição de 'treino', o número da dobra estratificada (int8) a que a linha pertence.
+    """
+    y = np.asarray(y).ravel()
+    contagens = np.bincount(y)
+    # Uma ordenação estável agrupa as linhas de cada classe, na ordem original
+    ordem = np.argsort(y, kind='stable').astype(np.int64)
+    fronteiras = np.concatenate([[0], np.cumsum(contagens)])
+
+    partes_treino, partes_teste, partes_dobras = [], [], []
+    deslocamento = 0
+    for classe, n in enumerate(contagens):
+        if n == 0:
+            continue
+        linhas = np.random.default_rng([random_state, classe]).permutation(ordem[fronteiras[classe]:fronteiras[classe + 1]])
+        n_teste = tamanho_teste(n, test_size)
+        partes_teste.append(linhas[:n_teste])
+        partes_treino.append(linhas[n_teste:])
+        if n_dobras > 1:
+            # Posições consecutivas da permutação vão para dobras diferentes: cada dobra recebe ~1/k da classe.
+            # Cada classe começa na dobra seguinte à última usada pela anterior, para que as sobras
+            # (as n % k linhas a mais) se espalhem pelas dobras em vez de caírem sempre nas primeiras.
+            partes_dobras.append((np.arange(n - n_teste, dtype=np.int64) + deslocamento) % n_dobras)
+            deslocamento += n - n_teste
+
+    treino = np.concatenate(partes_treino)
+    teste = np.concatenate(partes_teste)
+    ordem_treino = np.argsort(treino)
+    treino = treino[ordem_treino].astype(np.int32)
+    teste = np.sort(teste).astype(np.int32)
+    if n_dobras > 1:
+        dobras = np.concatenate(partes_dobras)[ordem_treino].astype(np.int8)
+        return treino, teste, dobras
+    return treino, teste, None
+
+
+def dividir_e_salvar(y, test_size=0.3, random_state=42, n_dobras=0, classes=None):
+    """Calcula a divisão e grava os índices (e as dobras) como artefatos .npy."""
+    treino, teste, dobras = dividir_estratificado(y, test_size, random_state, n_dobras)
+    meta = {'test_size': test_size, 'random_state': random_state, 'linhas_origem': len(y), 'classes': classes}
+    salvar_matriz(ARTEFATO_TREINO, treino, **meta)
+    salvar_matriz(ARTEFATO_TESTE, teste, **meta)
+    if dobras is not None:
+        salvar_matriz(ARTEFATO_DOBRAS, dobras, n_dobras=n_dobras, **meta)
+    else:
+        # Dobras de uma divisão anterior não valem para esta
+        for caminho in (caminho_dados(ARTEFATO_DOBRAS), caminho_metadados(ARTEFATO_DOBRAS)):
+            if os.path.exists(caminho):
+                os.remove(caminho)
+    return treino, teste, dobras
+
+
+def indices_da_dobra(dobras, dobra):
+    """Posições (dentro do treino) de treino e de validação para a dobra 'dobra' da validação cruzada."""
+    dobras = np.asarray(dobras)
+    return np.flatnonzero(dobras != dobra), np.flatnonzero(dobras == dobra)
+
+
+class LinhasSelecionadas:
+    """Visão preguiçosa das linhas 'indices' de uma matriz (em geral um memmap).
+
+    Fatias e vetores de posições são traduzidos para as linhas originais e lidos só quando acessados,
+    então a visão pode ser passada ao SMOTE em disco e ao escalonador no lugar de uma cópia.
+    """
+
+    def __init__(self, matriz, indices):
+        self.matriz = matriz
+        self.indices = np.asarray(indices)
+
+    def __len__(self):
+        return len(self.indices)
+
+    @property
+    def shape(self):
+        return (len(self.indices),) + tuple(self.matriz.shape[1:])
+
+    @property
+    def ndim(self):
+        return self.matriz.ndim
+
+    @property
+    def dtype(self):
+        return self.matriz.dtype
+
+    def __getitem__(self, item):
+        if isinstance(item, tuple):
+            return self.matriz[(self.indices[item[0]],) + item[1:]]
+        return self.matriz[self.indices[item]]
+
+    def __array__(self, dtype=None, copy=None):
+        dados = self.matriz[self.indices]
+        return dados if dtype is None else dados.astype(dtype, copy=False)
+
+
+def reunir(matriz, indices, destino, tamanho_bloco=TAMANHO_BLOCO, **meta):
+    """Copia as linhas 'indices' de 'matriz' para um novo artefato, em blocos."""
+    colunas = meta.pop('colunas', None)
+    forma = matriz.shape[1] if matriz.ndim > 1 else 0
+    saida = criar_matriz(destino, len(indices), colunas if colunas is not None else forma, dtype=matriz.dtype, **meta)
+    for inicio in range(0, len(indices), tamanho_bloco):
+        saida[inicio:inicio + tamanho_bloco] = matriz[indices[inicio:inicio + tamanho_bloco]]
+    saida.flush()
+    return saida
+
+
+def carregar_divisao():
+    """Índices de treino e de teste e, se existirem, as dobras gravadas por dividir_e_salvar."""
+    dobras = carregar_matriz(ARTEFATO_DOBRAS) if existe(ARTEFATO_DOBRAS) else None
+    return carregar_matriz(ARTEFATO_TREINO), carregar_matriz(ARTEFATO_TESTE), dobras
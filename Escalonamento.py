@@ -0,0 +1,106 @@
+"""Padronização Z-score em blocos (equivalente ao StandardScaler), com parâmetros salvos em disco."""
+
+import json
+import os
+
+import numpy as np
+
+from Estatisticas import PerfilColunas
+
+ARQUIVO_SCALER = 'scaler.json'
+
+TAMANHO_BLOCO = 200_000
+
+
+class EscalonadorStreaming:
+    """StandardScaler ajustado bloco a bloco e aplicado em float32, sem cópias da matriz inteira.
+
+    A média e a variância são acumuladas em float64 (Welford/Chan, via PerfilColunas),
+    então o resultado do ajuste é o mesmo do StandardScaler.fit sobre a matriz completa.
+    """
+
+    def __init__(self, colunas):
+        self.perfil = PerfilColunas(colunas)
+
+    @property
+    def colunas(self):
+        return self.perfil.colunas
+
+    @property
+    def media(self):
+        return self.perfil.media
+
+    @property
+    def escala(self):
+        # Assim como no StandardScaler, colunas sem variância não são divididas (escala 1)
+        escala = self.perfil.desvio.copy()
+        escala[escala < 10 * np.finfo(np.float64).eps] = 1.0
+        return escala
+
+    def partial_fit(self, bloco):
+        """Incorpora um bloco de linhas ao ajuste."""
+        self.perfil.atualizar(bloco)
+        return self
+
+    def ajustar_em_blocos(self, matriz, tamanho_bloco=TAMANHO_BLOCO):
+        """Ajusta sobre uma matriz (inclusive um memmap) percorrendo-a em blocos."""
+        for inicio in range(0, len(matriz), tamanho_bloco):
+            self.partial_fit(matriz[inicio:inicio + tamanho_bloco])
+        return self
+
+    def transform(self, bloco, out=None):
+        """Padroniza um bloco em float32. Se 'out' for o próprio bloco, a operação é feita no lugar."""
+        media = self.media.astype(np.float32)
+        inverso = (1.0 / self.escala).astype(np.float32)
+        if out is None:
+            out = np.empty(np.shape(bloco), dtype=np.float32)
+        np.subtract(bloco, media, out=out, casting='unsafe')
+        np.multiply(out, inverso, out=out)
+        return out
+
+    def transformar_em_blocos(self, origem, destino, tamanho_bloco=TAMANHO_BLOCO):
+        """Padroniza 'origem' em 'destino' (pré-alocado ou memmap), bloco a bloco. Os dois podem ser o mesmo array."""
+        for inicio in range(0, len(origem), tamanho_bloco):
+            fim = min(inicio + tamanho_bloco, len(origem))
+            if destino is origem:
+                self.transform(destino[inicio:fim], out=destino[inicio:fim])
+            else:
+                destino[inicio:fim] = self.transform(origem[inicio:fim])
+        if hasattr(destino, 'flush'):
+            destino.flush()
+        return destino
+
+    def inverse_transform(self, bloco):
+        """Desfaz a padronização (volta para a escala original das características)."""
+        return np.asarray(bloco, dtype=np.float32) * self.escala.astype(np.float32) + self.media.astype(np.float32)
+
+    def estado(self):
+        """Parâmetros mínimos para aplicar o scaler (usados nos metadados dos artefatos)."""
+        return {'media': self.media.tolist(), 'escala': self.escala.tolist()}
+
+    def para_sklearn(self):
+        """Cria um StandardScaler do scikit-learn já ajustado com os mesmos parâmetros."""
+        from sklearn.preprocessing import StandardScaler
+        scaler = StandardScaler()
+        scaler.mean_ = self.media.copy()
+        scaler.var_ = self.perfil.variancia.copy()
+        scaler.scale_ = self.escala
+        scaler.n_samples_seen_ = int(self.perfil.contagem.max(initial=0))
+        scaler.n_features_in_ = len(self.colunas)
+        return scaler
+
+    def salvar(self, caminho=ARQUIVO_SCALER):
+        """Grava o scaler em JSON. Guarda também contagem e M2 para que o ajuste possa ser continuado depois."""
+        dados = {'escala': self.escala.tolist(), **self.perfil.para_dict()}
+        temporario = caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, ensure_ascii=False, indent=2)
+        os.replace(temporario, caminho)
+
+    @classmethod
+    def carregar(cls, caminho=ARQUIVO_SCALER):
+        with open(caminho, encoding='utf-8') as f:
+            dados = json.load(f)
+        escalonador = cls(dados['colunas'])
+        escalonador.perfil = PerfilColunas.de_dict(dados)
+        return escalonador
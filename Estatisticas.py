@@ -0,0 +1,143 @@
+"""Estatísticas incrementais por coluna (Welford/Chan), calculadas em uma única passada sobre blocos."""
+
+import json
+import os
+
+import numpy as np
+
+
+class PerfilColunas:
+    """Contagem, média, M2, mínimo, máximo, nulos e infinitos de cada coluna, atualizados bloco a bloco.
+
+    Dois perfis calculados em partes diferentes dos dados (blocos, arquivos ou processos)
+    podem ser combinados com combinar(), com o mesmo resultado de uma passada única.
+    """
+
+    def __init__(self, colunas):
+        self.colunas = list(colunas)
+        k = len(self.colunas)
+        self.contagem = np.zeros(k, dtype=np.int64)
+        self.media = np.zeros(k)
+        self.m2 = np.zeros(k)
+        self.minimo = np.full(k, np.inf)
+        self.maximo = np.full(k, -np.inf)
+        # Valores inválidos vistos ANTES da limpeza das linhas
+        self.linhas_brutas = 0
+        self.nulos = np.zeros(k, dtype=np.int64)
+        self.infinitos = np.zeros(k, dtype=np.int64)
+
+    def registrar_invalidos(self, valores):
+        """Conta nulos e infinitos de um bloco bruto (antes do dropna)."""
+        valores = np.asarray(valores, dtype=np.float64)
+        self.linhas_brutas += len(valores)
+        self.nulos += np.isnan(valores).sum(axis=0)
+        self.infinitos += np.isinf(valores).sum(axis=0)
+
+    def atualizar(self, valores):
+        """Incorpora um bloco de valores já limpos (sem nulos nem infinitos)."""
+        valores = np.asarray(valores, dtype=np.float64)
+        if len(valores) == 0:
+            return self
+        n = np.full(len(self.colunas), len(valores), dtype=np.int64)
+        media = valores.mean(axis=0)
+        m2 = ((valores - media) ** 2).sum(axis=0)
+        self._combinar_momentos(n, media, m2)
+        self.minimo = np.minimum(self.minimo, valores.min(axis=0))
+        self.maximo = np.maximum(self.maximo, valores.max(axis=0))
+        return self
+
+    def combinar(self, outro):
+        """Junta (no próprio objeto) as estatísticas de outro perfil com as mesmas colunas."""
+        if outro.colunas != self.colunas:
+            raise ValueError("Os perfis não têm as mesmas colunas.")
+        self._combinar_momentos(outro.contagem, outro.media, outro.m2)
+        self.minimo = np.minimum(self.minimo, outro.minimo)
+        self.maximo = np.maximum(self.maximo, outro.maximo)
+        self.linhas_brutas += outro.linhas_brutas
+        self.nulos += outro.nulos
+        self.infinitos += outro.infinitos
+        return self
+
+    def _combinar_momentos(self, n_b, media_b, m2_b):
+        # Fórmula de Chan et al. para juntar médias e somas de quadrados de duas partições
+        n_a = self.contagem
+        n = n_a + n_b
+        com_dados = n > 0
+        delta = media_b - self.media
+        peso_b = np.divide(n_b, n, out=np.zeros(len(n)), where=com_dados)
+        self.media = self.media + delta * peso_b
+        self.m2 = self.m2 + m2_b + delta ** 2 * n_a * peso_b
+        self.contagem = n
+
+    @property
+    def variancia(self):
+        """Variância populacional (ddof=0), a mesma usada pelo VarianceThreshold e pelo StandardScaler."""
+        return np.divide(self.m2, self.contagem, out=np.zeros(len(self.colunas)), where=self.contagem > 0)
+
+    @property
+    def desvio(self):
+        return np.sqrt(self.variancia)
+
+    @property
+    def constantes(self):
+        """Máscara das colunas com variância zero (mínimo igual ao máximo, ou sem nenhum valor)."""
+        return ~(self.maximo > self.minimo)
+
+    @classmethod
+    def combinar_todos(cls, perfis):
+        """Combina uma lista de perfis em um novo perfil."""
+        perfis = list(perfis)
+        total = cls(perfis[0].colunas)
+        for perfil in perfis:
+            total.combinar(perfil)
+        return total
+
+    def selecionar(self, colunas):
+        """Devolve um novo perfil apenas com as colunas pedidas."""
+        indices = [self.colunas.index(col) for col in colunas]
+        novo = PerfilColunas(colunas)
+        for atributo in ('contagem', 'media', 'm2', 'minimo', 'maximo', 'nulos', 'infinitos'):
+            setattr(novo, atributo, getattr(self, atributo)[indices].copy())
+        novo.linhas_brutas = self.linhas_brutas
+        return novo
+
+    def para_dict(self):
+        return {
+            'colunas': self.colunas,
+            'linhas_brutas': int(self.linhas_brutas),
+            'contagem': self.contagem.tolist(),
+            'media': self.media.tolist(),
+            'm2': self.m2.tolist(),
+            'variancia': self.variancia.tolist(),
+            'minimo': self.minimo.tolist(),
+            'maximo': self.maximo.tolist(),
+            'nulos': self.nulos.tolist(),
+            'infinitos': self.infinitos.tolist(),
+            'constante': self.constantes.tolist(),
+        }
+
+    @classmethod
+    def de_dict(cls, dados):
+        perfil = cls(dados['colunas'])
+        perfil.linhas_brutas = dados['linhas_brutas']
+        perfil.contagem = np.array(dados['contagem'], dtype=np.int64)
+        perfil.media = np.array(dados['media'], dtype=np.float64)
+        perfil.m2 = np.array(dados['m2'], dtype=np.float64)
+        perfil.minimo = np.array(dados['minimo'], dtype=np.float64)
+        perfil.maximo = np.array(dados['maximo'], dtype=np.float64)
+        perfil.nulos = np.array(dados['nulos'], dtype=np.int64)
+        perfil.infinitos = np.array(dados['infinitos'], dtype=np.int64)
+        return perfil
+
+    def salvar(self, caminho):
+        """Grava o perfil em JSON, para ser reaproveitado pelas etapas seguintes."""
+        temporario = caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            # O json grava 'Infinity' para colunas sem nenhum valor válido, e lê de volta sem problemas
+            json.dump(self.para_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(temporario, caminho)
+
+    @classmethod
+    def carregar(cls, caminho):
+        with open(caminho, encoding='utf-8') as f:
+            return cls.de_dict(json.load(f))
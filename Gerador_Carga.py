@@ -0,0 +1,106 @@
+"""Gerador de carga: reenvia os fluxos do conjunto de teste ao serviço de classificação e mede fluxos/s."""
+
+import json
+import asyncio
+import argparse
+from time import perf_counter
+
+import numpy as np
+
+from Artefatos import carregar_matriz, carregar_metadados
+from Escalonamento import EscalonadorStreaming, ARQUIVO_SCALER
+
+
+def preparar_mensagens(quantidade, semente=42):
+    """Monta as linhas JSON a partir do X_test, desfazendo a normalização (o serviço recebe a escala original)."""
+    X_teste = carregar_matriz('X_test_scaled')
+    colunas = carregar_metadados('X_test_scaled')['colunas']
+    escalonador = EscalonadorStreaming.carregar(ARQUIVO_SCALER)
+
+    rng = np.random.default_rng(semente)
+    linhas = np.sort(rng.choice(len(X_teste), size=min(quantidade, len(X_teste)), replace=False))
+    X_bruto = escalonador.inverse_transform(X_teste[linhas])
+
+    mensagens = []
+    for i, valores in enumerate(X_bruto.tolist()):
+        mensagens.append(json.dumps({'id': i, 'fluxo': dict(zip(colunas, valores))}).encode() + b'\n')
+    return mensagens
+
+
+async def _conectar(host, porta, caminho_unix):
+    if caminho_unix:
+        return await asyncio.open_unix_connection(caminho_unix)
+    return await asyncio.open_connection(host, porta)
+
+
+async def _cliente(mensagens, host, porta, caminho_unix, janela, latencias):
+    # Mantém até 'janela' requisições em voo por conexão
+    reader, writer = await _conectar(host, porta, caminho_unix)
+    envios = []
+    creditos = asyncio.Semaphore(janela)
+
+    async def ler_respostas():
+        for i in range(len(mensagens)):
+            linha = await reader.readline()
+            if not linha:
+                raise ConnectionError("O serviço encerrou a conexão.")
+            latencias.append(perf_counter() - envios[i])
+            creditos.release()
+
+    leitura = asyncio.create_task(ler_respostas())
+    for mensagem in mensagens:
+        await creditos.acquire()
+        envios.append(perf_counter())
+        writer.write(mensagem)
+        await writer.drain()
+    await leitura
+    writer.close()
+
+
+async def _metricas_do_servico(host, porta, caminho_unix):
+    reader, writer = await _conectar(host, porta, caminho_unix)
+    writer.write(b'{"cmd": "metricas"}\n')
+    await writer.drain()
+    resposta = json.loads(await reader.readline())
+    writer.close()
+    return resposta
+
+
+async def executar_carga(mensagens, conexoes=4, janela=256, host='127.0.0.1', porta=8765, caminho_unix=None):
+    """Distribui as mensagens entre as conexões e devolve vazão, latências e as métricas do serviço."""
+    latencias = []
+    partes = [mensagens[i::conexoes] for i in range(conexoes)]
+    inicio = perf_counter()
+    await asyncio.gather(*(_cliente(parte, host, porta, caminho_unix, janela, latencias) for parte in partes if parte))
+    duracao = perf_counter() - inicio
+
+    latencias_ms = np.array(latencias) * 1000
+    return {
+        'fluxos': len(latencias),
+        'segundos': duracao,
+        'fluxos_por_segundo': len(latencias) / duracao if duracao > 0 else float('nan'),
+        'latencia_p50_ms': float(np.percentile(latencias_ms, 50)),
+        'latencia_p99_ms': float(np.percentile(latencias_ms, 99)),
+        'servico': await _metricas_do_servico(host, porta, caminho_unix),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reenvia o X_test ao serviço de classificação e mede a vazão sustentada.")
+    parser.add_argument('--fluxos', type=int, default=100_000)
+    parser.add_argument('--conexoes', type=int, default=4)
+    parser.add_argument('--janela', type=int, default=256, help="Requisições em voo por conexão.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--unix', default=None)
+    args = parser.parse_args()
+
+    print(f"Preparando {args.fluxos} fluxos do conjunto de teste...")
+    mensagens = preparar_mensagens(args.fluxos)
+
+    print(f"Enviando com {args.conexoes} conexões e janela de {args.janela} requisições...")
+    resultado = asyncio.run(executar_carga(mensagens, args.conexoes, args.janela, args.host, args.porta, args.unix))
+
+    print(f"\n{resultado['fluxos']} fluxos em {resultado['segundos']:.2f} s -> {resultado['fluxos_por_segundo']:,.0f} fluxos/s")
+    print(f"Latência vista pelo cliente: p50 = {resultado['latencia_p50_ms']:.2f} ms | p99 = {resultado['latencia_p99_ms']:.2f} ms")
+    print("Métricas do serviço:", json.dumps(resultado['servico'], ensure_ascii=False))
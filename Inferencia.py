@@ -0,0 +1,209 @@
+"""Motor de inferência do MLP em NumPy puro: float32, normalização embutida e buffers pré-alocados."""
+
+import argparse
+import pickle
+from time import perf_counter
+
+import numpy as np
+
+ARQUIVO_MODELO = 'modelo_mlp.npz'
+ARQUIVO_MLP = 'modelo_mlp.pkl'
+
+TAMANHO_LOTE_MAXIMO = 4096
+
+_ATIVACOES = {
+    'relu': lambda a: np.maximum(a, 0, out=a),
+    'tanh': lambda a: np.tanh(a, out=a),
+    'logistic': lambda a: np.divide(1.0, 1.0 + np.exp(-a, out=a), out=a),
+    'identity': lambda a: a,
+}
+
+
+class MotorInferencia:
+    """Classificador autocontido montado a partir de coefs_/intercepts_ de um MLPClassifier treinado.
+
+    Se o scaler for informado, a padronização é embutida na primeira camada
+    (W' = W / escala, b' = b - (media / escala) @ W), então o motor recebe as características originais.
+    Os buffers de ativação são alocados uma única vez; por isso um mesmo motor não deve ser usado
+    por várias threads ao mesmo tempo.
+    """
+
+    def __init__(self, pesos, vieses, classes, ativacao='relu', saida='softmax', colunas=None,
+                 tamanho_lote_maximo=TAMANHO_LOTE_MAXIMO):
+        self.pesos = [np.ascontiguousarray(w, dtype=np.float32) for w in pesos]
+        self.vieses = [np.ascontiguousarray(b, dtype=np.float32) for b in vieses]
+        self.classes = np.asarray(classes)
+        self.ativacao = ativacao
+        self.saida = saida
+        self.colunas = None if colunas is None else list(colunas)
+        self.tamanho_lote_maximo = tamanho_lote_maximo
+
+        self._entrada = np.empty((tamanho_lote_maximo, self.n_entradas), dtype=np.float32)
+        self._camadas = [np.empty((tamanho_lote_maximo, w.shape[1]), dtype=np.float32) for w in self.pesos]
+
+    @property
+    def n_entradas(self):
+        return self.pesos[0].shape[0]
+
+    @classmethod
+    def de_mlp(cls, mlp, classes, escalonador=None, **kwargs):
+        """Monta o motor a partir de um MLPClassifier (e, opcionalmente, do EscalonadorStreaming usado no treino)."""
+        pesos = [np.asarray(w, dtype=np.float64) for w in mlp.coefs_]
+        vieses = [np.asarray(b, dtype=np.float64) for b in mlp.intercepts_]
+        colunas = None
+        if escalonador is not None:
+            media, escala = escalonador.media, escalonador.escala
+            vieses[0] = vieses[0] - (media / escala) @ pesos[0]
+            pesos[0] = pesos[0] / escala[:, np.newaxis]
+            colunas = escalonador.colunas
+        return cls(pesos, vieses, classes, ativacao=mlp.activation, saida=mlp.out_activation_, colunas=colunas, **kwargs)
+
+    def clonar(self):
+        """Cópia com buffers próprios, para usar o mesmo modelo em outra thread."""
+        return MotorInferencia(self.pesos, self.vieses, self.classes, self.ativacao, self.saida, self.colunas,
+                               self.tamanho_lote_maximo)
+
+    def salvar(self, caminho=ARQUIVO_MODELO, dtype=np.float32, comprimir=False):
+        """Grava o motor em um .npz, sem depender do scikit-learn para ser carregado.
+
+        Com dtype=np.float16 os parâmetros ocupam metade do espaço; ao carregar voltam para float32.
+        Se a padronização estiver embutida, a primeira camada fica em float32: divididos pela escala
+        das colunas (que chega a ~1e8), os pesos sairiam da faixa do float16.
+        """
+        arrays = {f'pesos_{i}': w.astype(np.float32 if i == 0 and self.colunas else dtype)
+                  for i, w in enumerate(self.pesos)}
+        arrays.update({f'vieses_{i}': b.astype(dtype) for i, b in enumerate(self.vieses)})
+        gravar = np.savez_compressed if comprimir else np.savez
+        gravar(caminho, classes=np.asarray(self.classes, dtype=str), ativacao=self.ativacao, saida=self.saida,
+               colunas=np.asarray(self.colunas or [], dtype=str), **arrays)
+
+    @classmethod
+    def carregar(cls, caminho=ARQUIVO_MODELO, **kwargs):
+        with np.load(caminho) as dados:
+            if 'formato' in dados.files and cls is MotorInferencia:
+                # Modelo quantizado em int8 (Compressao.py): os pesos precisam das escalas para serem usados
+                from Compressao import MotorQuantizado
+                return MotorQuantizado.carregar(caminho, **kwargs)
+            n_camadas = sum(1 for chave in dados.files if chave.startswith('pesos_'))
+            pesos = [dados[f'pesos_{i}'] for i in range(n_camadas)]
+            vieses = [dados[f'vieses_{i}'] for i in range(n_camadas)]
+            colunas = list(dados['colunas']) or None
+            return cls(pesos, vieses, dados['classes'], ativacao=str(dados['ativacao']), saida=str(dados['saida']),
+                       colunas=colunas, **kwargs)
+
+    def _propagar(self, lote):
+        # Propagação de um lote de até 'tamanho_lote_maximo' linhas, reaproveitando os buffers
+        n = len(lote)
+        entrada = self._entrada[:n]
+        np.copyto(entrada, lote, casting='unsafe')
+        ativar = _ATIVACOES[self.ativacao]
+        for i, (w, b) in enumerate(zip(self.pesos, self.vieses)):
+            camada = self._camadas[i][:n]
+            np.matmul(entrada, w, out=camada)
+            camada += b
+            if i < len(self.pesos) - 1:
+                ativar(camada)
+            entrada = camada
+        return entrada
+
+    def prever_indices(self, X, out=None):
+        """Índices das classes previstas para todas as linhas de X (processadas em lotes)."""
+        n = len(X)
+        if out is None:
+            out = np.empty(n, dtype=np.int64)
+        for inicio in range(0, n, self.tamanho_lote_maximo):
+            fim = min(inicio + self.tamanho_lote_maximo, n)
+            saida = self._propagar(X[inicio:fim])
+            if self.saida == 'logistic' and saida.shape[1] == 1:
+                # Caso binário do MLPClassifier: uma única saída sigmoide
+                out[inicio:fim] = saida[:, 0] > 0
+            else:
+                # A softmax não muda a ordem das saídas, então basta o argmax
+                np.argmax(saida, axis=1, out=out[inicio:fim])
+        return out
+
+    def prever(self, X):
+        """Nomes das classes previstas para todas as linhas de X."""
+        return self.classes[self.prever_indices(X)]
+
+
+class MicroLote:
+    """Acumula fluxos individuais e classifica todos de uma vez quando o lote enche."""
+
+    def __init__(self, motor, tamanho=256):
+        self.motor = motor
+        self.tamanho = min(tamanho, motor.tamanho_lote_maximo)
+        self._fluxos = np.empty((self.tamanho, motor.n_entradas), dtype=np.float32)
+        self._indices = np.empty(self.tamanho, dtype=np.int64)
+        self._identificadores = []
+
+    def __len__(self):
+        return len(self._identificadores)
+
+    def adicionar(self, fluxo, identificador=None):
+        """Enfileira um fluxo. Devolve [(identificador, classe)] quando o lote enche, senão uma lista vazia."""
+        self._fluxos[len(self._identificadores)] = fluxo
+        self._identificadores.append(identificador)
+        if len(self._identificadores) == self.tamanho:
+            return self.esvaziar()
+        return []
+
+    def esvaziar(self):
+        """Classifica os fluxos pendentes, mesmo que o lote não esteja cheio."""
+        n = len(self._identificadores)
+        if n == 0:
+            return []
+        self.motor.prever_indices(self._fluxos[:n], out=self._indices[:n])
+        resultado = list(zip(self._identificadores, self.motor.classes[self._indices[:n]]))
+        self._identificadores = []
+        return resultado
+
+
+def comparar_com_sklearn(mlp, escalonador, X, classes, tamanhos=(1, 8, 64, 512, 4096), repeticoes=200, semente=42):
+    """Latência (p50/p99 por lote) e vazão do motor contra scaler.transform + mlp.predict do scikit-learn."""
+    motor = MotorInferencia.de_mlp(mlp, classes, escalonador, tamanho_lote_maximo=max(tamanhos))
+    scaler = escalonador.para_sklearn()
+    rng = np.random.default_rng(semente)
+    resultados = []
+
+    for tamanho in tamanhos:
+        inicios = rng.integers(0, max(len(X) - tamanho, 1), size=repeticoes)
+        lotes = [np.asarray(X[i:i + tamanho], dtype=np.float32) for i in inicios]
+        for nome, prever in (('sklearn', lambda lote: mlp.predict(scaler.transform(lote))),
+                             ('motor', motor.prever_indices)):
+            prever(lotes[0])  # aquecimento
+            tempos = np.empty(repeticoes)
+            for i, lote in enumerate(lotes):
+                inicio = perf_counter()
+                prever(lote)
+                tempos[i] = perf_counter() - inicio
+            resultados.append({
+                'metodo': nome,
+                'tamanho_lote': tamanho,
+                'p50_ms': np.percentile(tempos, 50) * 1000,
+                'p99_ms': np.percentile(tempos, 99) * 1000,
+                'fluxos_por_segundo': tamanho * repeticoes / tempos.sum(),
+            })
+    return resultados
+
+
+if __name__ == "__main__":
+    from Artefatos import carregar_matriz
+    from Escalonamento import EscalonadorStreaming
+
+    parser = argparse.ArgumentParser(description="Benchmark de latência do motor de inferência contra o predict do scikit-learn.")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[1, 8, 64, 512, 4096])
+    parser.add_argument('--repeticoes', type=int, default=200)
+    args = parser.parse_args()
+
+    with open(ARQUIVO_MLP, 'rb') as f:
+        mlp = pickle.load(f)
+    escalonador = EscalonadorStreaming.carregar()
+    classes = np.load('classes.npy', allow_pickle=True)
+    # Volta o conjunto de teste para a escala original, que é o que chega de um sensor
+    X_teste = carregar_matriz('X_test_scaled')
+    X_bruto = escalonador.inverse_transform(X_teste[:200_000])
+
+    print(f"{'método':>8} {'lote':>6} {'p50 (ms)':>10} {'p99 (ms)':>10} {'fluxos/s':>14}")
+    for r in comparar_com_sklearn(mlp, escalonador, X_bruto, classes, args.tamanhos, args.repeticoes):
+        print(f"{r['metodo']:>8} {r['tamanho_lote']:>6} {r['p50_ms']:>10.3f} {r['p99_ms']:>10.3f} {r['fluxos_por_segundo']:>14,.0f}")
@@ -0,0 +1,323 @@
+"""Instrumentação das etapas do pipeline: tempo de parede e de CPU, memória e linhas de entrada/saída.
+
+Desligada por padrão. Para ativar, aponte a variável de ambiente INSTRUMENTACAO para um arquivo:
+
+    INSTRUMENTACAO=trace.jsonl python Carregamento_Limpeza.py
+
+Cada etapa concluída vira uma linha JSON no arquivo (inclusive as executadas nos processos do pool).
+Para examinar uma etapa a fundo:
+
+    INSTRUMENTACAO_CPROFILE=smote       grava 'perfil_smote.prof' e imprime as funções mais caras
+    INSTRUMENTACAO_TRACEMALLOC=smote    registra as linhas de código que mais alocaram memória na etapa
+
+Depois, 'python Instrumentacao.py trace.jsonl' resume o trace e '--folded' gera a entrada do flamegraph.pl
+(ou do speedscope). Desligada, etapa() devolve sempre o mesmo objeto vazio: o custo é o de uma comparação.
+"""
+
+import os
+import sys
+import json
+import argparse
+import threading
+from time import perf_counter, process_time, time
+from functools import wraps
+
+try:
+    import resource
+except ImportError:  # Windows não possui o módulo 'resource'
+    resource = None
+
+VARIAVEL_TRACE = 'INSTRUMENTACAO'
+VARIAVEL_CPROFILE = 'INSTRUMENTACAO_CPROFILE'
+VARIAVEL_TRACEMALLOC = 'INSTRUMENTACAO_TRACEMALLOC'
+
+_destino = os.environ.get(VARIAVEL_TRACE) or None
+_etapa_cprofile = os.environ.get(VARIAVEL_CPROFILE) or None
+_etapa_tracemalloc = os.environ.get(VARIAVEL_TRACEMALLOC) or None
+
+_trava = threading.Lock()
+_local = threading.local()
+
+
+def pico_memoria_mb():
+    """Retorna o pico de memória residente (RSS) do processo atual, em MB."""
+    if resource is None:
+        return float('nan')
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # No Linux o valor vem em KB, no macOS vem em bytes
+    if sys.platform == 'darwin':
+        return pico / (1024 ** 2)
+    return pico / 1024
+
+
+def pico_memoria_filhos_mb():
+    """Maior pico de RSS entre os processos filhos já encerrados (por exemplo, os de um pool), em MB."""
+    if resource is None:
+        return float('nan')
+    pico = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    if sys.platform == 'darwin':
+        return pico / (1024 ** 2)
+    return pico / 1024
+
+
+def reiniciar_pico_memoria():
+    """Zera o pico de RSS do processo (Linux: /proc/self/clear_refs). Devolve False se o sistema não permitir.
+
+    O ru_maxrss do getrusage não é afetado; o pico reiniciado é lido com pico_memoria_desde_reinicio_mb.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def pico_memoria_desde_reinicio_mb():
+    """Pico de RSS desde o último reiniciar_pico_memoria (VmHWM), em MB; fora do Linux, o pico do processo."""
+    try:
+        with open('/proc/self/status') as f:
+            for linha in f:
+                if linha.startswith('VmHWM:'):
+                    return int(linha.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    return pico_memoria_mb()
+
+
+def memoria_atual_mb():
+    """RSS atual do processo, em MB (no Linux, lido de /proc; nos demais sistemas, o pico)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 ** 2)
+    except (OSError, ValueError, AttributeError):
+        return pico_memoria_mb()
+
+
+def _cpu_filhos():
+    if resource is None:
+        return 0.0
+    uso = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return uso.ru_utime + uso.ru_stime
+
+
+def configurar(destino=None, cprofile=None, tracemalloc=None):
+    """Liga (ou desliga, com destino=None) a instrumentação sem usar as variáveis de ambiente."""
+    global _destino, _etapa_cprofile, _etapa_tracemalloc
+    _destino, _etapa_cprofile, _etapa_tracemalloc = destino, cprofile, tracemalloc
+    # Processos do pool criados depois disso herdam a configuração
+    for variavel, valor in ((VARIAVEL_TRACE, destino), (VARIAVEL_CPROFILE, cprofile), (VARIAVEL_TRACEMALLOC, tracemalloc)):
+        if valor:
+            os.environ[variavel] = valor
+        else:
+            os.environ.pop(variavel, None)
+
+
+def ativa():
+    return _destino is not None
+
+
+def _pilha():
+    pilha = getattr(_local, 'pilha', None)
+    if pilha is None:
+        # A raiz de todo caminho é o script em execução
+        pilha = _local.pilha = [os.path.splitext(os.path.basename(sys.argv[0] or 'python'))[0]]
+    return pilha
+
+
+def _escrever(registro):
+    linha = json.dumps(registro, ensure_ascii=False, default=str) + '\n'
+    with _trava:
+        # Uma única escrita por linha em modo append: processos diferentes podem compartilhar o arquivo
+        with open(_destino, 'a', encoding='utf-8') as f:
+            f.write(linha)
+
+
+class _EtapaNula:
+    """Usada quando a instrumentação está desligada: não mede nada."""
+
+    linhas_saida = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, rastro):
+        return False
+
+    def registrar(self, **campos):
+        pass
+
+
+_NULA = _EtapaNula()
+
+
+class Etapa:
+    """Mede um trecho do pipeline. Use via etapa(...)."""
+
+    def __init__(self, nome, linhas_entrada=None, **atributos):
+        self.nome = nome
+        self.linhas_entrada = linhas_entrada
+        self.linhas_saida = None
+        self.atributos = atributos
+        self._perfil = None
+
+    def registrar(self, **campos):
+        """Acrescenta campos livres ao registro da etapa (por exemplo, colunas removidas)."""
+        self.atributos.update(campos)
+
+    def __enter__(self):
+        pilha = _pilha()
+        pilha.append(self.nome)
+        self.caminho = list(pilha)
+        if self.nome == _etapa_tracemalloc:
+            import tracemalloc
+            tracemalloc.start()
+        if self.nome == _etapa_cprofile:
+            import cProfile
+            self._perfil = cProfile.Profile()
+            self._perfil.enable()
+        self._rss_inicio = memoria_atual_mb()
+        self._pico_inicio = pico_memoria_mb()
+        self._cpu_filhos_inicio = _cpu_filhos()
+        self._inicio = time()
+        self._cpu_inicio = process_time()
+        self._parede_inicio = perf_counter()
+        return self
+
+    def __exit__(self, tipo, valor, rastro):
+        segundos = perf_counter() - self._parede_inicio
+        cpu = process_time() - self._cpu_inicio
+        _pilha().pop()
+
+        registro = {
+            'etapa': self.nome,
+            'caminho': self.caminho,
+            'pid': os.getpid(),
+            'inicio': self._inicio,
+            'segundos': segundos,
+            'cpu_s': cpu,
+            'cpu_filhos_s': _cpu_filhos() - self._cpu_filhos_inicio,
+            'rss_inicio_mb': self._rss_inicio,
+            'rss_fim_mb': memoria_atual_mb(),
+            'pico_rss_mb': pico_memoria_mb(),
+            # O pico do processo só cresce: se ele subiu durante a etapa, foi ela que o causou
+            'pico_rss_novo': pico_memoria_mb() > self._pico_inicio,
+            'pico_rss_filhos_mb': pico_memoria_filhos_mb(),
+            'linhas_entrada': self.linhas_entrada,
+            'linhas_saida': self.linhas_saida,
+            'erro': tipo.__name__ if tipo is not None else None,
+        }
+        registro['delta_rss_mb'] = registro['rss_fim_mb'] - self._rss_inicio
+        if self.linhas_entrada and segundos > 0:
+            registro['linhas_por_segundo'] = self.linhas_entrada / segundos
+        registro.update(self.atributos)
+
+        if self._perfil is not None:
+            self._fechar_cprofile(registro)
+        if self.nome == _etapa_tracemalloc:
+            self._fechar_tracemalloc(registro)
+        _escrever(registro)
+        return False
+
+    def _fechar_cprofile(self, registro):
+        import pstats
+
+        self._perfil.disable()
+        arquivo = f'perfil_{self.nome}.prof'
+        self._perfil.dump_stats(arquivo)
+        registro['cprofile'] = arquivo
+        print(f"\n[instrumentação] cProfile da etapa '{self.nome}' salvo em '{arquivo}'. Funções mais caras:")
+        pstats.Stats(self._perfil).sort_stats('cumulative').print_stats(20)
+
+    def _fechar_tracemalloc(self, registro):
+        import tracemalloc
+
+        _, pico = tracemalloc.get_traced_memory()
+        maiores = tracemalloc.take_snapshot().statistics('lineno')[:10]
+        tracemalloc.stop()
+        registro['tracemalloc_pico_mb'] = pico / (1024 ** 2)
+        registro['tracemalloc_maiores'] = [{'linha': str(s.traceback[0]), 'mb': s.size / (1024 ** 2)} for s in maiores]
+
+
+def etapa(nome, linhas_entrada=None, **atributos):
+    """Context manager que mede o bloco como a etapa 'nome'. Atribua .linhas_saida dentro do bloco.
+
+        with etapa('smote', linhas_entrada=len(y_train)) as e:
+            X_res, y_res = ...
+            e.linhas_saida = len(y_res)
+    """
+    if _destino is None:
+        return _NULA
+    return Etapa(nome, linhas_entrada, **atributos)
+
+
+def instrumentar(nome=None):
+    """Decorador: mede cada chamada da função como uma etapa (com o nome da função, se 'nome' for omitido)."""
+    def decorador(funcao):
+        rotulo = nome or funcao.__name__
+
+        @wraps(funcao)
+        def envolvida(*args, **kwargs):
+            if _destino is None:
+                return funcao(*args, **kwargs)
+            with Etapa(rotulo):
+                return funcao(*args, **kwargs)
+        return envolvida
+    return decorador
+
+
+def ler_trace(caminho):
+    with open(caminho, encoding='utf-8') as f:
+        return [json.loads(linha) for linha in f if linha.strip()]
+
+
+def resumir(registros):
+    """Agrupa os registros por caminho: chamadas, tempo total, CPU, maior pico de RSS e linhas."""
+    resumo = {}
+    for r in registros:
+        chave = ';'.join(r['caminho'])
+        item = resumo.setdefault(chave, {'chamadas': 0, 'segundos': 0.0, 'cpu_s': 0.0, 'pico_rss_mb': 0.0,
+                                         'linhas_entrada': 0, 'linhas_saida': 0})
+        item['chamadas'] += 1
+        item['segundos'] += r['segundos']
+        item['cpu_s'] += r['cpu_s'] + r.get('cpu_filhos_s', 0.0)
+        item['pico_rss_mb'] = max(item['pico_rss_mb'], r['pico_rss_mb'])
+        item['linhas_entrada'] += r.get('linhas_entrada') or 0
+        item['linhas_saida'] += r.get('linhas_saida') or 0
+    return resumo
+
+
+def para_folded(registros):
+    """Linhas no formato 'raiz;etapa;subetapa <microssegundos>' com o tempo próprio de cada caminho."""
+    total = {}
+    for r in registros:
+        chave = tuple(r['caminho'])
+        total[chave] = total.get(chave, 0.0) + r['segundos']
+    filhos = {}
+    for chave, segundos in total.items():
+        if len(chave) > 1:
+            filhos[chave[:-1]] = filhos.get(chave[:-1], 0.0) + segundos
+    linhas = []
+    for chave, segundos in sorted(total.items()):
+        # Etapas paralelas dentro de um pool podem somar mais que o pai; o tempo próprio não fica negativo
+        proprio = max(segundos - filhos.get(chave, 0.0), 0.0)
+        linhas.append(f"{';'.join(chave)} {int(round(proprio * 1e6))}")
+    return linhas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resume um trace da instrumentação e gera o formato do flame graph.")
+    parser.add_argument('trace', help="Arquivo JSON lines gravado com INSTRUMENTACAO=<arquivo>.")
+    parser.add_argument('--folded', default=None, help="Grava as pilhas no formato 'folded' neste arquivo.")
+    args = parser.parse_args()
+
+    registros = ler_trace(args.trace)
+    print(f"{'etapa':<60} {'n':>5} {'parede (s)':>11} {'CPU (s)':>9} {'pico RSS (MB)':>14} {'linhas entrada':>15} {'linhas saída':>13}")
+    for caminho, item in resumir(registros).items():
+        print(f"{caminho:<60} {item['chamadas']:>5} {item['segundos']:>11.2f} {item['cpu_s']:>9.2f} "
+              f"{item['pico_rss_mb']:>14.0f} {item['linhas_entrada']:>15} {item['linhas_saida']:>13}")
+
+    if args.folded:
+        with open(args.folded, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(para_folded(registros)) + '\n')
+        print(f"\nPilhas salvas em '{args.folded}' (use com flamegraph.pl ou speedscope).")
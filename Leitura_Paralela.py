@@ -0,0 +1,223 @@
+"""Leitura paralela e em blocos dos CSVs diários do CIC-IDS."""
+
+import os
+from time import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from Estatisticas import PerfilColunas
+from Artefatos import criar_matriz
+from Instrumentacao import etapa, instrumentar, pico_memoria_mb, reiniciar_pico_memoria, pico_memoria_desde_reinicio_mb
+
+# Quantidade de linhas lidas por vez de cada arquivo. Limita o pico de memória de cada processo.
+TAMANHO_BLOCO = 200_000
+
+# Quantidade de linhas usadas para descobrir o tipo de cada coluna
+AMOSTRA_ESQUEMA = 10_000
+
+
+def inferir_esquema(file_path, nrows=AMOSTRA_ESQUEMA):
+    """Descobre um tipo compacto para cada coluna a partir de uma amostra do arquivo."""
+    amostra = pd.read_csv(file_path, nrows=nrows, low_memory=False)
+    amostra.columns = amostra.columns.str.strip()
+
+    esquema = {}
+    for col in amostra.columns:
+        if col == 'Label':
+            esquema[col] = 'category'
+        elif pd.api.types.is_bool_dtype(amostra[col]):
+            esquema[col] = 'object'
+        elif pd.api.types.is_integer_dtype(amostra[col]):
+            esquema[col] = 'int32'
+        elif pd.api.types.is_numeric_dtype(amostra[col]):
+            esquema[col] = 'float32'
+        else:
+            # IPs, timestamps e identificadores de fluxo. Só participam da verificação de nulos.
+            esquema[col] = 'object'
+    return esquema
+
+
+def colunas_numericas(esquema):
+    """Lista as colunas numéricas do esquema, na ordem original do arquivo."""
+    return [col for col, tipo in esquema.items() if tipo in ('int32', 'float32')]
+
+
+def _tipos_de_leitura(nomes_originais, esquema):
+    # As colunas inteiras são lidas como float64 porque podem conter 'Infinity' ou vazios.
+    # Depois da limpeza todas as colunas numéricas são gravadas em float32.
+    tipos = {}
+    for orig in nomes_originais:
+        tipo = esquema.get(orig.strip())
+        if tipo == 'float32':
+            tipos[orig] = np.float32
+        elif tipo == 'int32':
+            tipos[orig] = np.float64
+        elif tipo == 'category':
+            tipos[orig] = 'category'
+        elif tipo == 'object':
+            tipos[orig] = object
+    return tipos
+
+
+@instrumentar()
+def processar_arquivo(file_path, esquema, destino, tamanho_bloco=TAMANHO_BLOCO):
+    """Lê, limpa e grava um arquivo bloco a bloco, devolvendo um resumo da leitura.
+
+    As características limpas vão para '<destino>.X' (float32 em binário cru, linha a linha)
+    e os rótulos para '<destino>.y' (códigos int16 relativos a 'classes' do resumo).
+    O pico de RSS do resumo é o deste arquivo; onde o pico não pode ser reiniciado (fora do Linux),
+    é o pico acumulado do processo do pool, e 'pico_rss_por_arquivo' fica False.
+    """
+    inicio = time()
+    # Um processo do pool trata vários arquivos: sem reiniciar, o pico seria o do maior arquivo já lido por ele
+    por_arquivo = reiniciar_pico_memoria()
+
+    nomes_originais = pd.read_csv(file_path, nrows=0).columns
+    presentes = {orig.strip() for orig in nomes_originais}
+    ausentes = [col for col in esquema if col not in presentes]
+    if ausentes:
+        raise ValueError(f"colunas ausentes no arquivo: {ausentes}")
+
+    usar = [orig for orig in nomes_originais if orig.strip() in esquema]
+    numericas = colunas_numericas(esquema)
+    outras = [col for col in esquema if col not in numericas]
+    tem_rotulo = 'Label' in esquema
+
+    linhas_lidas = 0
+    linhas_mantidas = 0
+    perfil = PerfilColunas(numericas)
+    classes = []
+
+    leitor = pd.read_csv(file_path, usecols=usar, dtype=_tipos_de_leitura(usar, esquema), chunksize=tamanho_bloco)
+
+    with open(destino + '.X', 'wb') as saida_x, open(destino + '.y', 'wb') as saida_y:
+        while True:
+            # A leitura é medida à parte: é ela que costuma dominar o tempo desta etapa
+            with etapa('leitura_csv', arquivo=os.path.basename(file_path)) as medida:
+                bloco = next(leitor, None)
+                medida.linhas_saida = 0 if bloco is None else len(bloco)
+            if bloco is None:
+                break
+            bloco.columns = bloco.columns.str.strip()
+            linhas_lidas += len(bloco)
+
+            with etapa('limpeza_bloco', linhas_entrada=len(bloco)) as medida:
+                # Mesmo critério do replace([np.inf, -np.inf], np.nan) + dropna(), mas feito sobre o bloco:
+                # uma linha é removida se tiver qualquer valor infinito ou nulo.
+                valores = bloco[numericas].to_numpy(dtype=np.float64)
+                perfil.registrar_invalidos(valores)
+                validas = np.isfinite(valores).all(axis=1)
+                if outras:
+                    validas &= bloco[outras].notna().all(axis=1).to_numpy()
+                valores = valores[validas]
+
+                # Contagem, média, M2, mínimo e máximo de cada coluna, na mesma passada da limpeza
+                perfil.atualizar(valores)
+                medida.linhas_saida = len(valores)
+
+            with etapa('gravacao_bloco', linhas_entrada=len(valores)):
+                saida_x.write(np.ascontiguousarray(valores, dtype=np.float32).tobytes())
+
+                if tem_rotulo:
+                    rotulos = bloco['Label'].to_numpy(dtype=object)[validas]
+                    for nome in pd.unique(rotulos):
+                        if nome not in classes:
+                            classes.append(nome)
+                    codigos = pd.Categorical(rotulos, categories=classes).codes.astype(np.int16)
+                    saida_y.write(codigos.tobytes())
+
+            linhas_mantidas += len(valores)
+
+    duracao = time() - inicio
+    return {
+        'arquivo': os.path.basename(file_path),
+        'destino': destino,
+        'linhas_lidas': linhas_lidas,
+        'linhas_mantidas': linhas_mantidas,
+        'segundos': duracao,
+        'linhas_por_segundo': linhas_lidas / duracao if duracao > 0 else float('nan'),
+        'pico_rss_mb': pico_memoria_desde_reinicio_mb() if por_arquivo else pico_memoria_mb(),
+        'pico_rss_por_arquivo': por_arquivo,
+        'colunas_numericas': numericas,
+        'perfil': perfil,
+        'classes': classes,
+    }
+
+
+def abrir_parte(resumo):
+    """Abre as características e os rótulos gravados por processar_arquivo sem copiá-los para a memória."""
+    forma = (resumo['linhas_mantidas'], len(resumo['colunas_numericas']))
+    if resumo['linhas_mantidas'] == 0:
+        return np.empty(forma, dtype=np.float32), np.empty(0, dtype=np.int16)
+    X = np.memmap(resumo['destino'] + '.X', dtype=np.float32, mode='r', shape=forma)
+    y = np.memmap(resumo['destino'] + '.y', dtype=np.int16, mode='r') if resumo['classes'] else None
+    return X, y
+
+
+def carregar_em_paralelo(caminhos, pasta_partes, esquema, max_workers=None, tamanho_bloco=TAMANHO_BLOCO):
+    """Processa os arquivos em um pool de processos e devolve os resumos na ordem de entrada."""
+    os.makedirs(pasta_partes, exist_ok=True)
+    if max_workers is None:
+        max_workers = min(len(caminhos), os.cpu_count() or 1)
+
+    resumos = {}
+    with ProcessPoolExecutor(max_workers=max(max_workers, 1)) as pool:
+        futuros = {}
+        for caminho in caminhos:
+            destino = os.path.join(pasta_partes, os.path.basename(caminho))
+            futuros[pool.submit(processar_arquivo, caminho, esquema, destino, tamanho_bloco)] = caminho
+
+        for futuro in as_completed(futuros):
+            caminho = futuros[futuro]
+            nome = os.path.basename(caminho)
+            try:
+                resumo = futuro.result()
+            except Exception as e:
+                print(f"Erro ao carregar '{nome}': {e}. Pulando.")
+                continue
+            resumos[caminho] = resumo
+            print(f"Carregado: {nome} | {resumo['linhas_lidas']} linhas lidas, "
+                  f"{resumo['linhas_lidas'] - resumo['linhas_mantidas']} removidas | "
+                  f"{resumo['linhas_por_segundo']:,.0f} linhas/s | pico RSS {resumo['pico_rss_mb']:.0f} MB"
+                  f"{'' if resumo['pico_rss_por_arquivo'] else ' (acumulado do processo)'}")
+
+    return [resumos[c] for c in caminhos if c in resumos]
+
+
+def unificar_partes(resumos, colunas_x, classes, base_x, base_y, tamanho_bloco=TAMANHO_BLOCO, **meta):
+    """Copia as partes limpas, em blocos e na ordem de 'resumos', para os artefatos finais de X e y.
+
+    Só as colunas de 'colunas_x' são mantidas. Os códigos locais de cada parte são traduzidos para
+    a posição do rótulo em 'classes'. Devolve o número de linhas gravadas.
+    """
+    if classes:
+        # Com rótulos no artefato final, toda parte com linhas precisa tê-los (abrir_parte devolve y=None)
+        sem_rotulo = [r['arquivo'] for r in resumos if r['linhas_mantidas'] and not r['classes']]
+        if sem_rotulo:
+            raise ValueError(f"Partes sem a coluna 'Label' misturadas com partes rotuladas: {sem_rotulo}.")
+    colunas_numericas = resumos[0]['colunas_numericas']
+    indices_mantidos = [colunas_numericas.index(col) for col in colunas_x]
+    linhas = sum(r['linhas_mantidas'] for r in resumos)
+
+    X_saida = criar_matriz(base_x, linhas, colunas_x, **meta)
+    y_saida = criar_matriz(base_y, linhas, 0, dtype=np.int32, classes=classes) if classes else None
+
+    posicao = 0
+    for resumo in resumos:
+        X_parte, y_parte = abrir_parte(resumo)
+        if y_saida is not None:
+            mapa = np.array([classes.index(nome) for nome in resumo['classes']], dtype=np.int32)
+        for inicio in range(0, len(X_parte), tamanho_bloco):
+            fim = min(inicio + tamanho_bloco, len(X_parte))
+            X_saida[posicao + inicio:posicao + fim] = X_parte[inicio:fim][:, indices_mantidos]
+            if y_saida is not None:
+                y_saida[posicao + inicio:posicao + fim] = mapa[y_parte[inicio:fim]]
+        posicao += len(X_parte)
+        del X_parte, y_parte
+
+    X_saida.flush()
+    if y_saida is not None:
+        y_saida.flush()
+    return linhas
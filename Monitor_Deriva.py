@@ -0,0 +1,361 @@
+"""Monitor de deriva e de qualidade dos dados no momento da classificação.
+
+Na limpeza (Script 1) é gravado um perfil de referência do conjunto de treino: média e desvio de cada
+característica, as faixas de quantis de cada uma com a proporção de linhas em cada faixa, as taxas de
+nulos/infinitos e a proporção de cada classe. Em produção, o MonitorDeriva acumula os mesmos números
+sobre os lotes que chegam, em memória fixa (um histograma por coluna, independente do volume), e calcula
+PSI e KS por coluna e o PSI das classes previstas, sem rodar o pipeline de novo.
+
+    python Monitor_Deriva.py referencia              # refaz o perfil a partir do CICIDS_X/CICIDS_y
+    python Monitor_Deriva.py comparar fluxos.csv     # deriva de um CSV em relação ao treino
+"""
+
+import os
+import json
+import argparse
+from time import time
+
+import numpy as np
+
+ARQUIVO_REFERENCIA = 'referencia_deriva.json'
+ARQUIVO_METRICAS_DERIVA = 'metricas_deriva.jsonl'
+
+N_FAIXAS = 10
+LINHAS_AMOSTRA = 200_000
+TAMANHO_BLOCO = 200_000
+
+# Limites usuais do PSI: abaixo de 0,1 a distribuição é estável; acima de 0,25 a mudança é significativa
+LIMITE_PSI_MODERADO = 0.1
+LIMITE_PSI_SIGNIFICATIVO = 0.25
+# Proporção mínima de uma faixa no cálculo do PSI (evita log de zero em faixas vazias)
+PROPORCAO_MINIMA = 1e-4
+
+
+def _contar_faixas(valores, cortes):
+    """Histograma (colunas x faixas) de um bloco, com os cortes de quantis de cada coluna."""
+    n_colunas, n_cortes = cortes.shape
+    faixas = np.empty(valores.shape, dtype=np.int64)
+    for j in range(n_colunas):
+        faixas[:, j] = np.searchsorted(cortes[j], valores[:, j], side='right')
+    # Um único bincount para todas as colunas: a faixa de cada coluna é deslocada para um intervalo próprio
+    faixas += np.arange(n_colunas) * (n_cortes + 1)
+    return np.bincount(faixas.ravel(), minlength=n_colunas * (n_cortes + 1)).reshape(n_colunas, n_cortes + 1)
+
+
+def _psi(referencia, atual):
+    p = np.maximum(referencia, PROPORCAO_MINIMA)
+    q = np.maximum(atual, PROPORCAO_MINIMA)
+    return ((q - p) * np.log(q / p)).sum(axis=-1)
+
+
+def _ks(referencia, atual):
+    # KS sobre as faixas de quantis: a maior distância entre as distribuições acumuladas nas fronteiras das faixas
+    return np.abs(np.cumsum(referencia, axis=-1) - np.cumsum(atual, axis=-1)).max(axis=-1)
+
+
+def _nivel(psi):
+    if psi >= LIMITE_PSI_SIGNIFICATIVO:
+        return 'significativa'
+    if psi >= LIMITE_PSI_MODERADO:
+        return 'moderada'
+    return 'estavel'
+
+
+class PerfilReferencia:
+    """Distribuição de cada característica e das classes no conjunto de treino, salva em JSON."""
+
+    def __init__(self, colunas, media, desvio, cortes, proporcoes, taxa_nulos, taxa_infinitos,
+                 taxa_linhas_invalidas=0.0, classes=None, proporcoes_classes=None):
+        self.colunas = list(colunas)
+        self.media = np.asarray(media, dtype=np.float64)
+        self.desvio = np.asarray(desvio, dtype=np.float64)
+        self.cortes = np.asarray(cortes, dtype=np.float64)
+        self.proporcoes = np.asarray(proporcoes, dtype=np.float64)
+        self.taxa_nulos = np.asarray(taxa_nulos, dtype=np.float64)
+        self.taxa_infinitos = np.asarray(taxa_infinitos, dtype=np.float64)
+        self.taxa_linhas_invalidas = float(taxa_linhas_invalidas)
+        self.classes = list(classes) if classes is not None else None
+        self.proporcoes_classes = np.asarray(proporcoes_classes, dtype=np.float64) if proporcoes_classes is not None else None
+
+    @classmethod
+    def construir(cls, X, perfil, y=None, classes=None, linhas_removidas=0, n_faixas=N_FAIXAS,
+                  linhas_amostra=LINHAS_AMOSTRA, tamanho_bloco=TAMANHO_BLOCO, semente=42):
+        """Monta a referência a partir do X limpo (array ou memmap) e do PerfilColunas da limpeza.
+
+        Os cortes de quantis vêm de uma amostra aleatória das linhas; as proporções de cada faixa são
+        contadas depois sobre o X inteiro, em blocos. Cortes repetidos (colunas com muitos zeros) são
+        unificados, e as faixas que sobram ficam vazias.
+        """
+        n = len(X)
+        linhas = np.sort(np.random.default_rng(semente).choice(n, size=min(linhas_amostra, n), replace=False))
+        amostra = np.asarray(X[linhas], dtype=np.float64)
+        quantis = np.quantile(amostra, np.linspace(0, 1, n_faixas + 1)[1:-1], axis=0).T
+        cortes = np.full(quantis.shape, np.inf)
+        for j, q in enumerate(quantis):
+            unicos = np.unique(q)
+            cortes[j, :len(unicos)] = unicos
+
+        contagens = np.zeros((X.shape[1], n_faixas), dtype=np.int64)
+        for inicio in range(0, n, tamanho_bloco):
+            contagens += _contar_faixas(np.asarray(X[inicio:inicio + tamanho_bloco], dtype=np.float64), cortes)
+
+        # Nulos e infinitos foram contados pela limpeza antes de remover as linhas, sobre o CSV bruto
+        brutas = max(perfil.linhas_brutas, 1)
+        proporcoes_classes = None
+        if y is not None:
+            contagens_classes = np.bincount(np.asarray(y).ravel(), minlength=len(classes) if classes else 0)
+            proporcoes_classes = contagens_classes / max(contagens_classes.sum(), 1)
+        return cls(perfil.colunas, perfil.media, perfil.desvio, cortes, contagens / max(n, 1),
+                   perfil.nulos / brutas, perfil.infinitos / brutas, linhas_removidas / max(n + linhas_removidas, 1),
+                   classes, proporcoes_classes)
+
+    def para_dict(self):
+        return {
+            'colunas': self.colunas,
+            'media': self.media.tolist(),
+            'desvio': self.desvio.tolist(),
+            'cortes': self.cortes.tolist(),
+            'proporcoes': self.proporcoes.tolist(),
+            'taxa_nulos': self.taxa_nulos.tolist(),
+            'taxa_infinitos': self.taxa_infinitos.tolist(),
+            'taxa_linhas_invalidas': self.taxa_linhas_invalidas,
+            'classes': self.classes,
+            'proporcoes_classes': self.proporcoes_classes.tolist() if self.proporcoes_classes is not None else None,
+        }
+
+    @classmethod
+    def de_dict(cls, dados):
+        return cls(**dados)
+
+    def salvar(self, caminho=ARQUIVO_REFERENCIA):
+        temporario = caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            # Os cortes não usados ficam como 'Infinity', que o json lê de volta sem problemas
+            json.dump(self.para_dict(), f, ensure_ascii=False)
+        os.replace(temporario, caminho)
+
+    @classmethod
+    def carregar(cls, caminho=ARQUIVO_REFERENCIA):
+        with open(caminho, encoding='utf-8') as f:
+            return cls.de_dict(json.load(f))
+
+
+class MonitorDeriva:
+    """Estatísticas dos lotes recebidos em produção, comparadas com o PerfilReferencia.
+
+    A memória é fixa: um histograma por coluna, somas para média e desvio, contadores de nulos e
+    infinitos e a contagem das classes previstas. Com 'meia_vida' (em linhas), o peso das linhas
+    antigas cai pela metade a cada 'meia_vida' linhas novas, e o monitor passa a refletir o tráfego
+    recente; sem ela, tudo desde o último reiniciar() pesa igual.
+    """
+
+    def __init__(self, referencia, meia_vida=None):
+        self.referencia = referencia
+        self.meia_vida = meia_vida
+        self.reiniciar()
+
+    def reiniciar(self):
+        k, n_faixas = self.referencia.proporcoes.shape
+        n_classes = len(self.referencia.classes or [])
+        self.contagens = np.zeros((k, n_faixas))
+        # Somas dos desvios em relação à média de referência (mais estáveis que as somas dos valores brutos)
+        self.soma = np.zeros(k)
+        self.soma_quadrados = np.zeros(k)
+        self.linhas_validas = 0.0
+        self.linhas = 0.0
+        self.linhas_invalidas = 0.0
+        self.nulos = np.zeros(k)
+        self.infinitos = np.zeros(k)
+        self.previstas = np.zeros(n_classes)
+        self.lotes = 0
+
+    def _esquecer(self, n):
+        fator = 0.5 ** (n / self.meia_vida)
+        for acumulado in (self.contagens, self.soma, self.soma_quadrados, self.nulos, self.infinitos, self.previstas):
+            acumulado *= fator
+        self.linhas_validas *= fator
+        self.linhas *= fator
+        self.linhas_invalidas *= fator
+
+    def atualizar(self, valores, previstos=None):
+        """Incorpora um lote (linhas x colunas da referência, escala original) e, se houver, os códigos previstos."""
+        valores = np.asarray(valores, dtype=np.float64)
+        if self.meia_vida:
+            self._esquecer(len(valores))
+        self.lotes += 1
+        self.linhas += len(valores)
+
+        nulos = np.isnan(valores)
+        infinitos = np.isinf(valores)
+        self.nulos += nulos.sum(axis=0)
+        self.infinitos += infinitos.sum(axis=0)
+        # As linhas inválidas seriam descartadas pela limpeza: entram nas taxas, mas não nas distribuições
+        validas = ~(nulos | infinitos).any(axis=1)
+        self.linhas_invalidas += len(valores) - int(validas.sum())
+        valores = valores[validas]
+
+        self.contagens += _contar_faixas(valores, self.referencia.cortes)
+        desvios = valores - self.referencia.media
+        self.soma += desvios.sum(axis=0)
+        self.soma_quadrados += (desvios * desvios).sum(axis=0)
+        self.linhas_validas += len(valores)
+
+        if previstos is not None and len(self.previstas):
+            self.previstas += np.bincount(np.asarray(previstos).ravel(), minlength=len(self.previstas))
+        return self
+
+    def proporcoes(self):
+        return self.contagens / max(self.linhas_validas, 1e-12)
+
+    def psi(self):
+        """PSI de cada coluna em relação à referência."""
+        if not self.linhas_validas:
+            return np.zeros(len(self.referencia.colunas))
+        return _psi(self.referencia.proporcoes, self.proporcoes())
+
+    def ks(self):
+        """Estatística KS de cada coluna, calculada nas fronteiras das faixas de quantis."""
+        if not self.linhas_validas:
+            return np.zeros(len(self.referencia.colunas))
+        return _ks(self.referencia.proporcoes, self.proporcoes())
+
+    def deslocamento_media(self):
+        """Diferença entre a média atual e a de referência, em desvios-padrão de referência."""
+        media = self.soma / max(self.linhas_validas, 1e-12)
+        return np.divide(media, self.referencia.desvio, out=np.zeros_like(media), where=self.referencia.desvio > 0)
+
+    def razao_desvio(self):
+        """Desvio-padrão atual dividido pelo de referência."""
+        n = max(self.linhas_validas, 1e-12)
+        variancia = np.maximum(self.soma_quadrados / n - (self.soma / n) ** 2, 0)
+        return np.divide(np.sqrt(variancia), self.referencia.desvio, out=np.ones_like(variancia),
+                         where=self.referencia.desvio > 0)
+
+    def por_coluna(self):
+        """Todas as métricas de cada coluna, da maior deriva (PSI) para a menor."""
+        n = max(self.linhas, 1e-12)
+        psi, ks = self.psi(), self.ks()
+        deslocamento, razao = self.deslocamento_media(), self.razao_desvio()
+        taxa_nulos, taxa_infinitos = self.nulos / n, self.infinitos / n
+        colunas = []
+        for j in np.argsort(-psi):
+            colunas.append({
+                'coluna': self.referencia.colunas[j],
+                'psi': float(psi[j]),
+                'ks': float(ks[j]),
+                'deslocamento_media': float(deslocamento[j]),
+                'razao_desvio': float(razao[j]),
+                'taxa_nulos': float(taxa_nulos[j]),
+                'taxa_nulos_referencia': float(self.referencia.taxa_nulos[j]),
+                'taxa_infinitos': float(taxa_infinitos[j]),
+                'taxa_infinitos_referencia': float(self.referencia.taxa_infinitos[j]),
+            })
+        return colunas
+
+    def resumo(self, n_colunas=10):
+        """Métricas agregadas e as 'n_colunas' colunas com maior deriva."""
+        colunas = self.por_coluna()
+        psi_maximo = colunas[0]['psi'] if colunas else 0.0
+        resumo = {
+            'linhas': float(self.linhas),
+            'lotes': self.lotes,
+            'taxa_linhas_invalidas': self.linhas_invalidas / max(self.linhas, 1e-12),
+            'taxa_linhas_invalidas_referencia': self.referencia.taxa_linhas_invalidas,
+            'psi_maximo': psi_maximo,
+            'psi_medio': float(np.mean([c['psi'] for c in colunas])) if colunas else 0.0,
+            'colunas_com_deriva': sum(c['psi'] >= LIMITE_PSI_MODERADO for c in colunas),
+            'deriva': _nivel(psi_maximo),
+            'colunas': colunas[:n_colunas],
+        }
+        if self.referencia.proporcoes_classes is not None and self.previstas.sum() > 0:
+            previstas = self.previstas / self.previstas.sum()
+            psi_classes = float(_psi(self.referencia.proporcoes_classes, previstas))
+            resumo['psi_classes'] = psi_classes
+            resumo['deriva_classes'] = _nivel(psi_classes)
+            resumo['proporcoes_classes'] = {nome: {'atual': float(a), 'referencia': float(r)} for nome, a, r in
+                                            zip(self.referencia.classes, previstas, self.referencia.proporcoes_classes)}
+        return resumo
+
+    def exportar(self, caminho=ARQUIVO_METRICAS_DERIVA, n_colunas=10, **campos):
+        """Acrescenta o resumo atual, com o horário, como uma linha JSON ao arquivo de métricas."""
+        registro = {'tempo': time(), **campos, **self.resumo(n_colunas)}
+        with open(caminho, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(registro, ensure_ascii=False) + '\n')
+        return registro
+
+
+def criar_referencia(base_x='CICIDS_X', base_y='CICIDS_y', arquivo_perfil='perfil_CICIDS.json',
+                     destino=ARQUIVO_REFERENCIA):
+    """Monta e grava o perfil de referência a partir dos artefatos e do perfil gravados pelo Script 1."""
+    from Artefatos import carregar_matriz, carregar_metadados, existe
+    from Estatisticas import PerfilColunas
+
+    X = carregar_matriz(base_x)
+    meta = carregar_metadados(base_x)
+    perfil = PerfilColunas.carregar(arquivo_perfil).selecionar(meta['colunas'])
+    y, classes = None, None
+    if existe(base_y):
+        y = carregar_matriz(base_y)
+        classes = carregar_metadados(base_y).get('classes')
+    referencia = PerfilReferencia.construir(X, perfil, y, classes, linhas_removidas=meta.get('linhas_removidas', 0))
+    referencia.salvar(destino)
+    return referencia
+
+
+def _imprimir(resumo):
+    print(f"Linhas: {resumo['linhas']:.0f} em {resumo['lotes']} lotes | inválidas: "
+          f"{resumo['taxa_linhas_invalidas']:.4%} (treino: {resumo['taxa_linhas_invalidas_referencia']:.4%})")
+    print(f"Deriva das características: {resumo['deriva']} (PSI máximo {resumo['psi_maximo']:.4f}, "
+          f"{resumo['colunas_com_deriva']} colunas com PSI >= {LIMITE_PSI_MODERADO})")
+    if 'psi_classes' in resumo:
+        print(f"Deriva das classes previstas: {resumo['deriva_classes']} (PSI {resumo['psi_classes']:.4f})")
+    print(f"\n{'coluna':<32} {'PSI':>8} {'KS':>7} {'desl. média':>12} {'razão desvio':>13}")
+    for c in resumo['colunas']:
+        print(f"{c['coluna']:<32} {c['psi']:>8.4f} {c['ks']:>7.4f} {c['deslocamento_media']:>12.3f} "
+              f"{c['razao_desvio']:>13.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monitor de deriva em relação ao conjunto de treino.")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    sub.add_parser('referencia', help="Monta o perfil de referência a partir do CICIDS_X/CICIDS_y.")
+    p = sub.add_parser('comparar', help="Compara um CSV de fluxos com o perfil de referência.")
+    p.add_argument('entrada')
+    p.add_argument('--referencia', default=ARQUIVO_REFERENCIA)
+    p.add_argument('--modelo', default='modelo_mlp.npz', help="Motor usado para a deriva das classes previstas.")
+    p.add_argument('--saida', default=ARQUIVO_METRICAS_DERIVA)
+    p.add_argument('--tamanho-bloco', type=int, default=100_000)
+    p.add_argument('--colunas', type=int, default=10, help="Quantas colunas mostrar, da maior deriva para a menor.")
+    args = parser.parse_args()
+
+    if args.comando == 'referencia':
+        inicio = time()
+        referencia = criar_referencia()
+        print(f"Perfil de referência ({len(referencia.colunas)} colunas) salvo em '{ARQUIVO_REFERENCIA}' "
+              f"em {time() - inicio:.2f} segundos.")
+    else:
+        import pandas as pd
+
+        referencia = PerfilReferencia.carregar(args.referencia)
+        motor = None
+        if os.path.exists(args.modelo):
+            from Inferencia import MotorInferencia
+            motor = MotorInferencia.carregar(args.modelo)
+            if motor.colunas != referencia.colunas:
+                print(f"As colunas do modelo '{args.modelo}' não batem com as da referência; classes não monitoradas.")
+                motor = None
+
+        monitor = MonitorDeriva(referencia)
+        colunas = set(referencia.colunas)
+        for bloco in pd.read_csv(args.entrada, chunksize=args.tamanho_bloco, usecols=lambda nome: nome.strip() in colunas):
+            bloco.columns = bloco.columns.str.strip()
+            X = bloco[referencia.colunas].to_numpy(dtype=np.float64)
+            previstos = None
+            if motor is not None:
+                validas = np.isfinite(X).all(axis=1)
+                previstos = motor.prever_indices(X[validas].astype(np.float32))
+            monitor.atualizar(X, previstos)
+
+        resumo = monitor.exportar(args.saida, args.colunas, entrada=args.entrada)
+        _imprimir(resumo)
+        print(f"\nMétricas acrescentadas a '{args.saida}'.")
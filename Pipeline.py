@@ -0,0 +1,345 @@
+"""Executor do pipeline com cache por conteúdo: etapas cujas entradas não mudaram não são refeitas.
+
+A chave de cada etapa combina:
+  - os parâmetros que ela usa (Configuracao.py);
+  - o código do script e das partes dos módulos locais que ele usa (o Configuracao.py entra só pelos parâmetros);
+  - as entradas: os CSVs originais (tamanho e data de modificação, ou o hash completo com --hash-completo)
+    para a limpeza, e a chave da etapa anterior para as demais.
+Se a chave já estiver no cache, as saídas são restauradas em vez de recalculadas. Assim, mudar apenas
+a arquitetura do MLP faz o pipeline começar direto no treinamento.
+"""
+
+import os
+import ast
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+import subprocess
+from time import time
+
+import Configuracao
+
+PASTA_CACHE = '.cache_etapas'
+ARQUIVO_ESTADO = '.pipeline_estado.json'
+LIMITE_CACHE_GB = 20
+
+ETAPAS = [
+    {
+        'nome': 'limpeza',
+        'script': 'Carregamento_Limpeza.py',
+        'parametros': ['DATA_PATH', 'filenames', 'cols_to_remove_manually'],
+        'saidas': ['CICIDS_X.npy', 'CICIDS_X.json', 'CICIDS_y.npy', 'CICIDS_y.json', 'perfil_CICIDS.json',
+                   'referencia_deriva.json'],
+    },
+    {
+        'nome': 'preparacao',
+        'script': 'Preparação_Normalização.py',
+        'parametros': ['TEST_SIZE', 'RANDOM_STATE', 'N_DOBRAS', 'K_NEIGHBORS', 'sampling_strategy', 'ESTRATEGIA_SMOTE',
+                       'MINIMO_SMOTE'],
+        'saidas': ['classes.npy', 'scaler.json', 'X_train_scaled.npy', 'X_train_scaled.json', 'y_train.npy',
+                   'y_train.json', 'X_test_scaled.npy', 'X_test_scaled.json', 'y_test.npy', 'y_test.json',
+                   'indices_treino.npy', 'indices_treino.json', 'indices_teste.npy', 'indices_teste.json'],
+        'opcionais': ['dobras_treino.npy', 'dobras_treino.json'],
+    },
+    {
+        'nome': 'treinamento',
+        'script': 'Treinamento_Avaliação.py',
+        'parametros': ['MLP_CONFIG', 'MODO_TREINO', 'N_THREADS_TREINO'],
+        'saidas': ['modelo_mlp.pkl', 'modelo_mlp.npz'],
+        'opcionais': ['matriz_confusao.png', 'metricas_teste.json'],
+        # O checkpoint_mlp.pkl não é apagado: um treino interrompido é retomado, e o Treino_Streaming
+        # já ignora checkpoints concluídos ou de outros dados
+    },
+]
+
+PASTA_PROJETO = os.path.dirname(os.path.abspath(__file__))
+# Módulos só de parâmetros: ficam fora do hash do código (cada etapa já é chaveada pelos seus 'parametros')
+MODULOS_DE_PARAMETROS = {'Configuracao.py'}
+
+
+def _hash_arquivo(caminho):
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for pedaco in iter(lambda: f.read(1 << 20), b''):
+            h.update(pedaco)
+    return h.hexdigest()
+
+
+def impressao_arquivo(caminho, completo=False):
+    """Identifica o conteúdo de um arquivo: tamanho + data de modificação, ou o SHA-256 se 'completo'."""
+    if not os.path.exists(caminho):
+        return 'ausente'
+    if completo:
+        return _hash_arquivo(caminho)
+    info = os.stat(caminho)
+    return f"{info.st_size}-{info.st_mtime_ns}"
+
+
+_DEFINICOES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+def _e_bloco_main(no):
+    return (isinstance(no, ast.If) and isinstance(no.test, ast.Compare) and isinstance(no.test.left, ast.Name)
+            and no.test.left.id == '__name__')
+
+
+def _importacoes(nos):
+    """(módulo, nomes importados ou None para o módulo inteiro) de cada import em 'nos', inclusive aninhados."""
+    for raiz in nos:
+        for no in ast.walk(raiz):
+            if isinstance(no, ast.Import):
+                for alias in no.names:
+                    yield alias.name.split('.')[0], None
+            elif isinstance(no, ast.ImportFrom) and no.module and not no.level:
+                yield no.module.split('.')[0], {alias.name for alias in no.names}
+
+
+def _trechos_usados(arvore, nomes):
+    """Código de nível de módulo (fora do bloco __main__) e as definições 'nomes' (None = todas), com as que elas usam."""
+    definicoes = {no.name: no for no in arvore.body if isinstance(no, _DEFINICOES)}
+    trechos = [no for no in arvore.body if not isinstance(no, _DEFINICOES) and not _e_bloco_main(no)]
+    pendentes = list(definicoes) if nomes is None else [nome for nome in nomes if nome in definicoes]
+    pendentes += [no.id for trecho in trechos for no in ast.walk(trecho) if isinstance(no, ast.Name)]
+    usadas = set()
+    while pendentes:
+        nome = pendentes.pop()
+        if nome in usadas or nome not in definicoes:
+            continue
+        usadas.add(nome)
+        trechos.append(definicoes[nome])
+        pendentes += [no.id for no in ast.walk(definicoes[nome]) if isinstance(no, ast.Name)]
+    return trechos
+
+
+def modulos_locais(script):
+    """Arquivos .py do projeto de que 'script' depende: ele mesmo e, recursivamente, o que usa dos módulos locais.
+
+    Do script entra todo o código. De um módulo importado entram o código de nível de módulo e só as funções
+    e classes importadas (com as que elas chamam): um import dentro de uma função que a etapa não usa,
+    como o CLI de outro módulo, não faz a etapa depender daquele módulo.
+    O Configuracao.py fica de fora: os valores que cada etapa lê já entram na chave pelos 'parametros'.
+    """
+    arvores, usados = {}, {}
+    pendentes = [(script, None)]
+    while pendentes:
+        arquivo, nomes = pendentes.pop()
+        caminho = os.path.join(PASTA_PROJETO, arquivo)
+        if not os.path.exists(caminho) or arquivo in MODULOS_DE_PARAMETROS:
+            continue
+        anteriores = usados.get(arquivo, set())
+        if anteriores is None or (nomes is not None and arquivo in usados and nomes <= anteriores):
+            continue
+        usados[arquivo] = None if nomes is None else anteriores | nomes
+        if arquivo not in arvores:
+            with open(caminho, encoding='utf-8') as f:
+                arvores[arquivo] = ast.parse(f.read(), filename=arquivo)
+        arvore = arvores[arquivo]
+        trechos = arvore.body if arquivo == script else _trechos_usados(arvore, usados[arquivo])
+        pendentes += [(modulo + '.py', importados) for modulo, importados in _importacoes(trechos)]
+    return set(usados)
+
+
+def versao_do_codigo(script):
+    """Hash do código de uma etapa (script + módulos locais de que ele depende, sem o Configuracao.py)."""
+    h = hashlib.sha256()
+    for arquivo in sorted(modulos_locais(script)):
+        h.update(arquivo.encode())
+        h.update(_hash_arquivo(os.path.join(PASTA_PROJETO, arquivo)).encode())
+    return h.hexdigest()
+
+
+def entradas_externas(etapa):
+    """Arquivos de fora do pipeline lidos pela etapa (só a limpeza lê os CSVs originais)."""
+    if etapa['nome'] == 'limpeza':
+        return [os.path.join(Configuracao.DATA_PATH, arquivo) for arquivo in Configuracao.filenames]
+    return []
+
+
+def calcular_chave(etapa, chave_anterior, completo=False):
+    """Chave de cache da etapa. Muda sempre que um parâmetro, o código ou uma entrada muda."""
+    descricao = {
+        'etapa': etapa['nome'],
+        'parametros': {nome: getattr(Configuracao, nome) for nome in etapa['parametros']},
+        'codigo': versao_do_codigo(etapa['script']),
+        'entradas': {caminho: impressao_arquivo(caminho, completo) for caminho in entradas_externas(etapa)},
+        'anterior': chave_anterior,
+    }
+    texto = json.dumps(descricao, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(texto.encode()).hexdigest()[:32]
+
+
+def _copiar(origem, destino):
+    # Cópia (e não link) de propósito: os scripts reescrevem alguns arquivos no lugar (np.save, memmap 'w+'),
+    # o que corromperia a entrada do cache se os dois nomes apontassem para o mesmo arquivo.
+    if os.path.exists(destino):
+        os.remove(destino)
+    shutil.copyfile(origem, destino)
+
+
+class CacheEtapas:
+    """Saídas de cada etapa guardadas por chave, com descarte das menos usadas recentemente (LRU) por tamanho."""
+
+    def __init__(self, pasta=PASTA_CACHE, limite_bytes=LIMITE_CACHE_GB * 1024 ** 3):
+        self.pasta = pasta
+        self.limite_bytes = limite_bytes
+        os.makedirs(pasta, exist_ok=True)
+
+    def _manifesto(self, chave):
+        caminho = os.path.join(self.pasta, chave, 'manifesto.json')
+        if not os.path.exists(caminho):
+            return None
+        with open(caminho, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _gravar_manifesto(self, chave, manifesto):
+        caminho = os.path.join(self.pasta, chave, 'manifesto.json')
+        with open(caminho + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifesto, f, ensure_ascii=False, indent=2)
+        os.replace(caminho + '.tmp', caminho)
+
+    def buscar(self, chave):
+        """Manifesto da entrada, se ela existir completa no cache."""
+        manifesto = self._manifesto(chave)
+        if manifesto is None:
+            return None
+        if not all(os.path.exists(os.path.join(self.pasta, chave, arquivo)) for arquivo in manifesto['arquivos']):
+            return None
+        return manifesto
+
+    def restaurar(self, chave):
+        """Copia as saídas guardadas para a pasta de trabalho."""
+        manifesto = self.buscar(chave)
+        for arquivo in manifesto['arquivos']:
+            _copiar(os.path.join(self.pasta, chave, arquivo), arquivo)
+        manifesto['ultimo_uso'] = time()
+        self._gravar_manifesto(chave, manifesto)
+        return manifesto
+
+    def guardar(self, chave, etapa, arquivos, segundos):
+        """Guarda as saídas de uma execução. A entrada só aparece no cache depois de completa."""
+        temporaria = os.path.join(self.pasta, chave + '.tmp')
+        shutil.rmtree(temporaria, ignore_errors=True)
+        os.makedirs(temporaria)
+        for arquivo in arquivos:
+            shutil.copyfile(arquivo, os.path.join(temporaria, arquivo))
+        manifesto = {'etapa': etapa, 'chave': chave, 'arquivos': list(arquivos), 'segundos': segundos,
+                     'tamanho': sum(os.path.getsize(a) for a in arquivos), 'criado': time(), 'ultimo_uso': time()}
+        with open(os.path.join(temporaria, 'manifesto.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifesto, f, ensure_ascii=False, indent=2)
+        final = os.path.join(self.pasta, chave)
+        shutil.rmtree(final, ignore_errors=True)
+        os.replace(temporaria, final)
+
+    def entradas(self):
+        """Manifestos de todas as entradas do cache."""
+        manifestos = []
+        for chave in os.listdir(self.pasta):
+            if chave.endswith('.tmp'):
+                continue
+            manifesto = self._manifesto(chave)
+            if manifesto is not None:
+                manifestos.append(manifesto)
+        return manifestos
+
+    def descartar_antigas(self, protegidas=()):
+        """Remove as entradas usadas há mais tempo até o cache caber no limite de tamanho."""
+        manifestos = sorted(self.entradas(), key=lambda m: m['ultimo_uso'])
+        total = sum(m['tamanho'] for m in manifestos)
+        removidas = []
+        for manifesto in manifestos:
+            if total <= self.limite_bytes:
+                break
+            if manifesto['chave'] in protegidas:
+                continue
+            shutil.rmtree(os.path.join(self.pasta, manifesto['chave']), ignore_errors=True)
+            total -= manifesto['tamanho']
+            removidas.append(manifesto['chave'])
+        return removidas
+
+
+def _ler_estado():
+    if not os.path.exists(ARQUIVO_ESTADO):
+        return {}
+    with open(ARQUIVO_ESTADO, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _gravar_estado(estado):
+    with open(ARQUIVO_ESTADO + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(estado, f, ensure_ascii=False, indent=2)
+    os.replace(ARQUIVO_ESTADO + '.tmp', ARQUIVO_ESTADO)
+
+
+def executar(ate=None, forcar=(), completo=False, limite_gb=LIMITE_CACHE_GB):
+    """Roda as etapas em ordem, pulando ou restaurando do cache as que não mudaram."""
+    cache = CacheEtapas(limite_bytes=limite_gb * 1024 ** 3)
+    estado = _ler_estado()
+    chave_anterior = ''
+    usadas = []
+
+    for etapa in ETAPAS:
+        nome = etapa['nome']
+        chave = calcular_chave(etapa, chave_anterior, completo)
+        usadas.append(chave)
+        atual = estado.get(nome, {})
+        manifesto = cache.buscar(chave)
+
+        if nome not in forcar and atual.get('chave') == chave and all(os.path.exists(a) for a in atual.get('arquivos', [])):
+            print(f"[{nome}] sem mudanças, saídas já estão na pasta de trabalho (chave {chave[:12]}).")
+        elif nome not in forcar and manifesto is not None:
+            cache.restaurar(chave)
+            estado[nome] = {'chave': chave, 'arquivos': manifesto['arquivos'], 'segundos': manifesto['segundos']}
+            print(f"[{nome}] restaurada do cache (chave {chave[:12]}), economizando ~{manifesto['segundos']:.0f} s.")
+        else:
+            print(f"[{nome}] executando {etapa['script']} (chave {chave[:12]})")
+            for arquivo in etapa['saidas'] + etapa.get('opcionais', []) + etapa.get('temporarios', []):
+                if os.path.exists(arquivo):
+                    os.remove(arquivo)
+            # Invalida o estado antes de rodar: se a etapa falhar no meio, a próxima execução a refaz
+            estado.pop(nome, None)
+            _gravar_estado(estado)
+
+            inicio = time()
+            retorno = subprocess.run([sys.executable, etapa['script']])
+            segundos = time() - inicio
+
+            faltando = [a for a in etapa['saidas'] if not os.path.exists(a)]
+            if retorno.returncode != 0 or faltando:
+                print(f"[{nome}] falhou (código {retorno.returncode}, saídas ausentes: {faltando}). Interrompendo.")
+                return False
+
+            arquivos = etapa['saidas'] + [a for a in etapa.get('opcionais', []) if os.path.exists(a)]
+            cache.guardar(chave, nome, arquivos, segundos)
+            estado[nome] = {'chave': chave, 'arquivos': arquivos, 'segundos': segundos}
+            print(f"[{nome}] concluída em {segundos:.1f} s e guardada no cache.")
+
+        _gravar_estado(estado)
+        chave_anterior = chave
+        if nome == ate:
+            break
+
+    removidas = cache.descartar_antigas(protegidas=usadas)
+    if removidas:
+        print(f"Cache acima de {limite_gb} GB: {len(removidas)} entradas antigas removidas.")
+    return True
+
+
+if __name__ == "__main__":
+    nomes = [etapa['nome'] for etapa in ETAPAS]
+    parser = argparse.ArgumentParser(description="Executa o pipeline reaproveitando as etapas que não mudaram.")
+    parser.add_argument('--ate', choices=nomes, default=None, help="Última etapa a executar.")
+    parser.add_argument('--forcar', nargs='+', choices=nomes, default=[], help="Etapas a refazer mesmo com cache.")
+    parser.add_argument('--hash-completo', action='store_true',
+                        help="Usa o SHA-256 dos CSVs originais em vez de tamanho e data de modificação.")
+    parser.add_argument('--limite-gb', type=float, default=LIMITE_CACHE_GB, help="Tamanho máximo do cache.")
+    parser.add_argument('--listar', action='store_true', help="Lista as entradas do cache e sai.")
+    args = parser.parse_args()
+
+    if args.listar:
+        for m in sorted(CacheEtapas().entradas(), key=lambda m: m['ultimo_uso'], reverse=True):
+            print(f"{m['chave'][:12]}  {m['etapa']:<12} {m['tamanho'] / 1024 ** 2:>10.1f} MB  {m['segundos']:>8.1f} s")
+        sys.exit()
+
+    sys.exit(0 if executar(args.ate, args.forcar, args.hash_completo, args.limite_gb) else 1)
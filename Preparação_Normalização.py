@@ -1,201 +1,218 @@
-print("Iniciando o Script 2: Preparação Final dos Dados.")
-
-import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler, LabelEncoder
 from time import time
-from imblearn.over_sampling import SMOTE
-
-start_script_time = time()
-
-print("\nCarregando o arquivo 'CICIDS'")
-try:
-    df_limpo = pd.read_csv('CICIDS.csv')
-    print("Arquivo limpo carregado com sucesso.")
-    print(f"Dimensões: {df_limpo.shape}")
-except FileNotFoundError:
-    print("ERRO: 'CICIDS.csv' não encontrado. Execute o Script de Limpeza corretamente")
-    exit()
-except Exception as e:
-    print(f"Ocorreu um erro ao ler o arquivo: {e}")
-    exit()
-
-print("\nSeparando e codificando as variáveis")
-
-# X contém todas as colunas de características
-X = df_limpo.drop(columns=['Label'])
-y_texto = df_limpo['Label']
+from Artefatos import carregar_matriz, carregar_metadados, salvar_matriz, criar_matriz, atualizar_metadados, exportar_csv
+from Escalonamento import EscalonadorStreaming, ARQUIVO_SCALER
+from Sobreamostragem import smote_em_disco
+from Configuracao import TEST_SIZE, RANDOM_STATE, N_DOBRAS, K_NEIGHBORS, sampling_strategy, ESTRATEGIA_SMOTE, MINIMO_SMOTE
+from Censo import censo, estrategia_smote
+from Divisao import dividir_e_salvar, tamanho_teste, LinhasSelecionadas
+from Instrumentacao import etapa
+
+# Os conjuntos finais são gravados como .npy (float32, abertos com mmap no Script 3) + .json de metadados.
+# Ative para gerar também os quatro CSVs antigos.
+EXPORTAR_CSV = False
+
+# O bloco principal fica protegido pelo "if __name__" porque o SMOTE em disco usa um pool de processos,
+# que pode importar este arquivo de novo dentro de cada processo filho.
+if __name__ == "__main__":
+    print("Iniciando o Script 2: Preparação Final dos Dados.")
 
-# Substituição de One-Hot Encoding por Label Encoding
-# No método anterior, eu usava: y = pd.get_dummies(df_limpo['Label'])
-# Agora, implementei a codificação por rótulos numéricos (0 a 14), (que é mais eficiente em termos de memória)
+    start_script_time = time()
 
-# Cria, treina e aplica o LabelEncoder para converter texto em números
-le = LabelEncoder()
-y_encoded = le.fit_transform(y_texto)
+    print("\nCarregando o conjunto 'CICIDS'")
+    try:
+        X = carregar_matriz('CICIDS_X')
+        y = carregar_matriz('CICIDS_y')
+        colunas = carregar_metadados('CICIDS_X')['colunas']
+        classes = np.array(carregar_metadados('CICIDS_y')['classes'], dtype=object)
+        print("Conjunto limpo carregado com sucesso.")
+        print(f"Dimensões: {X.shape}")
+    except FileNotFoundError:
+        print("ERRO: 'CICIDS_X.npy' não encontrado. Execute o Script de Limpeza corretamente")
+        exit()
+    except Exception as e:
+        print(f"Ocorreu um erro ao ler o arquivo: {e}")
+        exit()
 
-# Converte o resultado de volta para um DataFrame para manter a consistência.
-y = pd.DataFrame(y_encoded, columns=['Label'])
+    # Substituição de One-Hot Encoding por Label Encoding
+    # No método anterior, eu usava: y = pd.get_dummies(df_limpo['Label'])
+    # Agora os rótulos já chegam codificados do Script 1 (0 a 14, em ordem alfabética, como o LabelEncoder),
+    # o que é mais eficiente em termos de memória. O "dicionário" de classes vem nos metadados.
 
-# Salva o "dicionário" de classes para uso no Script 3!
-np.save('classes.npy', le.classes_)
+    # Salva o "dicionário" de classes para uso no Script 3!
+    np.save('classes.npy', classes)
 
-print("Mapeamento de classes (dicionário) salvo em 'classes.npy'.")
+    print("Mapeamento de classes (dicionário) salvo em 'classes.npy'.")
 
-print("\nDividindo em conjuntos de treinamento e teste")
+    print("\nDividindo em conjuntos de treinamento e teste")
 
-# Divide os dados em 70% para treino e 30% para teste.
-# 'stratify=y' garante que a proporção das classes seja a mesma em ambos os conjuntos
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=42, stratify=y)
-print(f"Tamanho do treino: {X_train.shape[0]} amostras | Tamanho do teste: {X_test.shape[0]} amostras.")
+    # Divide os dados em 70% para treino e 30% para teste.
+    # A estratificação garante que a proporção das classes seja a mesma em ambos os conjuntos.
+    # Antes: train_test_split(X, y, stratify=y), que criava cópias de X inteiras na memória.
+    # Agora a divisão é calculada só com os rótulos e gravada como índices int32 (indices_treino.npy /
+    # indices_teste.npy, e dobras_treino.npy para validação cruzada). X_train e X_test são visões do
+    # CICIDS_X.npy: as linhas só são lidas do disco quando o SMOTE e a normalização passam por elas.
+    with etapa('divisao', linhas_entrada=len(y)):
+        indices_treino, indices_teste, _ = dividir_e_salvar(y, TEST_SIZE, RANDOM_STATE, N_DOBRAS, classes=classes)
+        X_train, X_test = LinhasSelecionadas(X, indices_treino), LinhasSelecionadas(X, indices_teste)
+        y_train, y_test = np.asarray(y[indices_treino]), np.asarray(y[indices_teste])
+    print(f"Tamanho do treino: {X_train.shape[0]} amostras | Tamanho do teste: {X_test.shape[0]} amostras.")
 
-print("\nDistribuição de Classes antes do SMOTE ")
+    print("\nDistribuição de Classes antes do SMOTE ")
 
-# Calcula a contagem original no treino
-unique_original, counts_original = np.unique(y_train, return_counts=True)
-contagem_treino_original = dict(zip(le.inverse_transform(unique_original), counts_original))
+    # Calcula a contagem original no treino
+    unique_original, counts_original = np.unique(y_train, return_counts=True)
+    contagem_treino_original = dict(zip(classes[unique_original], counts_original))
 
-# Converte os valores numpy.int64 para int padrão para uma impressão limpa
-contagem_treino_limpa = {classe: int(contagem) for classe, contagem in contagem_treino_original.items()}
+    # Converte os valores numpy.int64 para int padrão para uma impressão limpa
+    contagem_treino_limpa = {classe: int(contagem) for classe, contagem in contagem_treino_original.items()}
 
 
-print("Contagem no Conjunto de Treino:", contagem_treino_limpa)
+    print("Contagem no Conjunto de Treino:", contagem_treino_limpa)
 
-print("\nAplicando o Rebalanceamento (Oversampling)")
+    print("\nAplicando o Rebalanceamento (Oversampling)")
 
-# 1° Estratégia (SMOTE)
+    # 1° Estratégia (SMOTE)
 
-""" Manter a contagem original da classe BENIGN.
+    """ Manter a contagem original da classe BENIGN.
 
-Manter a contagem original de qualquer classe de ataque que já tenha mais de 20.000 amostras.
+    Manter a contagem original de qualquer classe de ataque que já tenha mais de 20.000 amostras.
 
-Elevar a contagem para 20.000 para qualquer classe de ataque que tenha menos de 20.000 amostras. 
+    Elevar a contagem para 20.000 para qualquer classe de ataque que tenha menos de 20.000 amostras. 
 
-"""
-
-"""
-print("\nDefinindo a estratégia de rebalanceamento manualmente")
+    """
 
-sampling_strategy = {
+    """
+    print("\nDefinindo a estratégia de rebalanceamento manualmente")
 
-    # Regra 1: Manter a classe majoritária
-    0:  1788058,  # BENIGN 
+    sampling_strategy = {
 
-    # Regra 2: Manter as classes minoritárias que já são grandes 
-    2:  68634,   # DDoS 
-    4:  43074,   # DoS Hulk 
-    10: 159152,  # PortScan 
+        # Regra 1: Manter a classe majoritária
+        0:  1788058,  # BENIGN 
 
-    # Regra 3: Elevar todas as outras classes minoritárias "raras" para 20.000
-    1:  20000,    # Bot 
-    3:  20000,    # DoS GoldenEye 
-    5:  20000,    # DoS Slowhttptest 
-    6:  20000,    # DoS slowloris 
-    7:  20000,    # FTP-Patator 
-    8:  20000,    # Heartbleed 
-    9:  20000,    # Infiltration 
-    11: 20000,    # SSH-Patator
-    12: 20000,    # Web Attack - Brute Force 
-    13: 20000,    # Web Attack - Sql Injection 
-    14: 20000,    # Web Attack - XSS 
-}
+        # Regra 2: Manter as classes minoritárias que já são grandes 
+        2:  68634,   # DDoS 
+        4:  43074,   # DoS Hulk 
+        10: 159152,  # PortScan 
 
-# O restante do código do SMOTE usa este dicionário manual
+        # Regra 3: Elevar todas as outras classes minoritárias "raras" para 20.000
+        1:  20000,    # Bot 
+        3:  20000,    # DoS GoldenEye 
+        5:  20000,    # DoS Slowhttptest 
+        6:  20000,    # DoS slowloris 
+        7:  20000,    # FTP-Patator 
+        8:  20000,    # Heartbleed 
+        9:  20000,    # Infiltration 
+        11: 20000,    # SSH-Patator
+        12: 20000,    # Web Attack - Brute Force 
+        13: 20000,    # Web Attack - Sql Injection 
+        14: 20000,    # Web Attack - XSS 
+    }
 
-print("Rebalanceando as classes com SMOTE e estratégia manualmente")
+    # O restante do código do SMOTE usa este dicionário manual
 
-smote = SMOTE(sampling_strategy=sampling_strategy, k_neighbors=1, random_state=42)
-X_train_resampled, y_train_resampled = smote.fit_resample(X_train, y_train)
+    print("Rebalanceando as classes com SMOTE e estratégia manualmente")
 
-print("Rebalanceamento concluído.")
+    smote = SMOTE(sampling_strategy=sampling_strategy, k_neighbors=1, random_state=42)
+    X_train_resampled, y_train_resampled = smote.fit_resample(X_train, y_train)
 
-print(f"Tamanho do treino APÓS o SMOTE: {X_train_resampled.shape[0]} amostras")
-unique, counts = np.unique(y_train_resampled, return_counts=True)
+    print("Rebalanceamento concluído.")
 
-print("Nova distribuição de classes no treino:", dict(zip(le.inverse_transform(unique), counts)))
-
-"""
+    print(f"Tamanho do treino APÓS o SMOTE: {X_train_resampled.shape[0]} amostras")
+    unique, counts = np.unique(y_train_resampled, return_counts=True)
 
-# 2° Estratégia (SMOTE)
+    print("Nova distribuição de classes no treino:", dict(zip(le.inverse_transform(unique), counts)))
 
-print("\nDefinindo a estratégia de rebalanceamento com base nos números fornecidos")
+    """
 
-sampling_strategy = {
+    # 2° Estratégia (SMOTE)
 
-    
-    0: 1836922,  # BENIGN
-    1: 2201,     # Bot
-    2: 92282,    # DDoS
-    3: 9027,     # DoS GoldenEye
-    4: 156340,   # DoS Hulk
-    5: 6008,     # DoS Slowhttptest
-    6: 8793,     # DoS slowloris
-    7: 3973,     # FTP-Patator
-    8: 300,      # Heartbleed
-    9: 300,      # Infiltration
-    10: 159421,  # PortScan
-    11: 2980,    # SSH-Patator
-    12: 1365,    # Web Attack - Brute Force
-    13: 300,     # Web Attack - Sql Injection
-    14: 679,     # Web Attack - XSS
+    print("\nDefinindo a estratégia de rebalanceamento com base nos números fornecidos")
 
-}
+    # O dicionário 'sampling_strategy' (contagem desejada de cada classe) fica em Configuracao.py,
+    # junto com os demais parâmetros do pipeline. Com ESTRATEGIA_SMOTE = 'automatica' ele é recalculado aqui
+    # com a mesma regra usada para digitá-lo: cada classe fica com max(contagem no treino, MINIMO_SMOTE).
+    # As contagens vêm do índice do censo (CICIDS_y.censo.json); as do treino saem delas pela mesma regra
+    # de arredondamento da divisão estratificada.
+    if ESTRATEGIA_SMOTE == 'automatica':
+        contagens_censo = censo('CICIDS_y')['contagens']
+        contagens_treino = [n - tamanho_teste(n, TEST_SIZE) for n in (contagens_censo.get(nome, 0) for nome in classes)]
+        sampling_strategy = estrategia_smote(contagens_treino, MINIMO_SMOTE)
+        print("Estratégia automática calculada:", {classes[c]: n for c, n in sampling_strategy.items()})
+    else:
+        print("Estratégia manual definida (Configuracao.py).")
 
-print("Estratégia manual definida. Rebalanceando as classes com SMOTE")
+    print("Rebalanceando as classes com SMOTE")
 
-# O SMOTE agora usa este dicionário manual diretamente
-# Mantemos k_neighbors=1 por segurança, para lidar com as classes ultra-raras
-smote = SMOTE(sampling_strategy=sampling_strategy, k_neighbors=1, random_state=42)
-X_train_resampled, y_train_resampled = smote.fit_resample(X_train, y_train)
+    # O SMOTE usa este dicionário (manual ou calculado) diretamente
+    # Mantemos k_neighbors=1 por segurança, para lidar com as classes ultra-raras (K_NEIGHBORS em Configuracao.py)
+    # O SMOTE em disco (Sobreamostragem.py) só constrói o índice de vizinhos das classes que precisam crescer,
+    # gera as amostras sintéticas em lotes paralelos e as grava direto em 'X_train_scaled.npy' / 'y_train.npy'.
+    # A matriz rebalanceada nunca é concatenada na memória; a normalização abaixo é feita no próprio arquivo.
+    # O resultado é reprodutível para o mesmo random_state (mas não idêntico ao do imblearn).
+    with etapa('smote', linhas_entrada=len(y_train)) as medida:
+        X_train_resampled, y_train_resampled = smote_em_disco(X_train, y_train, sampling_strategy, 'X_train_scaled', 'y_train',
+                                                              k_neighbors=K_NEIGHBORS, random_state=RANDOM_STATE, colunas=colunas, classes=classes)
+        medida.linhas_saida = len(y_train_resampled)
 
-print("\nRebalanceamento concluído.")
+    print("\nRebalanceamento concluído.")
 
-print(f"Tamanho do treino APÓS o SMOTE: {X_train_resampled.shape[0]} amostras")
+    print(f"Tamanho do treino APÓS o SMOTE: {X_train_resampled.shape[0]} amostras")
 
-unique, counts = np.unique(y_train_resampled, return_counts=True)
+    unique, counts = np.unique(y_train_resampled, return_counts=True)
 
-# Cria o dicionário original, que ainda contém os tipos de dados do NumPy
-contagem_original_apos_smote = dict(zip(le.inverse_transform(unique), counts))
-contagem_limpa_apos_smote = {classe: int(contagem) for classe, contagem in contagem_original_apos_smote.items()}
-print("Nova distribuição de classes no treino:", dict(zip(le.inverse_transform(unique), counts)))
+    # Cria o dicionário original, que ainda contém os tipos de dados do NumPy
+    contagem_original_apos_smote = dict(zip(classes[unique], counts))
+    contagem_limpa_apos_smote = {classe: int(contagem) for classe, contagem in contagem_original_apos_smote.items()}
+    print("Nova distribuição de classes no treino:", contagem_limpa_apos_smote)
 
 
-# Normalizar as Características
-print("\nNormalizando as características")
+    # Normalizar as Características
+    print("\nNormalizando as características")
 
-# Cria a ferramenta de normalização Z-score.
-scaler = StandardScaler()
+    # Cria a ferramenta de normalização Z-score, ajustada em blocos (partial_fit) e aplicada em float32.
+    scaler = EscalonadorStreaming(colunas)
 
-# Aprende a média e o desvio padrão apenas com os dados de treino.
-scaler.fit(X_train_resampled)
+    # Aprende a média e o desvio padrão apenas com os dados de treino.
+    with etapa('ajuste_scaler', linhas_entrada=len(X_train_resampled)):
+        scaler.ajustar_em_blocos(X_train_resampled)
 
-# Aplica a normalização aprendida em ambos os conjuntos.
-X_train_scaled = scaler.transform(X_train_resampled)
-X_test_scaled = scaler.transform(X_test)
+    # Guarda os parâmetros aprendidos: o Script 3 e qualquer classificação futura carregam este arquivo em vez de reajustar.
+    scaler.salvar(ARQUIVO_SCALER)
+    print(f"Parâmetros do scaler salvos em '{ARQUIVO_SCALER}'.")
 
-# Converte os arrays resultantes de volta para DataFrames.
-X_train_scaled = pd.DataFrame(X_train_scaled, columns=X.columns)
-X_test_scaled = pd.DataFrame(X_test_scaled, columns=X.columns)
-print("Normalização concluída.")
+    # Aplica a normalização aprendida em ambos os conjuntos. O treino é normalizado no próprio arquivo do SMOTE
+    # e o teste é escrito direto no seu artefato final. O estado do scaler também fica no sidecar de cada artefato.
+    with etapa('normalizacao', linhas_entrada=len(X_train_resampled) + len(X_test)):
+        scaler.transformar_em_blocos(X_train_resampled, X_train_resampled)
+        atualizar_metadados('X_train_scaled', scaler=scaler.estado())
+        X_test_scaled = criar_matriz('X_test_scaled', len(X_test), colunas, classes=classes, scaler=scaler.estado())
+        scaler.transformar_em_blocos(X_test, X_test_scaled)
+    del X_train_resampled, X_test_scaled
+    print("Normalização concluída.")
+
+    # Salvar os conjuntos de dados preparados
+    print("\nSalvando os rótulos...")
 
-# Salvar os conjuntos de dados preparados
-print("\nSalvando os 4 arquivos finais...")
-X_train_scaled.to_csv('X_train_scaled.csv', index=False)
-X_test_scaled.to_csv('X_test_scaled.csv', index=False)
+    # Antigo
+    # y_train.to_csv('y_train.csv', index=False)
+    # y_test.to_csv('y_test.csv', index=False)
 
-# Antigo
-# y_train.to_csv('y_train.csv', index=False)
-# y_test.to_csv('y_test.csv', index=False)
+    salvar_matriz('y_test', np.asarray(y_test, dtype=np.int32), classes=classes)
 
-pd.DataFrame(y_train_resampled).to_csv('y_train.csv', index=False, header=['Label'])
-pd.DataFrame(y_test).to_csv('y_test.csv', index=False, header=['Label'])
+    print("Artefatos salvos: X_train_scaled.npy, X_test_scaled.npy, y_train.npy, y_test.npy (+ metadados .json)")
 
-print("Arquivos salvos: X_train_scaled.csv, X_test_scaled.csv, y_train.csv, y_test.csv")
+    if EXPORTAR_CSV:
+        import pandas as pd
+        for nome in ['X_train_scaled', 'X_test_scaled']:
+            exportar_csv(nome)
+        for nome in ['y_train', 'y_test']:
+            pd.DataFrame(carregar_matriz(nome), columns=['Label']).to_csv(f'{nome}.csv', index=False)
+        print("Arquivos CSV exportados: X_train_scaled.csv, X_test_scaled.csv, y_train.csv, y_test.csv")
 
-end_script_time = time()
-print(f"\nTempo total de execução do Script: {end_script_time - start_script_time:.2f} segundos.")
-print("\n Script 2 (Preparação Final) Concluído")
+    end_script_time = time()
+    print(f"\nTempo total de execução do Script: {end_script_time - start_script_time:.2f} segundos.")
+    print("\n Script 2 (Preparação Final) Concluído")
 
 """
 Por que eu optei pela padronização z-score?
@@ -216,17 +233,17 @@ O Par de Treinamento
 
 Este é o conjunto de dados maior (70% do total) que usei para ensinar o modelo.
 
-    X_train_scaled.csv: Dados de treino normalizados
+    X_train_scaled.npy: Dados de treino normalizados
 
-    y_train.csv: Os rótulos de treinamento. Durante o treinamento, o modelo olha para X_train_scaled, faz uma previsão e a compara com y_train para aprender com seus erros.
+    y_train.npy: Os rótulos de treinamento. Durante o treinamento, o modelo olha para X_train_scaled, faz uma previsão e a compara com y_train para aprender com seus erros.
 
 O Par de Teste 
 
 Este é o conjunto de dados menor (30% do total) que não foi usado durante todo o treinamento e é usado para uma avaliação final e imparcial.
 
-    X_test_scaled.csv: Dados sem os rótulos 
+    X_test_scaled.npy: Dados sem os rótulos 
 
-    y_test.csv: Os rótulos.
+    y_test.npy: Os rótulos.
 
 Por Que optei por Separar Assim?
 
@@ -0,0 +1,394 @@
+"""Retreino incremental: incorpora a captura de um novo dia sem reprocessar o histórico.
+
+    python Retreino_Incremental.py Friday-16-02-2018_TrafficForML_CICFlowMeter.csv
+
+Passos, todos sobre o arquivo novo apenas:
+  1. limpeza com o esquema e a lista de colunas gravados pelo Script 1 (metadados do CICIDS_X);
+  2. divisão estratificada do dia em treino/teste, com os parâmetros do Script 2;
+  3. contagens de classes do treino somadas às do histórico; o SMOTE gera só o que falta para cada
+     classe chegar ao alvo, a partir das amostras novas;
+  4. estatísticas do scaler combinadas (Chan) com as do treino novo; a primeira camada do MLP é corrigida
+     para a nova padronização e os artefatos padronizados antigos são reescalados em uma passada;
+  5. partial_fit a partir do modelo do Script 3 (ou, com --checkpoint, do checkpoint do mesmo treino),
+     sobre as linhas novas e uma amostra das antigas.
+
+No fim é impresso o tempo gasto, comparado com a reconstrução completa (tempos do Pipeline.py).
+"""
+
+import os
+import json
+import pickle
+import shutil
+import argparse
+from time import time
+
+import numpy as np
+
+from Artefatos import (carregar_matriz, carregar_metadados, criar_matriz, existe, caminho_dados,
+                       caminho_metadados)
+from Configuracao import TEST_SIZE, RANDOM_STATE, K_NEIGHBORS, sampling_strategy, ESTRATEGIA_SMOTE, MINIMO_SMOTE
+from Instrumentacao import etapa
+
+ARQUIVO_INCREMENTOS = 'incrementos.json'
+PASTA_PARTES = 'partes_incremento'
+ARQUIVO_METRICAS = 'metricas_teste.json'
+
+# Épocas de partial_fit sobre os dados do incremento
+EPOCAS_INCREMENTAIS = 5
+# Linhas antigas do treino sorteadas para cada linha nova, para o modelo não esquecer o histórico
+FRACAO_REPLAY = 1.0
+
+TAMANHO_BLOCO = 200_000
+_TEMPORARIOS = ('incremento_X', 'incremento_y', 'incremento_X_train', 'incremento_y_train')
+
+
+def _impressao(caminho):
+    estado = os.stat(caminho)
+    return {'arquivo': os.path.basename(caminho), 'tamanho': estado.st_size, 'mtime': estado.st_mtime}
+
+
+def carregar_incrementos(linhas_treino, linhas_teste):
+    """Registro dos incrementos aplicados desde o último Script 2 (vazio se os artefatos foram refeitos)."""
+    if os.path.exists(ARQUIVO_INCREMENTOS):
+        with open(ARQUIVO_INCREMENTOS, encoding='utf-8') as f:
+            registro = json.load(f)
+        if registro['linhas_y_train'] == linhas_treino and registro['linhas_y_test'] == linhas_teste:
+            return registro
+    return None
+
+
+def _salvar_incrementos(registro):
+    with open(ARQUIVO_INCREMENTOS + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(registro, f, ensure_ascii=False, indent=2)
+    os.replace(ARQUIVO_INCREMENTOS + '.tmp', ARQUIVO_INCREMENTOS)
+
+
+def contagens_treino_historico(n_classes):
+    """Contagem de cada classe no treino original (antes do SMOTE), só a partir dos rótulos e dos índices."""
+    from Divisao import carregar_divisao
+    indices_treino, _, _ = carregar_divisao()
+    return np.bincount(np.asarray(carregar_matriz('CICIDS_y')[indices_treino]), minlength=n_classes)
+
+
+def limpar_dia(caminho, esquema, colunas_x, classes):
+    """Limpa o arquivo novo com o esquema salvo e grava só as colunas do CICIDS_X (em 'incremento_X/_y')."""
+    from Leitura_Paralela import processar_arquivo, unificar_partes
+
+    os.makedirs(PASTA_PARTES, exist_ok=True)
+    resumo = processar_arquivo(caminho, esquema, os.path.join(PASTA_PARTES, os.path.basename(caminho)))
+    novas = sorted(set(resumo['classes']) - set(classes))
+    if novas:
+        raise ValueError(f"O arquivo tem classes que o modelo não conhece: {novas}. "
+                         "A camada de saída do MLP não cresce no retreino incremental; faça a reconstrução completa.")
+    unificar_partes([resumo], colunas_x, list(classes), 'incremento_X', 'incremento_y')
+    return resumo
+
+
+def estrategia_incremental(contagens_mescladas, contagens_pos_smote, contagens_novas, k_neighbors=K_NEIGHBORS):
+    """Alvo do SMOTE sobre as amostras novas de cada classe: só o que falta para o total chegar ao alvo global.
+
+    O alvo global usa a mesma regra do Script 2, aplicada às contagens do histórico somadas às do dia.
+    O que já existe no X_train_scaled (originais e sintéticas) e as amostras novas contam para o alvo.
+    """
+    if ESTRATEGIA_SMOTE == 'automatica':
+        from Censo import estrategia_smote
+        alvos = estrategia_smote(contagens_mescladas, MINIMO_SMOTE)
+    else:
+        alvos = {c: max(int(sampling_strategy.get(c, 0)), int(n)) for c, n in enumerate(contagens_mescladas) if n}
+
+    estrategia, sem_vizinhos = {}, []
+    for classe, alvo in alvos.items():
+        faltam = alvo - int(contagens_pos_smote[classe]) - int(contagens_novas[classe])
+        if faltam <= 0:
+            continue
+        if contagens_novas[classe] < k_neighbors + 1:
+            # Sem amostras novas suficientes para o SMOTE: a classe fica como está
+            sem_vizinhos.append(classe)
+            continue
+        estrategia[classe] = int(contagens_novas[classe]) + faltam
+    return estrategia, sem_vizinhos
+
+
+def mesclar_escalonador(antigo, X_novo):
+    """Novo escalonador com as estatísticas do antigo combinadas às das linhas novas (sem reler o histórico)."""
+    from Escalonamento import EscalonadorStreaming
+    from Estatisticas import PerfilColunas
+
+    novo = EscalonadorStreaming(antigo.colunas)
+    novo.perfil = PerfilColunas.de_dict(antigo.perfil.para_dict())
+    return novo.ajustar_em_blocos(X_novo)
+
+
+def ajustar_primeira_camada(mlp, antigo, novo):
+    """Corrige (no lugar) a primeira camada para que o MLP dê as mesmas saídas com a nova padronização.
+
+    Com z0 = (x - m0) / s0 e z1 = (x - m1) / s1, vale z0 = z1 * s1/s0 + (m1 - m0)/s0, então
+    W' = W * (s1/s0) e b' = b + ((m1 - m0)/s0) @ W. A alteração é feita nos próprios arrays,
+    que são os mesmos referenciados pelo otimizador do partial_fit.
+    """
+    pesos, vieses = mlp.coefs_[0], mlp.intercepts_[0]
+    vieses += (((novo.media - antigo.media) / antigo.escala) @ pesos).astype(vieses.dtype)
+    pesos *= (novo.escala / antigo.escala)[:, np.newaxis].astype(pesos.dtype)
+
+
+def reescalador(antigo, novo):
+    """Função que leva um bloco padronizado com 'antigo' para a padronização de 'novo': z1 = z0*a + c."""
+    a = (antigo.escala / novo.escala).astype(np.float32)
+    c = ((antigo.media - novo.media) / novo.escala).astype(np.float32)
+    return lambda bloco: np.asarray(bloco, dtype=np.float32) * a + c
+
+
+def estender(base, novos, ajustar_antigos=None, ajustar_novos=None, tamanho_bloco=TAMANHO_BLOCO, **meta):
+    """Reescreve o artefato 'base' com as linhas 'novos' no fim, ajustando os blocos de cada parte no caminho."""
+    metadados = carregar_metadados(base)
+    antigo = carregar_matriz(base)
+    extras = {k: v for k, v in metadados.items() if k not in ('formato', 'dtype', 'forma', 'colunas')}
+    extras.update(meta)
+    colunas = metadados.get('colunas') or (antigo.shape[1] if antigo.ndim > 1 else 0)
+
+    temporario = base + '_estendido'
+    saida = criar_matriz(temporario, len(antigo) + len(novos), colunas, dtype=antigo.dtype, **extras)
+    posicao = 0
+    for parte, ajustar in ((antigo, ajustar_antigos), (novos, ajustar_novos)):
+        for inicio in range(0, len(parte), tamanho_bloco):
+            bloco = parte[inicio:inicio + tamanho_bloco]
+            saida[posicao:posicao + len(bloco)] = ajustar(bloco) if ajustar else bloco
+            posicao += len(bloco)
+    saida.flush()
+    del saida, antigo
+    os.replace(caminho_dados(temporario), caminho_dados(base))
+    os.replace(caminho_metadados(temporario), caminho_metadados(base))
+
+
+def carregar_modelo_para_retreino(usar_checkpoint=False):
+    """MLP salvo pelo Script 3 ou, com 'usar_checkpoint', o do checkpoint (com os pesos da melhor época).
+
+    O checkpoint só é aceito se a impressão dos dados gravada nele for a dos artefatos de treino atuais;
+    um checkpoint de outro treino (outro Script 2, outro incremento) é recusado com erro.
+    """
+    from Treino_Streaming import carregar_checkpoint, impressao_dados, ARQUIVO_CHECKPOINT
+    from Inferencia import ARQUIVO_MLP
+
+    if usar_checkpoint:
+        estado = carregar_checkpoint()
+        if estado is None:
+            raise FileNotFoundError(f"Checkpoint '{ARQUIVO_CHECKPOINT}' não encontrado.")
+        origem = estado.get('origem') or {}
+        if any(origem.get(base) != impressao for base, impressao in impressao_dados('X_train_scaled', 'y_train').items()):
+            raise ValueError(f"O checkpoint '{ARQUIVO_CHECKPOINT}' não é do treino dos artefatos atuais "
+                             f"(X_train_scaled/y_train mudaram desde então). Retreine sem --checkpoint, a partir de "
+                             f"'{ARQUIVO_MLP}'.")
+        mlp = estado['mlp']
+        if estado['melhores_pesos'] is not None:
+            # Cópia para dentro dos arrays existentes, que o otimizador do partial_fit também referencia
+            for atual, melhor in zip(mlp.coefs_ + mlp.intercepts_, estado['melhores_pesos'][0] + estado['melhores_pesos'][1]):
+                atual[...] = melhor
+        origem = 'checkpoint'
+    else:
+        with open(ARQUIVO_MLP, 'rb') as f:
+            mlp = pickle.load(f)
+        origem = ARQUIVO_MLP
+    if not hasattr(mlp, 'partial_fit'):
+        raise ValueError(f"O modelo ({type(mlp).__name__}) não tem partial_fit; "
+                         "o retreino incremental exige um modelo treinado nos modos 'streaming' ou 'completo'.")
+    return mlp, origem
+
+
+def resolver_entrada(arquivo):
+    """Caminho do CSV do dia novo (como informado ou relativo a DATA_PATH), verificando os artefatos do Script 2."""
+    caminho = arquivo
+    if not os.path.exists(caminho):
+        from Configuracao import DATA_PATH
+        caminho = os.path.join(DATA_PATH, arquivo)
+    if not os.path.exists(caminho):
+        raise FileNotFoundError(f"Arquivo '{arquivo}' não encontrado (nem em DATA_PATH).")
+    if not existe('X_train_scaled'):
+        raise FileNotFoundError("Artefatos preparados não encontrados. Rode os Scripts 1, 2 e 3 (ou o Pipeline.py) primeiro.")
+    return caminho
+
+
+def estimar_reconstrucao(fator_linhas):
+    """Tempo da reconstrução completa: os tempos de cada etapa no Pipeline.py, escalados pelo volume de dados."""
+    from Pipeline import ARQUIVO_ESTADO, ETAPAS
+
+    if not os.path.exists(ARQUIVO_ESTADO):
+        return None
+    with open(ARQUIVO_ESTADO, encoding='utf-8') as f:
+        estado = json.load(f)
+    tempos = [estado[e['nome']]['segundos'] for e in ETAPAS if e['nome'] in estado]
+    if len(tempos) < len(ETAPAS):
+        return None
+    return sum(tempos) * fator_linhas
+
+
+def retreinar(arquivo, epocas=EPOCAS_INCREMENTAIS, fracao_replay=FRACAO_REPLAY, forcar=False, usar_checkpoint=False):
+    """Aplica o incremento do arquivo (caminho ou nome em DATA_PATH) e devolve um relatório com tempos e métricas."""
+    from Divisao import dividir_estratificado, LinhasSelecionadas
+    from Sobreamostragem import smote_em_disco
+    from Escalonamento import EscalonadorStreaming, ARQUIVO_SCALER
+    from Treino_Streaming import treinar_em_minilotes, impressao_dados, ARQUIVO_CHECKPOINT
+    from Inferencia import MotorInferencia, ARQUIVO_MODELO, ARQUIVO_MLP
+    from Avaliacao import avaliar_em_paralelo, avaliar_em_blocos
+
+    caminho = resolver_entrada(arquivo)
+    inicio_total = time()
+    tempos = {}
+
+    meta_x = carregar_metadados('CICIDS_X')
+    colunas = meta_x['colunas']
+    classes = np.array(carregar_metadados('CICIDS_y')['classes'], dtype=object)
+    n_classes = len(classes)
+    if 'esquema' in meta_x:
+        esquema = meta_x['esquema']
+    else:
+        from Leitura_Paralela import inferir_esquema
+        print("O CICIDS_X não tem o esquema nos metadados (Script 1 antigo); inferindo a partir do arquivo novo.")
+        esquema = inferir_esquema(caminho)
+
+    y_train = carregar_matriz('y_train')
+    y_test = carregar_matriz('y_test')
+    registro = carregar_incrementos(len(y_train), len(y_test))
+    if registro is None:
+        registro = {'contagens_treino': contagens_treino_historico(n_classes).tolist(),
+                    'linhas_limpas': int(meta_x['forma'][0]), 'incrementos': []}
+    impressao = _impressao(caminho)
+    if not forcar and any(i['entrada'] == impressao for i in registro['incrementos']):
+        print(f"'{impressao['arquivo']}' já foi incorporado (use --forcar para aplicar de novo).")
+        return None
+
+    # 1. Limpeza do dia novo
+    inicio = time()
+    with etapa('incremento_limpeza') as medida:
+        resumo = limpar_dia(caminho, esquema, colunas, classes)
+        medida.linhas_saida = resumo['linhas_mantidas']
+    X_novo, y_novo = carregar_matriz('incremento_X'), np.asarray(carregar_matriz('incremento_y'))
+    tempos['limpeza'] = time() - inicio
+    print(f"Limpeza: {resumo['linhas_mantidas']} de {resumo['linhas_lidas']} linhas mantidas "
+          f"({tempos['limpeza']:.1f} s).")
+    if len(y_novo) == 0:
+        raise ValueError("Nenhuma linha válida no arquivo novo.")
+
+    # 2. Divisão e 3. contagens mescladas + SMOTE só das amostras novas
+    inicio = time()
+    with etapa('incremento_preparacao', linhas_entrada=len(y_novo)) as medida:
+        treino, teste, _ = dividir_estratificado(y_novo, TEST_SIZE, RANDOM_STATE)
+        contagens_novas = np.bincount(y_novo[treino], minlength=n_classes)
+        contagens_mescladas = np.asarray(registro['contagens_treino']) + contagens_novas
+        estrategia, sem_vizinhos = estrategia_incremental(contagens_mescladas, np.bincount(y_train, minlength=n_classes),
+                                                          contagens_novas)
+        X_inc, y_inc = smote_em_disco(LinhasSelecionadas(X_novo, treino), y_novo[treino], estrategia,
+                                      'incremento_X_train', 'incremento_y_train', k_neighbors=K_NEIGHBORS,
+                                      random_state=RANDOM_STATE, colunas=colunas, classes=classes)
+        medida.linhas_saida = len(y_inc)
+    sinteticas = len(y_inc) - len(treino)
+    if estrategia:
+        print("SMOTE nas amostras novas:", {classes[c]: alvo - int(contagens_novas[c]) for c, alvo in estrategia.items()})
+    if sem_vizinhos:
+        print(f"Sem amostras novas suficientes para o SMOTE: {[classes[c] for c in sem_vizinhos]}")
+
+    # 4. Scaler mesclado, primeira camada corrigida e artefatos antigos reescalados
+    antigo = EscalonadorStreaming.carregar(ARQUIVO_SCALER)
+    novo = mesclar_escalonador(antigo, X_inc)
+    mlp, origem = carregar_modelo_para_retreino(usar_checkpoint)
+    ajustar_primeira_camada(mlp, antigo, novo)
+    para_novo = reescalador(antigo, novo)
+    n_treino_antigo, n_teste_antigo = len(y_train), len(y_test)
+    del y_train, y_test
+    with etapa('incremento_artefatos', linhas_entrada=n_treino_antigo + n_teste_antigo):
+        estender('X_train_scaled', X_inc, para_novo, novo.transform, scaler=novo.estado())
+        estender('y_train', np.asarray(y_inc, dtype=np.int32))
+        estender('X_test_scaled', LinhasSelecionadas(X_novo, teste), para_novo, novo.transform, scaler=novo.estado())
+        estender('y_test', y_novo[teste].astype(np.int32))
+    novo.salvar(ARQUIVO_SCALER)
+    del X_inc, y_inc
+    tempos['preparacao'] = time() - inicio
+    print(f"Preparação: {len(treino)} linhas de treino (+{sinteticas} sintéticas), {len(teste)} de teste; "
+          f"scaler mesclado e artefatos reescalados ({tempos['preparacao']:.1f} s).")
+
+    # 5. partial_fit a partir do modelo salvo, sobre as linhas novas e uma amostra das antigas
+    inicio = time()
+    X_train, y_train = carregar_matriz('X_train_scaled'), carregar_matriz('y_train')
+    novas = np.arange(n_treino_antigo, len(y_train))
+    n_replay = min(int(len(novas) * fracao_replay), n_treino_antigo)
+    replay = np.sort(np.random.default_rng([RANDOM_STATE, len(registro['incrementos'])])
+                     .choice(n_treino_antigo, size=n_replay, replace=False))
+    indices = np.concatenate([replay, novas])
+    print(f"Retreinando a partir do {origem} por {epocas} épocas "
+          f"({len(novas)} linhas novas + {n_replay} antigas)...")
+    with etapa('incremento_treino', linhas_entrada=len(indices)):
+        mlp = treinar_em_minilotes(mlp, LinhasSelecionadas(X_train, indices), np.asarray(y_train[indices]),
+                                   classes=np.arange(n_classes), epocas=epocas, random_state=RANDOM_STATE,
+                                   checkpoint=ARQUIVO_CHECKPOINT, retomar=False,
+                                   origem=impressao_dados('X_train_scaled', 'y_train'))
+    with open(ARQUIVO_MLP, 'wb') as f:
+        pickle.dump(mlp, f)
+    MotorInferencia.de_mlp(mlp, classes, novo).salvar(ARQUIVO_MODELO)
+    tempos['treino'] = time() - inicio
+
+    # Avaliação no teste completo (histórico + dia novo) e só no dia novo
+    with etapa('incremento_avaliacao'):
+        motor = MotorInferencia.de_mlp(mlp, classes)
+        matriz = avaliar_em_paralelo(motor, 'X_test_scaled', 'y_test', n_classes=n_classes)
+        matriz.salvar(ARQUIVO_METRICAS, classes)
+        matriz_dia = avaliar_em_blocos(motor, carregar_matriz('X_test_scaled'), carregar_matriz('y_test'), n_classes,
+                                       inicio=n_teste_antigo)
+
+    shutil.rmtree(PASTA_PARTES, ignore_errors=True)
+    for base in _TEMPORARIOS:
+        for arquivo in (caminho_dados(base), caminho_metadados(base)):
+            if os.path.exists(arquivo):
+                os.remove(arquivo)
+
+    segundos = time() - inicio_total
+    linhas_antes = registro['linhas_limpas']
+    reconstrucao = estimar_reconstrucao((linhas_antes + len(y_novo)) / max(linhas_antes, 1))
+    relatorio = {
+        'entrada': impressao,
+        'linhas_novas': int(len(y_novo)),
+        'linhas_treino': int(len(treino)),
+        'linhas_sinteticas': int(sinteticas),
+        'linhas_teste': int(len(teste)),
+        'segundos': segundos,
+        'segundos_por_passo': tempos,
+        'reconstrucao_estimada_segundos': reconstrucao,
+        'acuracia_teste': float(matriz.acuracia()),
+        'f1_macro_teste': float(matriz.medias()['macro'][2]),
+        'acuracia_dia': float(matriz_dia.acuracia()),
+        'f1_macro_dia': float(matriz_dia.medias()['macro'][2]),
+    }
+    registro['contagens_treino'] = contagens_mescladas.tolist()
+    registro['linhas_limpas'] = linhas_antes + int(len(y_novo))
+    registro['linhas_y_train'] = len(y_train)
+    registro['linhas_y_test'] = n_teste_antigo + len(teste)
+    registro['incrementos'].append(relatorio)
+    _salvar_incrementos(registro)
+    return relatorio
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incorpora um novo dia de captura sem reprocessar o histórico.")
+    parser.add_argument('arquivo', help="CSV do novo dia (caminho completo ou relativo a DATA_PATH).")
+    parser.add_argument('--epocas', type=int, default=EPOCAS_INCREMENTAIS)
+    parser.add_argument('--replay', type=float, default=FRACAO_REPLAY,
+                        help="Linhas antigas do treino sorteadas para cada linha nova.")
+    parser.add_argument('--forcar', action='store_true', help="Aplica de novo um arquivo já incorporado.")
+    parser.add_argument('--checkpoint', action='store_true',
+                        help="Parte do checkpoint do treino (só se for dos artefatos atuais) em vez do modelo salvo.")
+    args = parser.parse_args()
+
+    try:
+        relatorio = retreinar(args.arquivo, args.epocas, args.replay, args.forcar, args.checkpoint)
+    except (FileNotFoundError, ValueError) as erro:
+        print(f"ERRO: {erro}")
+        exit()
+    if relatorio is not None:
+        print(f"\nAcurácia no teste: {relatorio['acuracia_teste']:.4f} (F1 macro {relatorio['f1_macro_teste']:.4f}) | "
+              f"só o dia novo: {relatorio['acuracia_dia']:.4f} (F1 macro {relatorio['f1_macro_dia']:.4f})")
+        print(f"Retreino incremental concluído em {relatorio['segundos']:.1f} s.")
+        reconstrucao = relatorio['reconstrucao_estimada_segundos']
+        if reconstrucao is None:
+            print("Sem tempos da reconstrução completa para comparar: rode o Pipeline.py uma vez para registrá-los.")
+        else:
+            print(f"Reconstrução completa estimada: {reconstrucao:.1f} s (tempos do Pipeline.py escalados pelo volume). "
+                  f"Economia: {reconstrucao - relatorio['segundos']:.1f} s ({reconstrucao / relatorio['segundos']:.1f}x).")
+        print(f"Para incluir o dia na reconstrução completa, acrescente o arquivo a 'filenames' em Configuracao.py.")
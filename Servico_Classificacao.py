@@ -0,0 +1,251 @@
+"""Serviço de classificação de fluxos em tempo real (asyncio), com micro-lotes e contrapressão.
+
+Protocolo: uma mensagem JSON por linha, em uma conexão TCP ou socket Unix local.
+    -> {"id": 1, "fluxo": {"flow_duration": 123, ...}}   (colunas do CICIDS_X, na escala original)
+    <- {"id": 1, "classe": "BENIGN"}
+    -> {"cmd": "metricas"}
+    <- {"fila": 0, "requisicoes": ..., "lotes": ..., ...}
+As respostas de uma conexão saem na mesma ordem das requisições.
+"""
+
+import os
+import json
+import asyncio
+import argparse
+from time import perf_counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from Inferencia import MotorInferencia, ARQUIVO_MODELO
+
+TAMANHO_LOTE = 256
+ORCAMENTO_LATENCIA_MS = 2.0
+TAMANHO_FILA = 10_000
+# Requisições de uma mesma conexão aguardando resposta. Acima disso o serviço para de ler o socket.
+PENDENTES_POR_CONEXAO = 1024
+
+
+class Metricas:
+    """Contadores do serviço: profundidade da fila, tamanho dos lotes e latência por requisição."""
+
+    def __init__(self, tamanho_lote, janela_latencias=10_000):
+        self.requisicoes = 0
+        self.erros = 0
+        self.lotes = 0
+        self.conexoes_ativas = 0
+        self.fila_maxima = 0
+        self.histograma_lotes = np.zeros(tamanho_lote + 1, dtype=np.int64)
+        # Janela circular com as latências mais recentes (memória fixa)
+        self._latencias = np.zeros(janela_latencias)
+        self._posicao = 0
+        self._preenchidas = 0
+
+    def registrar_lote(self, tamanho, latencias, profundidade_fila):
+        self.lotes += 1
+        self.requisicoes += tamanho
+        self.histograma_lotes[tamanho] += 1
+        self.fila_maxima = max(self.fila_maxima, profundidade_fila)
+        for latencia in latencias:
+            self._latencias[self._posicao] = latencia
+            self._posicao = (self._posicao + 1) % len(self._latencias)
+        self._preenchidas = min(self._preenchidas + len(latencias), len(self._latencias))
+
+    def resumo(self, profundidade_fila):
+        latencias = self._latencias[:self._preenchidas] * 1000
+        tamanhos = np.arange(len(self.histograma_lotes))
+        return {
+            'fila': profundidade_fila,
+            'fila_maxima': self.fila_maxima,
+            'conexoes_ativas': self.conexoes_ativas,
+            'requisicoes': self.requisicoes,
+            'erros': self.erros,
+            'lotes': self.lotes,
+            'lote_medio': float((tamanhos * self.histograma_lotes).sum() / max(self.lotes, 1)),
+            'histograma_lotes': {int(t): int(n) for t, n in zip(tamanhos, self.histograma_lotes) if n},
+            'latencia_p50_ms': float(np.percentile(latencias, 50)) if len(latencias) else None,
+            'latencia_p99_ms': float(np.percentile(latencias, 99)) if len(latencias) else None,
+        }
+
+
+class ServicoClassificacao:
+    """Recebe fluxos por socket, agrupa em micro-lotes dentro do orçamento de latência e responde a classe."""
+
+    def __init__(self, motor, tamanho_lote=TAMANHO_LOTE, orcamento_latencia_ms=ORCAMENTO_LATENCIA_MS,
+                 tamanho_fila=TAMANHO_FILA):
+        if not motor.colunas:
+            raise ValueError("O motor de inferência não tem os nomes das colunas (exporte-o com o scaler embutido).")
+        self.motor = motor
+        self.tamanho_lote = min(tamanho_lote, motor.tamanho_lote_maximo)
+        self.orcamento = orcamento_latencia_ms / 1000
+        self.fila = asyncio.Queue(maxsize=tamanho_fila)
+        self.metricas = Metricas(self.tamanho_lote)
+        self._indice_coluna = {col: i for i, col in enumerate(motor.colunas)}
+        self._lote = np.empty((self.tamanho_lote, motor.n_entradas), dtype=np.float32)
+        self._previstos = np.empty(self.tamanho_lote, dtype=np.int64)
+        # Uma única thread usa o motor (os buffers dele não são compartilháveis), sem travar o laço de eventos
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def _vetor(self, fluxo):
+        if isinstance(fluxo, dict):
+            vetor = np.empty(self.motor.n_entradas, dtype=np.float32)
+            faltando = [col for col in self._indice_coluna if col not in fluxo]
+            if faltando:
+                raise ValueError(f"colunas ausentes: {faltando[:5]}")
+            for col, i in self._indice_coluna.items():
+                vetor[i] = fluxo[col]
+            return vetor
+        vetor = np.asarray(fluxo, dtype=np.float32)
+        if vetor.shape != (self.motor.n_entradas,):
+            raise ValueError(f"esperados {self.motor.n_entradas} valores, recebidos {vetor.size}")
+        return vetor
+
+    def _classificar(self, n):
+        self.motor.prever_indices(self._lote[:n], out=self._previstos[:n])
+        return self.motor.classes[self._previstos[:n]].tolist()
+
+    async def _agrupar(self):
+        laco = asyncio.get_running_loop()
+        while True:
+            itens = [await self.fila.get()]
+            limite = laco.time() + self.orcamento
+            while len(itens) < self.tamanho_lote:
+                try:
+                    itens.append(self.fila.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                restante = limite - laco.time()
+                if restante <= 0:
+                    break
+                try:
+                    itens.append(await asyncio.wait_for(self.fila.get(), restante))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                for i, (vetor, _, _) in enumerate(itens):
+                    self._lote[i] = vetor
+                classes = await laco.run_in_executor(self._executor, self._classificar, len(itens))
+            except Exception as e:
+                # Uma falha afeta só este lote: as requisições dele recebem o erro e o agrupador continua
+                self.metricas.erros += len(itens)
+                for _, futuro, _ in itens:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+                continue
+
+            agora = perf_counter()
+            for (_, futuro, chegada), classe in zip(itens, classes):
+                if not futuro.done():
+                    futuro.set_result(classe)
+            self.metricas.registrar_lote(len(itens), [agora - chegada for _, _, chegada in itens], self.fila.qsize())
+
+    async def _responder(self, pendentes, writer):
+        # Escreve as respostas na ordem de chegada das requisições
+        conectado = True
+        while True:
+            item = await pendentes.get()
+            if item is None:
+                break
+            identificador, conteudo = item
+            if isinstance(conteudo, asyncio.Future):
+                try:
+                    conteudo = {'classe': await conteudo}
+                except Exception as e:
+                    conteudo = {'erro': f"falha ao classificar o lote: {e}"}
+            if not conectado:
+                # O cliente foi embora: as respostas restantes são descartadas para não travar a leitura
+                continue
+            resposta = {'id': identificador, **conteudo} if identificador is not None else conteudo
+            try:
+                writer.write(json.dumps(resposta, ensure_ascii=False).encode() + b'\n')
+                await writer.drain()
+            except ConnectionError:
+                conectado = False
+
+    async def _atender(self, reader, writer):
+        self.metricas.conexoes_ativas += 1
+        pendentes = asyncio.Queue(maxsize=PENDENTES_POR_CONEXAO)
+        tarefa_resposta = asyncio.create_task(self._responder(pendentes, writer))
+        laco = asyncio.get_running_loop()
+        try:
+            while True:
+                linha = await reader.readline()
+                if not linha:
+                    break
+                mensagem = None
+                try:
+                    mensagem = json.loads(linha)
+                    if mensagem.get('cmd') == 'metricas':
+                        await pendentes.put((mensagem.get('id'), self.metricas.resumo(self.fila.qsize())))
+                        continue
+                    vetor = self._vetor(mensagem['fluxo'] if 'fluxo' in mensagem else mensagem['valores'])
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    self.metricas.erros += 1
+                    identificador = mensagem.get('id') if isinstance(mensagem, dict) else None
+                    await pendentes.put((identificador, {'erro': str(e)}))
+                    continue
+
+                futuro = laco.create_future()
+                # Contrapressão: com a fila cheia este 'put' espera, e a conexão deixa de ser lida
+                await self.fila.put((vetor, futuro, perf_counter()))
+                await pendentes.put((mensagem.get('id'), futuro))
+        finally:
+            await pendentes.put(None)
+            await tarefa_resposta
+            writer.close()
+            self.metricas.conexoes_ativas -= 1
+
+    async def _relatar(self, intervalo):
+        while True:
+            await asyncio.sleep(intervalo)
+            print(json.dumps(self.metricas.resumo(self.fila.qsize()), ensure_ascii=False))
+
+    async def executar(self, host='127.0.0.1', porta=8765, caminho_unix=None, intervalo_metricas=None):
+        """Sobe o servidor e atende até ser interrompido."""
+        tarefas = [asyncio.create_task(self._agrupar())]
+        if intervalo_metricas:
+            tarefas.append(asyncio.create_task(self._relatar(intervalo_metricas)))
+
+        if caminho_unix:
+            if os.path.exists(caminho_unix):
+                os.remove(caminho_unix)
+            servidor = await asyncio.start_unix_server(self._atender, path=caminho_unix)
+            print(f"Serviço de classificação ouvindo em {caminho_unix}")
+        else:
+            servidor = await asyncio.start_server(self._atender, host, porta)
+            print(f"Serviço de classificação ouvindo em {host}:{porta}")
+
+        try:
+            async with servidor:
+                await servidor.serve_forever()
+        finally:
+            for tarefa in tarefas:
+                tarefa.cancel()
+            self._executor.shutdown(wait=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serviço de classificação de fluxos em tempo real.")
+    parser.add_argument('--modelo', default=ARQUIVO_MODELO, help="Motor exportado pelo Script 3.")
+    parser.add_argument('--classes', default='classes.npy', help="Dicionário de classes do Script 2.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--unix', default=None, help="Caminho de um socket Unix (substitui host/porta).")
+    parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help="Tamanho máximo de cada micro-lote.")
+    parser.add_argument('--orcamento-ms', type=float, default=ORCAMENTO_LATENCIA_MS,
+                        help="Tempo máximo que um fluxo espera o lote encher.")
+    parser.add_argument('--fila', type=int, default=TAMANHO_FILA, help="Capacidade da fila antes da contrapressão.")
+    parser.add_argument('--metricas-a-cada', type=float, default=None, help="Imprime as métricas a cada N segundos.")
+    args = parser.parse_args()
+
+    motor = MotorInferencia.carregar(args.modelo, tamanho_lote_maximo=args.lote)
+    if os.path.exists(args.classes):
+        motor.classes = np.load(args.classes, allow_pickle=True)
+
+    servico = ServicoClassificacao(motor, args.lote, args.orcamento_ms, args.fila)
+    try:
+        asyncio.run(servico.executar(args.host, args.porta, args.unix, args.metricas_a_cada))
+    except KeyboardInterrupt:
+        print("\nServiço encerrado.")
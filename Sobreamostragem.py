@@ -0,0 +1,200 @@
+"""SMOTE em disco: gera as amostras sintéticas em lotes paralelos, direto no artefato de saída."""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+import tempfile
+import shutil
+from time import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from Artefatos import criar_matriz, carregar_matriz, caminho_dados
+from Instrumentacao import instrumentar, pico_memoria_mb, pico_memoria_filhos_mb
+
+# Quantidade de amostras sintéticas geradas por tarefa. Limita a memória de cada processo.
+TAMANHO_LOTE = 50_000
+
+TAMANHO_BLOCO = 200_000
+
+
+def planejar(y, sampling_strategy, n_classes=None):
+    """Devolve [(classe, amostras_atuais, amostras_sinteticas)] apenas para as classes que precisam crescer."""
+    contagens = np.bincount(np.asarray(y), minlength=n_classes or 0)
+    plano = []
+    for classe in sorted(sampling_strategy):
+        atual = int(contagens[classe]) if classe < len(contagens) else 0
+        alvo = int(sampling_strategy[classe])
+        if alvo < atual:
+            raise ValueError(f"A classe {classe} tem {atual} amostras, mais do que o alvo de {alvo}. "
+                             "Na sobreamostragem o alvo deve ser maior ou igual à contagem original.")
+        if alvo > atual:
+            plano.append((classe, atual, alvo - atual))
+    return plano
+
+
+@instrumentar('smote_vizinhos')
+def _vizinhos_da_classe(caminho_x, indices, k_neighbors):
+    # Índice de vizinhos construído apenas com as amostras desta classe
+    from sklearn.neighbors import NearestNeighbors
+
+    if len(indices) < k_neighbors + 1:
+        raise ValueError(f"São necessárias pelo menos {k_neighbors + 1} amostras na classe para k_neighbors={k_neighbors}; "
+                         f"há apenas {len(indices)}.")
+    X = np.load(caminho_x, mmap_mode='r')
+    X_classe = np.asarray(X[indices])
+    nn = NearestNeighbors(n_neighbors=k_neighbors + 1).fit(X_classe)
+    # A primeira coluna é a própria amostra
+    return nn.kneighbors(X_classe, return_distance=False)[:, 1:].astype(np.int32)
+
+
+@instrumentar('smote_lote')
+def _gerar_lote(caminho_x, indices, vizinhos, inicio_saida, quantidade, semente):
+    # Cada lote tem o seu próprio gerador, derivado de (random_state, classe, lote).
+    # Assim o resultado não depende de qual processo executa o lote nem da ordem de execução.
+    rng = np.random.default_rng(semente)
+    X = np.load(caminho_x, mmap_mode='r+')
+
+    sorteio = rng.integers(0, vizinhos.size, size=quantidade)
+    linhas = sorteio // vizinhos.shape[1]
+    colunas = sorteio % vizinhos.shape[1]
+    passos = rng.random(quantidade, dtype=np.float32)[:, np.newaxis]
+
+    base = np.asarray(X[indices[linhas]])
+    vizinho = np.asarray(X[indices[vizinhos[linhas, colunas]]])
+    # Mesma interpolação do SMOTE: x_novo = x + passo * (vizinho - x)
+    vizinho -= base
+    vizinho *= passos
+    base += vizinho
+
+    X[inicio_saida:inicio_saida + quantidade] = base
+    X.flush()
+    return quantidade
+
+
+def smote_em_disco(X, y, sampling_strategy, destino_x, destino_y, k_neighbors=1, random_state=42,
+                   max_workers=None, tamanho_lote=TAMANHO_LOTE, colunas=None, classes=None, **meta):
+    """Aplica o SMOTE gravando o resultado nos artefatos 'destino_x' e 'destino_y'.
+
+    As amostras originais ocupam as primeiras linhas da saída, seguidas das sintéticas de cada classe,
+    na ordem crescente das classes. Apenas as classes que precisam crescer têm índice de vizinhos construído.
+    Devolve (X_resampled, y_resampled) como memmaps.
+    """
+    y = np.asarray(y).ravel()
+    n_original = len(y)
+    plano = planejar(y, sampling_strategy)
+    total = n_original + sum(sinteticas for _, _, sinteticas in plano)
+
+    X_saida = criar_matriz(destino_x, total, colunas if colunas is not None else X.shape[1],
+                           classes=classes, **meta)
+    y_saida = criar_matriz(destino_y, total, 0, dtype=np.int32, classes=classes)
+
+    # Copia as amostras originais em blocos
+    for inicio in range(0, n_original, TAMANHO_BLOCO):
+        fim = min(inicio + TAMANHO_BLOCO, n_original)
+        X_saida[inicio:fim] = X[inicio:fim]
+    y_saida[:n_original] = y
+    X_saida.flush()
+
+    caminho_x = caminho_dados(destino_x)
+    indices_por_classe = {classe: np.flatnonzero(y == classe) for classe, _, _ in plano}
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futuros = {classe: pool.submit(_vizinhos_da_classe, caminho_x, indices_por_classe[classe], k_neighbors)
+                   for classe, _, _ in plano}
+        vizinhos_por_classe = {classe: futuro.result() for classe, futuro in futuros.items()}
+
+        tarefas = []
+        posicao = n_original
+        for classe, _, sinteticas in plano:
+            y_saida[posicao:posicao + sinteticas] = classe
+            for lote, inicio in enumerate(range(0, sinteticas, tamanho_lote)):
+                quantidade = min(tamanho_lote, sinteticas - inicio)
+                tarefas.append(pool.submit(_gerar_lote, caminho_x, indices_por_classe[classe],
+                                           vizinhos_por_classe[classe], posicao + inicio, quantidade,
+                                           [random_state, classe, lote]))
+            posicao += sinteticas
+
+        for tarefa in tarefas:
+            tarefa.result()
+
+    y_saida.flush()
+    del X_saida
+    # Reaberto em modo de escrita para que a normalização possa ser feita no próprio arquivo
+    return np.load(caminho_x, mmap_mode='r+'), y_saida
+
+
+def _medir(metodo, pasta, k_neighbors, random_state):
+    # Executado em um processo Python novo (ver comparar_com_imblearn),
+    # para que o pico de memória de um método não contamine o outro
+    X = np.load(os.path.join(pasta, 'X.npy'), mmap_mode='r')
+    y = np.load(os.path.join(pasta, 'y.npy'))
+    with open(os.path.join(pasta, 'estrategia.json')) as f:
+        sampling_strategy = {int(c): n for c, n in json.load(f).items()}
+
+    inicio = time()
+    if metodo == 'imblearn':
+        from imblearn.over_sampling import SMOTE
+        smote = SMOTE(sampling_strategy=sampling_strategy, k_neighbors=k_neighbors, random_state=random_state)
+        X_res, _ = smote.fit_resample(np.asarray(X), y)
+    else:
+        X_res, _ = smote_em_disco(X, y, sampling_strategy, os.path.join(pasta, 'X_res'), os.path.join(pasta, 'y_res'),
+                                  k_neighbors=k_neighbors, random_state=random_state)
+    return {'metodo': metodo, 'segundos': time() - inicio, 'linhas_saida': len(X_res),
+            'pico_rss_mb': pico_memoria_mb(), 'pico_rss_processos_filhos_mb': pico_memoria_filhos_mb()}
+
+
+def comparar_com_imblearn(X, y, sampling_strategy, k_neighbors=1, random_state=42):
+    """Compara tempo e pico de memória do SMOTE em disco com o SMOTE do imblearn sobre os mesmos dados."""
+    pasta = tempfile.mkdtemp(prefix='smote_')
+    try:
+        np.save(os.path.join(pasta, 'X.npy'), np.asarray(X, dtype=np.float32))
+        np.save(os.path.join(pasta, 'y.npy'), np.asarray(y))
+        with open(os.path.join(pasta, 'estrategia.json'), 'w') as f:
+            json.dump({int(c): int(n) for c, n in sampling_strategy.items()}, f)
+
+        resultados = []
+        for metodo in ('imblearn', 'disco'):
+            saida = subprocess.run([sys.executable, os.path.abspath(__file__), '--medir', metodo, pasta,
+                                    '--k', str(k_neighbors), '--semente', str(random_state)],
+                                   capture_output=True, text=True, check=True)
+            resultados.append(json.loads(saida.stdout.strip().splitlines()[-1]))
+        return resultados
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara o SMOTE em disco com o SMOTE do imblearn.")
+    parser.add_argument('--amostras', type=int, default=200_000, help="Linhas sorteadas do CICIDS_X para o teste.")
+    parser.add_argument('--alvo', type=int, default=20_000,
+                        help="Classes com menos amostras que isso são elevadas até esse valor.")
+    parser.add_argument('--k', type=int, default=1, help="k_neighbors do SMOTE.")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--medir', nargs=2, metavar=('METODO', 'PASTA'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir:
+        print(json.dumps(_medir(args.medir[0], args.medir[1], args.k, args.semente)))
+        sys.exit()
+
+    X_completo = carregar_matriz('CICIDS_X')
+    y_completo = carregar_matriz('CICIDS_y')
+    rng = np.random.default_rng(args.semente)
+    escolhidas = np.sort(rng.choice(len(y_completo), size=min(args.amostras, len(y_completo)), replace=False))
+    X_teste = np.asarray(X_completo[escolhidas])
+    y_teste = np.asarray(y_completo[escolhidas])
+
+    contagens = np.bincount(y_teste)
+    # Classes sem vizinhos suficientes para o SMOTE ficam de fora do teste
+    estrategia = {c: max(int(n), args.alvo) for c, n in enumerate(contagens) if n > args.k}
+    manter = np.isin(y_teste, list(estrategia))
+    X_teste, y_teste = X_teste[manter], y_teste[manter]
+
+    print(f"Comparando SMOTE em {len(y_teste)} amostras e {X_teste.shape[1]} colunas")
+    for resultado in comparar_com_imblearn(X_teste, y_teste, estrategia, k_neighbors=args.k, random_state=args.semente):
+        print(f"{resultado['metodo']:>9}: {resultado['segundos']:.2f} s | {resultado['linhas_saida']} linhas | "
+              f"pico RSS {resultado['pico_rss_mb']:.0f} MB (processos auxiliares: {resultado['pico_rss_processos_filhos_mb']:.0f} MB)")
@@ -1,13 +1,19 @@
 print("Iniciando o Script: Treinamento e Avaliação do MLP.")
 
-import pandas as pd
 import numpy as np 
 from sklearn.neural_network import MLPClassifier
-from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
-import seaborn as sns
-import matplotlib.pyplot as plt
 from time import time
 import warnings
+from Artefatos import carregar_matriz
+from Treino_Streaming import treinar_em_minilotes, impressao_dados, ARQUIVO_CHECKPOINT
+from Inferencia import MotorInferencia, ARQUIVO_MODELO, ARQUIVO_MLP
+from Escalonamento import EscalonadorStreaming, ARQUIVO_SCALER
+from Avaliacao import avaliar_em_paralelo
+import pickle
+from Configuracao import MLP_CONFIG, MODO_TREINO, N_THREADS_TREINO
+from Instrumentacao import etapa
+
+ARQUIVO_METRICAS = 'metricas_teste.json'
 
 # Ignora avisos
 warnings.filterwarnings('ignore', category=UserWarning, module='sklearn')
@@ -15,6 +21,7 @@ warnings.filterwarnings('ignore', category=UserWarning, module='sklearn')
 
 def plot_loss(model):
     """Plota a curva de minimização de perda do modelo."""
+    import matplotlib.pyplot as plt
     plt.figure() 
     plt.plot(model.loss_curve_)
     plt.title('Minimização da Perda (Erro) do Gradiente')
@@ -23,6 +30,7 @@ def plot_loss(model):
     
 def nn_diagram(X, y, model, show_weights=False): 
     """Desenha um diagrama da arquitetura da rede neural."""
+    import matplotlib.pyplot as plt
     try:
         import VisualizeNN as VisNN
         # Cria uma estrutura de rede a partir das formas dos dados e camadas ocultas
@@ -44,10 +52,11 @@ def nn_diagram(X, y, model, show_weights=False):
 # Carregar os dados preparados 
 print("\nCarregando os dados de treinamento e teste.")
 try:
-    X_train = pd.read_csv('X_train_scaled.csv')
-    X_test = pd.read_csv('X_test_scaled.csv')
-    y_train = pd.read_csv('y_train.csv')
-    y_test = pd.read_csv('y_test.csv')
+    # Os artefatos .npy são abertos com mmap: nada é convertido de texto e as páginas são lidas sob demanda
+    X_train = carregar_matriz('X_train_scaled')
+    X_test = carregar_matriz('X_test_scaled')
+    y_train = carregar_matriz('y_train')
+    y_test = carregar_matriz('y_test')
     class_names = np.load('classes.npy', allow_pickle=True)
     print("Dados e mapeamento de classes carregados com sucesso.")
 except FileNotFoundError:
@@ -56,44 +65,65 @@ except FileNotFoundError:
 
 # Definir e treinar o modelo MLP
 print("\nDefinindo a arquitetura do MLP.")
-mlp = MLPClassifier(hidden_layer_sizes=(64, 32),
-                    activation='relu',
-                    solver='adam',
-                    max_iter=500,
-                    random_state=42,
-                    verbose=True)
+# A arquitetura e os hiperparâmetros ficam em Configuracao.py (MLP_CONFIG)
+mlp = MLPClassifier(**MLP_CONFIG)
 
 print("\nIniciando o treinamento do modelo...")
 start_time = time()
-mlp.fit(X_train, y_train.values.ravel())
+with etapa('treino', linhas_entrada=len(y_train), modo=MODO_TREINO):
+    if MODO_TREINO == 'streaming':
+        # Um treino interrompido é retomado do checkpoint, desde que os artefatos do Script 2 sejam os mesmos.
+        # O progresso é impresso por época; com verbose o MLPClassifier imprimiria a perda de cada bloco.
+        mlp = MLPClassifier(**dict(MLP_CONFIG, verbose=False))
+        mlp = treinar_em_minilotes(mlp, X_train, y_train, classes=np.arange(len(class_names)),
+                                   checkpoint=ARQUIVO_CHECKPOINT, origem=impressao_dados('X_train_scaled', 'y_train'))
+    elif MODO_TREINO == 'paralelo':
+        from Treino_Paralelo import MLPParalelo
+        mlp = MLPParalelo(**MLP_CONFIG, n_threads=N_THREADS_TREINO)
+        mlp.fit(X_train, y_train, classes=np.arange(len(class_names)))
+    else:
+        mlp.fit(X_train, np.ravel(y_train))
 end_time = time()
 print(f"Treinamento concluído em {end_time - start_time:.2f} segundos.")
 
+# Salvar o modelo treinado
+# O MLPClassifier completo vai para um pickle. Para a classificação de fluxos novos é exportado também um motor
+# autocontido (só NumPy, float32) com a normalização do Script 2 embutida na primeira camada:
+# ele recebe as características na escala original e devolve o nome da classe.
+with open(ARQUIVO_MLP, 'wb') as f:
+    pickle.dump(mlp, f)
+MotorInferencia.de_mlp(mlp, class_names, EscalonadorStreaming.carregar(ARQUIVO_SCALER)).salvar(ARQUIVO_MODELO)
+print(f"Modelo salvo em '{ARQUIVO_MLP}' e motor de inferência exportado para '{ARQUIVO_MODELO}'.")
+
 # Avaliar o desempenho do modelo 
 print("\nRealizando predições no conjunto de teste.")
-y_pred = mlp.predict(X_test)
-
-
-# y_test e y_pred já estão no formato de lista simples (1D), então a conversão com .argmax() não é mais necessária.
-# Uso .ravel() para garantir que y_test seja um vetor 1D.
-
-y_test_labels = y_test.values.ravel()
-y_pred_labels = y_pred # y_pred já está no formato correto.
+# Os dados de teste já estão normalizados, então aqui o motor é montado sem o scaler embutido.
+# O X_test é lido em blocos e cada predição atualiza uma única matriz de confusão,
+# da qual saem a acurácia, o relatório por classe e o gráfico, sem guardar o vetor y_pred inteiro.
+motor = MotorInferencia.de_mlp(mlp, class_names)
+with etapa('avaliacao', linhas_entrada=len(y_test)):
+    matriz_confusao = avaliar_em_paralelo(motor, X_test, y_test, n_classes=len(class_names))
+    matriz_confusao.salvar(ARQUIVO_METRICAS, class_names)
 
 
 # Calculo explícito da acurácia
-accuracy = accuracy_score(y_test_labels, y_pred_labels)
+accuracy = matriz_confusao.acuracia()
 print("\n\n ACURÁCIA GERAL")
 print(f"A Acurácia Geral do modelo é: {accuracy:.4f} (ou {accuracy:.2%})")
 
 print("\n\n RELATÓRIO DE AVALIAÇÃO DO MODELO")
-report = classification_report(y_test_labels, y_pred_labels, labels=range(len(class_names)), target_names=class_names, zero_division=0, digits=4)
+report = matriz_confusao.relatorio(class_names, digitos=4)
 print(report)
 
 # MATRIZ DE CONFUSÃO
 print("\nMATRIZ DE CONFUSÃO")
 try:
-    cm = confusion_matrix(y_test_labels, y_pred_labels)
+    # seaborn e matplotlib levam mais tempo para importar do que o resto do script leva para começar:
+    # só são carregados aqui, no único ponto em que são usados
+    import seaborn as sns
+    import matplotlib.pyplot as plt
+
+    cm = matriz_confusao.matriz
     plt.figure(figsize=(14, 11))
     sns.heatmap(cm, annot=True, fmt='d', xticklabels=class_names, yticklabels=class_names, cmap='Blues')
     plt.title('Matriz de Confusão', fontsize=16)
@@ -0,0 +1,352 @@
+"""Treino do MLP em NumPy com paralelismo de dados entre os núcleos da CPU.
+
+Cada minilote é dividido em fatias, uma por thread. Cada thread calcula a propagação e o gradiente da sua
+fatia em buffers próprios (float32); os gradientes são somados, divididos pelo tamanho do minilote e
+aplicados com Adam, como no MLPClassifier ('python Treino_Paralelo.py --verificar' confere as duas contas).
+O produto de matrizes do NumPy libera o GIL, então as threads rodam de fato em paralelo. O BLAS é limitado
+a um thread por chamada durante o treino (threadpoolctl), para não disputar núcleos com o pool.
+
+O resultado tem os mesmos atributos usados pelo resto do pipeline (coefs_, intercepts_, loss_curve_,
+classes_, activation, out_activation_): serve para o plot_loss, o pickle do Script 3 e o MotorInferencia.
+"""
+
+import os
+import argparse
+from time import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from threadpoolctl import threadpool_limits
+
+# As mesmas ativações do motor de inferência: treino e inferência não podem divergir
+from Inferencia import _ATIVACOES
+
+# Linhas lidas do disco de uma vez; dentro do bloco os minilotes são sorteados na memória
+TAMANHO_BLOCO = 262_144
+
+
+def _derivada(ativacao, a, delta):
+    # Multiplica 'delta' (no lugar) pela derivada da ativação, escrita em função da saída 'a' da camada
+    if ativacao == 'relu':
+        delta[a <= 0] = 0
+    elif ativacao == 'tanh':
+        delta *= 1 - a * a
+    elif ativacao == 'logistic':
+        delta *= a * (1 - a)
+
+
+class _Fatia:
+    """Buffers de ativação e de gradiente de um thread, alocados uma única vez."""
+
+    def __init__(self, tamanhos, linhas, dtype=np.float32):
+        self.ativacoes = [np.empty((linhas, n), dtype=dtype) for n in tamanhos[1:]]
+        self.deltas = [np.empty((linhas, n), dtype=dtype) for n in tamanhos[1:]]
+        self.grad_pesos = [np.empty((a, b), dtype=dtype) for a, b in zip(tamanhos[:-1], tamanhos[1:])]
+        self.grad_vieses = [np.empty(n, dtype=dtype) for n in tamanhos[1:]]
+        self.perda = 0.0
+
+
+class MLPParalelo:
+    """MLP para classificação (softmax + entropia cruzada, Adam) treinado com vários threads.
+
+    Os hiperparâmetros têm os mesmos nomes e padrões do MLPClassifier, exceto 'batch_size': aqui o
+    minilote é dividido entre os threads, então ele precisa ser maior que o padrão de 200 do scikit-learn
+    para que cada fatia tenha trabalho suficiente.
+    """
+
+    def __init__(self, hidden_layer_sizes=(100,), activation='relu', solver='adam', alpha=1e-4, batch_size=1024,
+                 learning_rate_init=1e-3, max_iter=200, random_state=None, tol=1e-4, verbose=False,
+                 beta_1=0.9, beta_2=0.999, epsilon=1e-8, n_iter_no_change=10, n_threads=None):
+        if solver != 'adam':
+            raise ValueError(f"O MLPParalelo só implementa o solver 'adam' (recebido: '{solver}').")
+        if activation not in _ATIVACOES:
+            raise ValueError(f"Ativação desconhecida: '{activation}'.")
+        self.hidden_layer_sizes = tuple(hidden_layer_sizes)
+        self.activation = activation
+        self.solver = solver
+        self.alpha = alpha
+        self.batch_size = batch_size
+        self.learning_rate_init = learning_rate_init
+        self.max_iter = max_iter
+        self.random_state = random_state
+        self.tol = tol
+        self.verbose = verbose
+        self.beta_1 = beta_1
+        self.beta_2 = beta_2
+        self.epsilon = epsilon
+        self.n_iter_no_change = n_iter_no_change
+        self.n_threads = n_threads
+        self.out_activation_ = 'softmax'
+
+    def _inicializar(self, n_entradas, n_classes):
+        # Inicialização de Glorot, a mesma do MLPClassifier
+        rng = np.random.default_rng(self.random_state)
+        tamanhos = [n_entradas, *self.hidden_layer_sizes, n_classes]
+        fator = 2.0 if self.activation == 'logistic' else 6.0
+        self.coefs_, self.intercepts_ = [], []
+        for entrada, saida in zip(tamanhos[:-1], tamanhos[1:]):
+            limite = np.sqrt(fator / (entrada + saida))
+            self.coefs_.append(rng.uniform(-limite, limite, (entrada, saida)).astype(np.float32))
+            self.intercepts_.append(rng.uniform(-limite, limite, saida).astype(np.float32))
+        self._m = [np.zeros_like(p) for p in self.coefs_ + self.intercepts_]
+        self._v = [np.zeros_like(p) for p in self.coefs_ + self.intercepts_]
+        self._passo = 0
+        self.loss_curve_ = []
+        self.n_iter_ = 0
+        self._melhor_perda = np.inf
+        self._sem_melhora = 0
+        return tamanhos
+
+    def _propagar(self, X, fatia, n):
+        entrada = X
+        ativar = _ATIVACOES[self.activation]
+        for i, (w, b) in enumerate(zip(self.coefs_, self.intercepts_)):
+            saida = fatia.ativacoes[i][:n]
+            np.matmul(entrada, w, out=saida)
+            saida += b
+            if i < len(self.coefs_) - 1:
+                ativar(saida)
+            entrada = saida
+        # Softmax estável
+        entrada -= entrada.max(axis=1, keepdims=True)
+        np.exp(entrada, out=entrada)
+        entrada /= entrada.sum(axis=1, keepdims=True)
+        return entrada
+
+    def _gradiente(self, X, y, fatia):
+        # Gradiente da soma (não da média) das perdas da fatia; a média é feita depois de juntar as fatias
+        n = len(y)
+        probabilidades = self._propagar(X, fatia, n)
+        linhas = np.arange(n)
+        fatia.perda = float(-np.log(np.maximum(probabilidades[linhas, y], 1e-10)).sum())
+
+        ultima = len(self.coefs_) - 1
+        delta = fatia.deltas[ultima][:n]
+        np.copyto(delta, probabilidades)
+        delta[linhas, y] -= 1
+        for i in range(ultima, -1, -1):
+            anterior = X if i == 0 else fatia.ativacoes[i - 1][:n]
+            np.matmul(anterior.T, delta, out=fatia.grad_pesos[i])
+            delta.sum(axis=0, out=fatia.grad_vieses[i])
+            if i > 0:
+                proximo = fatia.deltas[i - 1][:n]
+                np.matmul(delta, self.coefs_[i].T, out=proximo)
+                _derivada(self.activation, anterior, proximo)
+                delta = proximo
+        return fatia
+
+    def _gradiente_medio(self, fatias, n):
+        # Soma os gradientes das fatias e divide pelo tamanho do minilote (pesos primeiro, depois vieses)
+        n_camadas = len(self.coefs_)
+        gradientes = []
+        for j, parametro in enumerate(self.coefs_ + self.intercepts_):
+            if j < n_camadas:
+                grad = sum(f.grad_pesos[j] for f in fatias)
+                # Regularização L2 apenas nos pesos, como no MLPClassifier
+                grad += self.alpha * parametro
+            else:
+                grad = sum(f.grad_vieses[j - n_camadas] for f in fatias)
+            grad /= n
+            gradientes.append(grad)
+        return gradientes
+
+    def _aplicar_adam(self, fatias, n):
+        self._passo += 1
+        taxa = (self.learning_rate_init * np.sqrt(1 - self.beta_2 ** self._passo) / (1 - self.beta_1 ** self._passo))
+        parametros = self.coefs_ + self.intercepts_
+        for j, (parametro, grad) in enumerate(zip(parametros, self._gradiente_medio(fatias, n))):
+            m, v = self._m[j], self._v[j]
+            m *= self.beta_1
+            m += (1 - self.beta_1) * grad
+            v *= self.beta_2
+            v += (1 - self.beta_2) * grad * grad
+            parametro -= taxa * m / (np.sqrt(v) + self.epsilon)
+
+    def _perda_l2(self, n):
+        return 0.5 * self.alpha * sum(float((w * w).sum()) for w in self.coefs_) / n
+
+    def fit(self, X, y, classes=None, epocas=None):
+        """Treina sobre X/y (arrays ou memmaps, lidos em blocos). 'epocas' limita as épocas desta chamada."""
+        y = np.asarray(y).ravel()
+        self.classes_ = np.asarray(classes) if classes is not None else np.flatnonzero(np.bincount(y))
+        n_threads = self.n_threads or os.cpu_count() or 1
+        tamanhos = self._inicializar(X.shape[1], len(self.classes_))
+        # Os rótulos viram posições em classes_ (no pipeline elas já são 0..n-1)
+        codigos = np.searchsorted(self.classes_, y).astype(np.int64)
+
+        linhas_por_fatia = -(-self.batch_size // n_threads)
+        fatias = [_Fatia(tamanhos, linhas_por_fatia) for _ in range(n_threads)]
+
+        # Um thread de BLAS por chamada: o paralelismo vem do pool, não da álgebra linear
+        with threadpool_limits(limits=1), ThreadPoolExecutor(max_workers=n_threads) as pool:
+            for epoca in range(1, (epocas or self.max_iter) + 1):
+                inicio = time()
+                perda = self._epoca(X, codigos, epoca, fatias, pool)
+                self.loss_curve_.append(perda)
+                self.n_iter_ += 1
+                if self.verbose:
+                    print(f"Iteração {self.n_iter_}, perda = {perda:.8f} ({len(y) / (time() - inicio):,.0f} amostras/s)")
+                if perda > self._melhor_perda - self.tol:
+                    self._sem_melhora += 1
+                else:
+                    self._sem_melhora = 0
+                self._melhor_perda = min(self._melhor_perda, perda)
+                if self._sem_melhora > self.n_iter_no_change:
+                    if self.verbose:
+                        print(f"A perda não melhorou mais que tol={self.tol} por {self.n_iter_no_change} épocas. Parando.")
+                    break
+        return self
+
+    def _epoca(self, X, codigos, epoca, fatias, pool):
+        n = len(codigos)
+        # Mesmo embaralhamento determinístico por época do Treino_Streaming
+        rng = np.random.default_rng([self.random_state or 0, epoca])
+        ordem = rng.permutation(n)
+        soma_perdas = 0.0
+        for inicio_bloco in range(0, n, TAMANHO_BLOCO):
+            linhas = np.sort(ordem[inicio_bloco:inicio_bloco + TAMANHO_BLOCO])
+            X_bloco = np.asarray(X[linhas], dtype=np.float32)
+            y_bloco = codigos[linhas]
+            embaralhado = rng.permutation(len(linhas))
+            for inicio in range(0, len(linhas), self.batch_size):
+                lote = embaralhado[inicio:inicio + self.batch_size]
+                X_lote, y_lote = X_bloco[lote], y_bloco[lote]
+                partes = np.array_split(np.arange(len(lote)), len(fatias))
+                tarefas = [pool.submit(self._gradiente, X_lote[p[0]:p[-1] + 1], y_lote[p[0]:p[-1] + 1], fatia)
+                           for p, fatia in zip(partes, fatias) if len(p)]
+                usadas = [tarefa.result() for tarefa in tarefas]
+                self._aplicar_adam(usadas, len(lote))
+                soma_perdas += sum(f.perda for f in usadas) + self._perda_l2(len(lote)) * len(lote)
+        return soma_perdas / n
+
+    def predict_proba(self, X):
+        fatia = _Fatia([X.shape[1], *self.hidden_layer_sizes, len(self.classes_)], len(X))
+        return self._propagar(np.asarray(X, dtype=np.float32), fatia, len(X)).copy()
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def _em_float64(modelo):
+    modelo.coefs_ = [w.astype(np.float64) for w in modelo.coefs_]
+    modelo.intercepts_ = [b.astype(np.float64) for b in modelo.intercepts_]
+    modelo._m = [np.zeros_like(p) for p in modelo.coefs_ + modelo.intercepts_]
+    modelo._v = [np.zeros_like(p) for p in modelo.coefs_ + modelo.intercepts_]
+
+
+def verificar_gradiente(activation='relu', hidden_layer_sizes=(7, 5), n_entradas=6, n_classes=4, amostras=24,
+                        n_fatias=3, alpha=1e-2, passo=1e-5, random_state=0):
+    """Maior erro relativo entre o gradiente do MLPParalelo e o de diferenças finitas centrais.
+
+    Em float64, sobre dados aleatórios pequenos divididos em 'n_fatias' fatias, derivando a mesma perda
+    que o treino minimiza (entropia cruzada média + L2). Um gradiente correto dá erros abaixo de 1e-6.
+    """
+    rng = np.random.default_rng(random_state)
+    X = rng.normal(size=(amostras, n_entradas))
+    y = rng.integers(n_classes, size=amostras)
+    modelo = MLPParalelo(hidden_layer_sizes, activation, alpha=alpha, random_state=random_state)
+    tamanhos = modelo._inicializar(n_entradas, n_classes)
+    _em_float64(modelo)
+    partes = np.array_split(np.arange(amostras), n_fatias)
+    fatias = [_Fatia(tamanhos, len(p), np.float64) for p in partes]
+
+    def perda():
+        soma = sum(modelo._gradiente(X[p], y[p], fatia).perda for p, fatia in zip(partes, fatias))
+        return soma / amostras + modelo._perda_l2(amostras)
+
+    perda()
+    analitico = modelo._gradiente_medio(fatias, amostras)
+    pior = 0.0
+    for parametro, grad in zip(modelo.coefs_ + modelo.intercepts_, analitico):
+        for indice in np.ndindex(parametro.shape):
+            original = parametro[indice]
+            parametro[indice] = original + passo
+            mais = perda()
+            parametro[indice] = original - passo
+            menos = perda()
+            parametro[indice] = original
+            numerico = (mais - menos) / (2 * passo)
+            # O piso no denominador evita que o ruído de arredondamento (~1e-11) pese em gradientes quase nulos
+            pior = max(pior, abs(numerico - grad[indice]) / max(abs(numerico) + abs(grad[indice]), 1e-4))
+    return pior
+
+
+def verificar_adam(passos=3, n_fatias=2, n=16, random_state=0):
+    """Maior diferença entre os parâmetros depois de alguns passos do Adam do MLPParalelo e do scikit-learn.
+
+    Os dois otimizadores recebem os mesmos gradientes (aleatórios, somados de 'n_fatias' fatias) a cada passo.
+    """
+    from sklearn.neural_network._stochastic_optimizers import AdamOptimizer
+
+    rng = np.random.default_rng(random_state)
+    modelo = MLPParalelo((5,), alpha=1e-2, random_state=random_state)
+    tamanhos = modelo._inicializar(4, 3)
+    _em_float64(modelo)
+    referencia = [p.copy() for p in modelo.coefs_ + modelo.intercepts_]
+    otimizador = AdamOptimizer(referencia, modelo.learning_rate_init, modelo.beta_1, modelo.beta_2, modelo.epsilon)
+    fatias = [_Fatia(tamanhos, 1, np.float64) for _ in range(n_fatias)]
+    for _ in range(passos):
+        for fatia in fatias:
+            for grad in fatia.grad_pesos + fatia.grad_vieses:
+                grad[...] = rng.normal(size=grad.shape)
+        # O gradiente do scikit-learn é o do modelo antes do passo, como no treino
+        otimizador.update_params(referencia, modelo._gradiente_medio(fatias, n))
+        modelo._aplicar_adam(fatias, n)
+    return max(float(np.abs(p - r).max()) for p, r in zip(modelo.coefs_ + modelo.intercepts_, referencia))
+
+
+def medir_escalonamento(X, y, threads=(1, 2, 4, 8), epocas=1, **parametros):
+    """Tempo de treino e aceleração para cada número de threads, com os mesmos dados e a mesma semente."""
+    resultados = []
+    base = None
+    for n in threads:
+        modelo = MLPParalelo(n_threads=n, max_iter=epocas, **parametros)
+        inicio = time()
+        modelo.fit(X, y)
+        segundos = time() - inicio
+        base = base or segundos
+        resultados.append({'threads': n, 'segundos': segundos, 'amostras_por_segundo': len(y) * epocas / segundos,
+                           'aceleracao': base / segundos, 'eficiencia': base / segundos / n,
+                           'perda_final': modelo.loss_curve_[-1]})
+    return resultados
+
+
+if __name__ == "__main__":
+    from Artefatos import carregar_matriz
+
+    parser = argparse.ArgumentParser(description="Escalonamento do treino paralelo do MLP de 1 a N threads.")
+    parser.add_argument('--threads', type=int, nargs='+', default=None, help="Padrão: 1, 2, 4, ... até os núcleos da máquina.")
+    parser.add_argument('--amostras', type=int, default=1_000_000, help="Linhas do X_train_scaled usadas na medida.")
+    parser.add_argument('--epocas', type=int, default=1)
+    parser.add_argument('--batch-size', type=int, default=1024)
+    parser.add_argument('--verificar', action='store_true',
+                        help="Só confere o gradiente (diferenças finitas) e o Adam (contra o scikit-learn) e sai.")
+    args = parser.parse_args()
+
+    if args.verificar:
+        falhas = 0
+        for ativacao in _ATIVACOES:
+            erro = verificar_gradiente(ativacao)
+            falhas += erro > 1e-5
+            print(f"Gradiente ({ativacao}): maior erro relativo = {erro:.2e}")
+        diferenca = verificar_adam()
+        falhas += diferenca > 1e-10
+        print(f"Adam: maior diferença para o scikit-learn = {diferenca:.2e}")
+        print("Verificação concluída." if not falhas else f"Verificação FALHOU em {falhas} caso(s).")
+        exit(1 if falhas else 0)
+
+    if args.threads is None:
+        nucleos = os.cpu_count() or 1
+        args.threads = sorted({min(2 ** i, nucleos) for i in range(nucleos.bit_length() + 1)})
+
+    X = carregar_matriz('X_train_scaled')
+    y = carregar_matriz('y_train')
+    linhas = np.sort(np.random.default_rng(42).choice(len(y), size=min(args.amostras, len(y)), replace=False))
+    X_amostra, y_amostra = np.asarray(X[linhas], dtype=np.float32), np.asarray(y[linhas])
+
+    print(f"Treinando {args.epocas} época(s) sobre {len(y_amostra)} amostras (minilote de {args.batch_size})")
+    print(f"{'threads':>7} {'segundos':>9} {'amostras/s':>12} {'aceleração':>11} {'eficiência':>11} {'perda':>9}")
+    for r in medir_escalonamento(X_amostra, y_amostra, args.threads, args.epocas, hidden_layer_sizes=(64, 32),
+                                 batch_size=args.batch_size, random_state=42):
+        print(f"{r['threads']:>7} {r['segundos']:>9.2f} {r['amostras_por_segundo']:>12,.0f} {r['aceleracao']:>10.2f}x "
+              f"{r['eficiencia']:>10.0%} {r['perda_final']:>9.4f}")
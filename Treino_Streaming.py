@@ -0,0 +1,174 @@
+"""Treino do MLP em minilotes embaralhados lidos do artefato em disco, com checkpoint e parada antecipada."""
+
+import os
+import json
+import pickle
+import hashlib
+from time import time
+
+import numpy as np
+
+ARQUIVO_CHECKPOINT = 'checkpoint_mlp.pkl'
+
+# Linhas lidas do disco por chamada ao partial_fit. Dentro de cada bloco o próprio MLP
+# embaralha e divide em minilotes de 'batch_size'.
+TAMANHO_BLOCO = 65_536
+
+
+def _salvar_checkpoint(caminho, estado):
+    # Grava em um arquivo temporário e renomeia: um processo interrompido no meio nunca corrompe o checkpoint
+    temporario = caminho + '.tmp'
+    with open(temporario, 'wb') as f:
+        pickle.dump(estado, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporario, caminho)
+
+
+def carregar_checkpoint(caminho=ARQUIVO_CHECKPOINT):
+    """Lê o estado salvo ao fim da última época concluída (ou None se não houver)."""
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, 'rb') as f:
+        return pickle.load(f)
+
+
+def impressao_dados(*bases):
+    """Identifica o conteúdo dos artefatos de treino: forma e metadados, tamanho e data do arquivo de dados.
+
+    Um checkpoint só é retomado se os dados forem os mesmos: um Script 2 rodado de novo (outra divisão,
+    outro SMOTE) muda a data dos arquivos e invalida o treino salvo.
+    """
+    from Artefatos import carregar_metadados, caminho_dados, FORMATO_PADRAO
+
+    impressao = {}
+    for base in bases:
+        meta = carregar_metadados(base)
+        estado = os.stat(caminho_dados(base, meta.get('formato', FORMATO_PADRAO)))
+        impressao[base] = {'forma': meta.get('forma'), 'tamanho': estado.st_size, 'mtime': estado.st_mtime,
+                           'metadados': hashlib.sha256(json.dumps(meta, sort_keys=True).encode()).hexdigest()}
+    return impressao
+
+
+def checkpoint_compativel(estado, mlp, origem):
+    """Motivo pelo qual o checkpoint não pode ser retomado por este treino (ou None se ele pode)."""
+    if estado['mlp'].get_params() != mlp.get_params():
+        return "foi gerado com outra configuração do MLP"
+    if estado.get('origem') != origem:
+        return "foi gerado com outros dados de treino"
+    if estado.get('concluido'):
+        return "é de um treino já concluído"
+    return None
+
+
+def acuracia_em_blocos(modelo, X, y, indices, tamanho_bloco=TAMANHO_BLOCO):
+    """Acurácia sobre as linhas 'indices' de X, lidas em blocos."""
+    acertos = 0
+    for inicio in range(0, len(indices), tamanho_bloco):
+        bloco = indices[inicio:inicio + tamanho_bloco]
+        acertos += int((modelo.predict(X[bloco]) == y[bloco]).sum())
+    return acertos / max(len(indices), 1)
+
+
+def dividir_validacao(n, fracao_validacao, random_state):
+    """Separa (sempre da mesma forma para a mesma semente) os índices de treino e de validação."""
+    permutacao = np.random.default_rng(random_state).permutation(n)
+    n_validacao = int(round(n * fracao_validacao))
+    return np.sort(permutacao[n_validacao:]), np.sort(permutacao[:n_validacao])
+
+
+def treinar_em_minilotes(mlp, X, y, classes, epocas=None, tamanho_bloco=TAMANHO_BLOCO, fracao_validacao=0.1,
+                         paciencia=10, tol=1e-4, random_state=42, checkpoint=ARQUIVO_CHECKPOINT, retomar=True,
+                         ao_fim_da_epoca=None, verbose=True, origem=None, indices_validacao=None):
+    """Treina 'mlp' com partial_fit sobre X/y (memmaps), sem carregar o conjunto inteiro na memória.
+
+    A cada época as linhas de treino são embaralhadas e lidas do disco em blocos de 'tamanho_bloco'.
+    Ao fim de cada época a acurácia em uma fatia separada para validação decide a parada antecipada
+    (como o early_stopping do MLPClassifier) e o estado completo é salvo em 'checkpoint'.
+    Se 'retomar' for True e houver checkpoint do mesmo MLP e dos mesmos dados ('origem', por exemplo
+    impressao_dados('X_train_scaled', 'y_train'); na falta dela, a forma de X e y), o treino continua da
+    época seguinte à última concluída. Ao terminar, o checkpoint é marcado como concluído e não é mais retomado.
+    Ao final os pesos da melhor época são restaurados e 'loss_curve_' passa a ter uma perda por época.
+    'ao_fim_da_epoca(epoca, score)' é chamada depois de cada época; se devolver True, o treino é interrompido.
+    Com 'indices_validacao' a validação usa essas linhas (e o treino, todas as outras) em vez do sorteio.
+    """
+    epocas = epocas or mlp.max_iter
+    classes = np.asarray(classes)
+    if indices_validacao is None:
+        indices_treino, indices_validacao = dividir_validacao(len(y), fracao_validacao, random_state)
+    else:
+        indices_validacao = np.sort(np.asarray(indices_validacao, dtype=np.int64))
+        indices_treino = np.setdiff1d(np.arange(len(y)), indices_validacao, assume_unique=True)
+
+    origem = {'forma_x': list(X.shape), 'linhas_y': len(y), **(origem or {})}
+
+    estado = carregar_checkpoint(checkpoint) if retomar and checkpoint else None
+    motivo = checkpoint_compativel(estado, mlp, origem) if estado is not None else None
+    if motivo is not None:
+        # Outra configuração, outros dados ou um treino que já terminou: recomeça do zero
+        if verbose:
+            print(f"O checkpoint '{checkpoint}' {motivo} e será ignorado.")
+        estado = None
+    if estado is not None:
+        mlp = estado['mlp']
+        if verbose:
+            print(f"Retomando o treino do checkpoint '{checkpoint}' (época {estado['epoca']} concluída).")
+    else:
+        estado = {'mlp': mlp, 'epoca': 0, 'melhor_score': -np.inf, 'melhores_pesos': None, 'origem': origem,
+                  'concluido': False, 'sem_melhora': 0, 'historico': {'perda': [], 'validacao': [], 'amostras_por_segundo': []}}
+
+    historico = estado['historico']
+    for epoca in range(estado['epoca'] + 1, epocas + 1):
+        inicio = time()
+        # O embaralhamento de cada época depende só da semente e do número da época,
+        # então uma época retomada vê exatamente a mesma ordem.
+        ordem = np.random.default_rng([random_state, epoca]).permutation(indices_treino)
+
+        soma_perdas = 0.0
+        for inicio_bloco in range(0, len(ordem), tamanho_bloco):
+            # Índices ordenados deixam a leitura do memmap mais sequencial; o partial_fit reembaralha o bloco
+            bloco = np.sort(ordem[inicio_bloco:inicio_bloco + tamanho_bloco])
+            mlp.partial_fit(X[bloco], y[bloco], classes=classes)
+            soma_perdas += mlp.loss_ * len(bloco)
+
+        duracao = time() - inicio
+        perda = soma_perdas / max(len(ordem), 1)
+        score = acuracia_em_blocos(mlp, X, y, indices_validacao, tamanho_bloco)
+        velocidade = len(ordem) / duracao if duracao > 0 else float('nan')
+
+        historico['perda'].append(perda)
+        historico['validacao'].append(score)
+        historico['amostras_por_segundo'].append(velocidade)
+        if verbose:
+            print(f"Época {epoca}: perda = {perda:.6f} | acurácia de validação = {score:.4f} | "
+                  f"{velocidade:,.0f} amostras/s")
+
+        if score > estado['melhor_score'] + tol:
+            estado['melhor_score'] = score
+            estado['melhores_pesos'] = ([c.copy() for c in mlp.coefs_], [b.copy() for b in mlp.intercepts_])
+            estado['sem_melhora'] = 0
+        else:
+            estado['sem_melhora'] += 1
+
+        estado['epoca'] = epoca
+        estado['mlp'] = mlp
+        if checkpoint:
+            _salvar_checkpoint(checkpoint, estado)
+
+        if estado['sem_melhora'] >= paciencia:
+            if verbose:
+                print(f"Validação sem melhora há {paciencia} épocas. Parando o treino.")
+            break
+        if ao_fim_da_epoca is not None and ao_fim_da_epoca(epoca, score):
+            break
+
+    if checkpoint:
+        # Um novo treino com os mesmos dados não deve retomar (e devolver sem treinar) este modelo
+        estado['concluido'] = True
+        _salvar_checkpoint(checkpoint, estado)
+
+    if estado['melhores_pesos'] is not None:
+        mlp.coefs_, mlp.intercepts_ = estado['melhores_pesos']
+    # Uma perda por época, no mesmo formato que o plot_loss espera
+    mlp.loss_curve_ = list(historico['perda'])
+    mlp.validation_scores_ = list(historico['validacao'])
+    mlp.best_validation_score_ = estado['melhor_score']
+    return mlp
@@ -0,0 +1,176 @@
+"""Varredura paralela de hiperparâmetros e arquiteturas do MLP sobre os artefatos já preparados.
+
+Os processos abrem X_train_scaled.npy com mmap: todos leem as mesmas páginas do cache do sistema
+operacional, sem uma cópia dos dados por processo. Configurações ruins são podadas cedo pela regra
+da mediana: a partir de 'epocas_minimas', uma configuração cuja acurácia de validação fica abaixo da
+mediana das outras na mesma época é interrompida.
+
+O X_train_scaled tem as linhas sintéticas do SMOTE depois das originais. A validação (F1, acurácia e
+poda) usa só linhas originais: a dobra 0 do dobras_treino, se ele existir, ou um sorteio entre as
+primeiras len(indices_treino) linhas. As sintéticas ficam todas no treino.
+"""
+
+import argparse
+import itertools
+import multiprocessing
+from time import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from Artefatos import carregar_matriz
+from Treino_Streaming import treinar_em_minilotes, dividir_validacao, TAMANHO_BLOCO
+
+ARQUIVO_RESULTADOS = 'resultados_varredura.csv'
+
+GRADE_PADRAO = {
+    'hidden_layer_sizes': [(64, 32), (128, 64), (64,), (32, 16)],
+    'learning_rate_init': [1e-3, 3e-3],
+    'batch_size': [200, 512],
+    'alpha': [1e-4, 1e-3],
+}
+
+
+def gerar_configuracoes(grade=None, n_aleatorias=None, semente=42):
+    """Todas as combinações da grade, ou 'n_aleatorias' delas sorteadas sem repetição."""
+    grade = grade or GRADE_PADRAO
+    nomes = list(grade)
+    configuracoes = [dict(zip(nomes, valores)) for valores in itertools.product(*(grade[n] for n in nomes))]
+    if n_aleatorias is not None and n_aleatorias < len(configuracoes):
+        escolhidas = np.random.default_rng(semente).choice(len(configuracoes), size=n_aleatorias, replace=False)
+        configuracoes = [configuracoes[i] for i in sorted(escolhidas)]
+    return configuracoes
+
+
+class _PodaPelaMediana:
+    # Compartilhada entre os processos através de um Manager
+    def __init__(self, placar, trava, epocas_minimas, minimo_de_pares):
+        self.placar = placar
+        self.trava = trava
+        self.epocas_minimas = epocas_minimas
+        self.minimo_de_pares = minimo_de_pares
+        self.podada_na_epoca = None
+
+    def __call__(self, epoca, score):
+        with self.trava:
+            anteriores = list(self.placar.get(epoca, []))
+            self.placar[epoca] = anteriores + [score]
+        if epoca < self.epocas_minimas or len(anteriores) < self.minimo_de_pares:
+            return False
+        if score < np.median(anteriores):
+            self.podada_na_epoca = epoca
+            return True
+        return False
+
+
+def validacao_original(fracao_validacao=0.1, random_state=42):
+    """Posições de validação no X_train_scaled, só entre as linhas originais (anteriores ao SMOTE), e a descrição."""
+    from Divisao import carregar_divisao, indices_da_dobra
+
+    indices_treino, _, dobras = carregar_divisao()
+    if dobras is not None:
+        _, validacao = indices_da_dobra(dobras, 0)
+        n_dobras = int(np.asarray(dobras).max()) + 1
+        return validacao, f"{len(validacao)} linhas originais (dobra 0 de {n_dobras})"
+    _, validacao = dividir_validacao(len(indices_treino), fracao_validacao, random_state)
+    return validacao, f"{len(validacao)} linhas originais (sorteio de {fracao_validacao:.0%})"
+
+
+def _avaliar_configuracao(indice, config, opcoes, poda):
+    from sklearn.neural_network import MLPClassifier
+    from sklearn.metrics import f1_score
+    from threadpoolctl import threadpool_limits
+
+    X = carregar_matriz('X_train_scaled')
+    y = carregar_matriz('y_train')
+    n_classes = int(opcoes['n_classes'])
+    indices_validacao = opcoes['indices_validacao']
+
+    mlp = MLPClassifier(activation='relu', solver='adam', random_state=opcoes['random_state'],
+                        max_iter=opcoes['epocas'], **config)
+
+    # Um thread de BLAS por processo: o paralelismo vem do pool, não da álgebra linear
+    with threadpool_limits(limits=1):
+        inicio = time()
+        mlp = treinar_em_minilotes(mlp, X, y, classes=np.arange(n_classes), epocas=opcoes['epocas'],
+                                   fracao_validacao=opcoes['fracao_validacao'], paciencia=opcoes['paciencia'],
+                                   random_state=opcoes['random_state'], checkpoint=None,
+                                   ao_fim_da_epoca=poda, verbose=False, indices_validacao=indices_validacao)
+        tempo_treino = time() - inicio
+
+        inicio = time()
+        y_pred = np.concatenate([mlp.predict(X[indices_validacao[i:i + TAMANHO_BLOCO]])
+                                 for i in range(0, len(indices_validacao), TAMANHO_BLOCO)])
+        tempo_predicao = time() - inicio
+
+    y_val = np.asarray(y[indices_validacao])
+    f1_classes = f1_score(y_val, y_pred, labels=range(n_classes), average=None, zero_division=0)
+    resultado = {
+        'config': indice,
+        **{chave: str(valor) for chave, valor in config.items()},
+        'epocas': len(mlp.loss_curve_),
+        'podada_na_epoca': poda.podada_na_epoca,
+        'tempo_treino_s': tempo_treino,
+        'tempo_predicao_s': tempo_predicao,
+        'acuracia_validacao': float((y_pred == y_val).mean()),
+        'f1_macro': float(f1_classes.mean()),
+        'validacao': opcoes['descricao_validacao'],
+    }
+    resultado.update({f'f1_{opcoes["classes"][c]}': float(f) for c, f in enumerate(f1_classes)})
+    return resultado
+
+
+def executar_varredura(configuracoes, max_workers=None, epocas=30, epocas_minimas=3, fracao_validacao=0.1,
+                       paciencia=5, random_state=42):
+    """Treina as configurações em paralelo e devolve a tabela de resultados, da melhor para a pior (F1 macro)."""
+    classes = [str(c) for c in np.load('classes.npy', allow_pickle=True)]
+    indices_validacao, descricao = validacao_original(fracao_validacao, random_state)
+    print(f"Validação: {descricao}, sem as linhas sintéticas do SMOTE.")
+    opcoes = {'n_classes': len(classes), 'classes': classes, 'epocas': epocas,
+              'fracao_validacao': fracao_validacao, 'paciencia': paciencia, 'random_state': random_state,
+              'indices_validacao': indices_validacao, 'descricao_validacao': descricao}
+
+    resultados = []
+    with multiprocessing.Manager() as gerente:
+        placar, trava = gerente.dict(), gerente.Lock()
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futuros = {pool.submit(_avaliar_configuracao, i, config, opcoes,
+                                   _PodaPelaMediana(placar, trava, epocas_minimas, minimo_de_pares=2)): config
+                       for i, config in enumerate(configuracoes)}
+            for futuro in as_completed(futuros):
+                try:
+                    resultado = futuro.result()
+                except Exception as e:
+                    print(f"Configuração {futuros[futuro]} falhou: {e}")
+                    continue
+                situacao = f"podada na época {resultado['podada_na_epoca']}" if resultado['podada_na_epoca'] else "concluída"
+                print(f"[{len(resultados) + 1}/{len(configuracoes)}] {futuros[futuro]} -> F1 macro "
+                      f"{resultado['f1_macro']:.4f} ({situacao}, {resultado['tempo_treino_s']:.1f} s)")
+                resultados.append(resultado)
+
+    tabela = pd.DataFrame(resultados)
+    if len(tabela):
+        tabela = tabela.sort_values('f1_macro', ascending=False).reset_index(drop=True)
+    return tabela
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Varredura paralela de hiperparâmetros do MLP.")
+    parser.add_argument('--aleatorias', type=int, default=None, help="Sorteia N configurações da grade em vez de testar todas.")
+    parser.add_argument('--processos', type=int, default=None)
+    parser.add_argument('--epocas', type=int, default=30)
+    parser.add_argument('--epocas-minimas', type=int, default=3, help="Nenhuma configuração é podada antes desta época.")
+    parser.add_argument('--saida', default=ARQUIVO_RESULTADOS)
+    args = parser.parse_args()
+
+    configuracoes = gerar_configuracoes(n_aleatorias=args.aleatorias)
+    print(f"Iniciando a varredura de {len(configuracoes)} configurações")
+    inicio = time()
+    tabela = executar_varredura(configuracoes, args.processos, args.epocas, args.epocas_minimas)
+    tabela.to_csv(args.saida, index=False)
+    print(f"\nVarredura concluída em {time() - inicio:.1f} segundos. Resultados salvos em '{args.saida}'.")
+    if len(tabela):
+        print(f"F1 e acurácia de validação em {tabela['validacao'][0]}.")
+        print(tabela[['config', 'hidden_layer_sizes', 'learning_rate_init', 'batch_size', 'alpha',
+                      'f1_macro', 'tempo_treino_s', 'tempo_predicao_s']].head(10).to_string(index=False))